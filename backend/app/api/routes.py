@@ -1,20 +1,118 @@
 # D:\Year 5\S1\Advanced_programming\article_classifier\backend\app\api\routes.py
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Header, File, UploadFile, Request, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated, List, Literal, Optional, Dict, Any, Union
+from pydantic import BaseModel, Field
+from contextlib import contextmanager
+from datetime import date
+import json
 import logging
 import traceback
 
-from app.db.session import get_db
-from app.db import crud
+from app.db.session import get_db, get_async_db, pool_status
+from app.db import crud, async_crud, export
+from app.db.pagination import encode_cursor, decode_cursor
+from app.db.writer import write_behind, WriteBehindFull
 from app.ml.model import classifier
-from app.db.schemas import PredictionResponse
+from app.db.schemas import PredictionResponse, PredictionDetail, PredictionSummary, JobResponse
+from app.core import metrics, timing
+from app.core.config import settings
 from app.ml import preprocessing
+from app.ml.scheduler import scheduler, LaneTimeout, INTERACTIVE, BATCH
+from app.utils.writers import iter_parquet_stream
 
 router = APIRouter(tags=['api'])
 logger = logging.getLogger(__name__)
 
+
+# ────────────────────────────────────────────────
+# Priority lanes
+# ────────────────────────────────────────────────
+
+def priority_lane(default: str = INTERACTIVE):
+    """Dependency factory: lane from the X-Priority-Lane header, else the endpoint default"""
+    def dependency(x_priority_lane: Optional[str] = Header(None)) -> str:
+        return scheduler.resolve(x_priority_lane, default=default)
+    return dependency
+
+
+@contextmanager
+def model_slot(lane: str):
+    """Hold a model slot in the given lane; 503 when the lane stays saturated"""
+    try:
+        with scheduler.slot(lane):
+            yield
+    except LaneTimeout as e:
+        logger.warning("⏳ %s", e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+
+# ────────────────────────────────────────────────
+# Persistence (write-behind when enabled)
+# ────────────────────────────────────────────────
+
+async def save_prediction(db: AsyncSession, text_input: str, label_classified: str, accuracy: float, feedback: Optional[bool] = None, **details):
+    """Persist a prediction; details are model_version, probabilities and validation_summary"""
+    with metrics.stage("db_write"):
+        if write_behind.enabled:
+            # May block briefly on id allocation or backpressure
+            try:
+                return await run_in_threadpool(write_behind.submit_prediction, text_input, label_classified, accuracy, feedback, **details)
+            except WriteBehindFull as e:
+                logger.warning(f"⚠️ {e}; writing the prediction synchronously")
+        return await async_crud.create_prediction(
+            db=db,
+            text_input=text_input,
+            label_classified=label_classified,
+            accuracy=accuracy,
+            feedback=feedback,
+            **details
+        )
+
+
+async def log_error(db: AsyncSession, error_message: str, error_type: str = "OTHER", endpoint: str = None):
+    """Record an error without letting a logging failure mask the original one"""
+    try:
+        if write_behind.enabled:
+            try:
+                return await run_in_threadpool(write_behind.submit_error_log, error_message, error_type, endpoint)
+            except WriteBehindFull:
+                pass
+        # The failed request may have left the session mid-transaction
+        await db.rollback()
+        return await async_crud.create_error_log(db=db, error_message=error_message, error_type=error_type, endpoint=endpoint)
+    except Exception as e:
+        logger.error(f"❌ Could not record error log: {e}")
+
+
+# ────────────────────────────────────────────────
+# NDJSON streaming
+# ────────────────────────────────────────────────
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(request: Request, stream: bool) -> bool:
+    """Stream when asked with ?stream=true or an Accept: application/x-ndjson header"""
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(lines) -> StreamingResponse:
+    """Serialize each yielded dict as one NDJSON line; errors end the stream with an error line"""
+    def generate():
+        try:
+            for line in lines:
+                yield json.dumps(line, ensure_ascii=False, default=str) + "\n"
+        except HTTPException as e:
+            yield json.dumps({"error": e.detail, "status_code": e.status_code}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.exception("❌ Error while streaming: %s", e)
+            yield json.dumps({"error": str(e), "status_code": 500}, ensure_ascii=False) + "\n"
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
+
 # ────────────────────────────────────────────────
 # Schemas
 # ────────────────────────────────────────────────
@@ -26,14 +124,41 @@ class FeedbackRequest(BaseModel):
 class SegmentRequest(BaseModel):
     text_input: str
     max_words: int = 512
+    engine: Optional[Literal["khmernltk", "trie"]] = None  # default: settings.SEGMENTER_ENGINE
+
+
+class BatchPredictItem(BaseModel):
+    text_input: str
+    id: Optional[str] = None
+
+
+class BatchPredictRequest(BaseModel):
+    items: List[BatchPredictItem]
+    min_words: Optional[int] = 50
+    min_chars: Optional[int] = 100
+    min_khmer_percentage: Optional[float] = 50.0
+
+
+# Projected rows (?fields=, plain dicts) are PredictionSummary; full rows are ORM objects, which only
+# PredictionResponse accepts (from_attributes). Tried in this order, so a projection that happens to
+# include every PredictionResponse field still keeps text_preview/text_length.
+HistoryRow = Annotated[Union[PredictionSummary, PredictionResponse], Field(union_mode="left_to_right")]
 
 
 class PaginatedResponse(BaseModel):
-    predictions: List[PredictionResponse]
-    total: int
+    predictions: List[HistoryRow]
+    total: Optional[int] = None
     page: int
     limit: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    total_is_estimate: bool = False
+    next_cursor: Optional[str] = None
+
+
+class SearchResponse(BaseModel):
+    predictions: List[HistoryRow]
+    limit: int
+    next_cursor: Optional[str] = None
 
 
 class TextValidationRequest(BaseModel):
@@ -55,22 +180,29 @@ class TextValidationResponse(BaseModel):
 # ────────────────────────────────────────────────
 
 @router.post("/segment")
-def segment_text(payload: SegmentRequest):
+def segment_text(
+    payload: SegmentRequest,
+    request: Request,
+    stream: bool = False,
+    lane: str = Depends(priority_lane())
+):
     """
     Endpoint: POST /segment
     Returns Khmer word count, list of words (up to max_words), truncated flag, etc.
     Uses khmernltk for proper Khmer tokenization.
+    
+    With ?stream=true (or Accept: application/x-ndjson) words are streamed as
+    NDJSON, one line per sentence chunk, followed by a summary line.
     """
     try:
-        logger.info("📥 Segment request received")
-        logger.info(f"   Text length: {len(payload.text_input)} characters")
-        logger.info(f"   Max words: {payload.max_words}")
-        logger.info(f"   Text preview: {payload.text_input[:50]!r}...")
-        logger.debug(f"   First 10 char codes: {[f'U+{ord(c):04X}' for c in payload.text_input[:10]]}")
+        logger.debug("📥 Segment request: %d characters, max_words=%d, preview %r",
+                     len(payload.text_input), payload.max_words, payload.text_input[:50])
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("   First 10 char codes: %s", [f"U+{ord(c):04X}" for c in payload.text_input[:10]])
 
         # Clean text
         cleaned = preprocessing.remove_non_khmer_english_and_punct(payload.text_input)
-        logger.info(f"✨ Text cleaned: {len(cleaned)} characters")
+        logger.debug("✨ Text cleaned: %d characters", len(cleaned))
 
         if not cleaned:
             logger.warning("⚠️ Cleaned text is empty!")
@@ -82,11 +214,16 @@ def segment_text(payload: SegmentRequest):
                 "warning": "Text became empty after cleaning"
             }
 
+        if wants_ndjson(request, stream):
+            return ndjson_response(_stream_segments(cleaned, payload.max_words, lane, payload.engine))
+
         # Segment using khmernltk
-        result = preprocessing.count_khmer_words(cleaned, max_words=payload.max_words)
+        with model_slot(lane):
+            result = preprocessing.count_khmer_words(cleaned, max_words=payload.max_words, engine=payload.engine)
 
-        logger.info(f"📊 Segmentation complete → count: {result['count']}, truncated: {result['truncated']}")
-        logger.debug(f"   First 5 words: {result['words'][:5] if result['words'] else 'none'}")
+        logger.info("📊 Segmentation complete → count: %d, truncated: %s", result["count"], result["truncated"],
+                    extra={"event": "segment.done", "chars": len(cleaned), "word_count": result["count"]})
+        logger.debug("   First 5 words: %s", result["words"][:5])
 
         return {
             "khmer_word_count": result["count"],
@@ -95,12 +232,34 @@ def segment_text(payload: SegmentRequest):
             "cleaned_text": cleaned,
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"❌ Error in /segment: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception("❌ Error in /segment: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _stream_segments(cleaned: str, max_words: int, lane: str, engine: Optional[str] = None):
+    """Segment one sentence chunk at a time, emitting each chunk's words as soon as they are ready"""
+    count = 0
+    truncated = False
+    for index, chunk in enumerate(preprocessing.iter_text_chunks(cleaned, settings.STREAM_SEGMENT_CHUNK_CHARS)):
+        remaining = max_words - count
+        if remaining <= 0:
+            truncated = True
+            break
+        with model_slot(lane):
+            result = preprocessing.count_khmer_words(chunk, max_words=remaining, engine=engine)
+        count += result["count"]
+        truncated = result["truncated"]
+        yield {"chunk": index, "khmer_words": result["words"]}
+        if truncated:
+            break
+    logger.info("📊 Streamed segmentation complete → count: %d, truncated: %s", count, truncated,
+                extra={"event": "segment.done", "chars": len(cleaned), "word_count": count})
+    yield {"done": True, "khmer_word_count": count, "truncated": truncated}
+
+
 # ────────────────────────────────────────────────
 # Debug endpoint for Khmer processing
 # ────────────────────────────────────────────────
@@ -118,9 +277,12 @@ def debug_khmer_text(payload: SegmentRequest):
             "input_preview": text[:80] if len(text) > 80 else text,
         }
 
-        cleaned = preprocessing.remove_non_khmer_english_and_punct(text)
+        normalized = preprocessing.normalize(text, join_khmer=False)
+        cleaned = normalized.text
         debug_info["cleaned_text"] = cleaned
         debug_info["cleaned_length"] = len(cleaned)
+        debug_info["character_classes"] = normalized._asdict()
+        del debug_info["character_classes"]["text"]
 
         # Try khmernltk
         try:
@@ -143,7 +305,7 @@ def debug_khmer_text(payload: SegmentRequest):
         debug_info["space_split_words_preview"] = space_words[:8]
 
         # Actual function result
-        result = preprocessing.count_khmer_words(cleaned, max_words=payload.max_words)
+        result = preprocessing.count_khmer_words(cleaned, max_words=payload.max_words, engine=payload.engine)
         debug_info["count_khmer_words_result"] = {
             "count": result["count"],
             "words_preview": result["words"][:6] if result["words"] else [],
@@ -160,30 +322,45 @@ def debug_khmer_text(payload: SegmentRequest):
         }
 
 
+@router.get("/debug/profiles/{profile_id}")
+def get_request_profile(profile_id: str):
+    """
+    Sampled profile of a request sent with "X-Profile: 1" (id from its X-Profile-Id header)
+    
+    Needs PROFILING_ENABLED. "folded" is one "frame;frame;... count" line per
+    distinct stack, ready for flamegraph.pl or speedscope.
+    """
+    profile = timing.load_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+
 # ────────────────────────────────────────────────
 # Text validation endpoint
 # ────────────────────────────────────────────────
 
 @router.post("/validate-text", response_model=TextValidationResponse)
-def validate_text(payload: TextValidationRequest):
+def validate_text(payload: TextValidationRequest, lane: str = Depends(priority_lane())):
     """Validate if text is suitable for classification"""
     try:
-        logger.info("🔍 Text validation request received")
-        logger.info(f"   Text length: {len(payload.text_input)} characters")
-        logger.info(f"   Requirements: min_words={payload.min_words}, min_chars={payload.min_chars}, min_khmer={payload.min_khmer_percentage}%")
+        logger.debug("🔍 Text validation request: %d characters, min_words=%s, min_chars=%s, min_khmer=%s%%",
+                     len(payload.text_input), payload.min_words, payload.min_chars, payload.min_khmer_percentage)
         
         # Use the new validation method from model.py
-        validation_result = classifier.predict_with_validation(
-            payload.text_input,
-            min_khmer_percentage=payload.min_khmer_percentage,
-            min_words=payload.min_words,
-            min_chars=payload.min_chars
-        )
+        with model_slot(lane):
+            validation_result = classifier.predict_with_validation(
+                payload.text_input,
+                min_khmer_percentage=payload.min_khmer_percentage,
+                min_words=payload.min_words,
+                min_chars=payload.min_chars
+            )
         
         if validation_result["valid"]:
-            logger.info(f"✅ Text validation passed: {validation_result.get('validation_info', {})}")
+            logger.info("✅ Text validation passed", extra={"event": "validate.done", "chars": len(payload.text_input)})
+            logger.debug("   Validation info: %s", validation_result.get("validation_info", {}))
         else:
-            logger.warning(f"⚠️ Text validation failed: {validation_result.get('error', 'Unknown error')}")
+            logger.warning("⚠️ Text validation failed: %s", validation_result.get("error", "Unknown error"))
         
         # Convert to TextValidationResponse format
         return TextValidationResponse(
@@ -193,9 +370,10 @@ def validate_text(payload: TextValidationRequest):
             suggestions=validation_result.get("suggestions")
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"❌ Validation error: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception("❌ Validation error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -204,21 +382,23 @@ def validate_text(payload: TextValidationRequest):
 # ────────────────────────────────────────────────
 
 @router.post("/analyze-text")
-def analyze_text(payload: SegmentRequest):
+def analyze_text(payload: SegmentRequest, lane: str = Depends(priority_lane())):
     """Analyze text characteristics without prediction"""
     try:
-        logger.info("📊 Text analysis request received")
-        logger.info(f"   Text length: {len(payload.text_input)} characters")
+        logger.debug("📊 Text analysis request: %d characters", len(payload.text_input))
         
-        analysis_result = classifier.analyze_text(payload.text_input)
+        with model_slot(lane):
+            analysis_result = classifier.analyze_text(payload.text_input)
         
-        logger.info(f"📈 Analysis complete: {analysis_result.get('khmer_percentage', 0):.1f}% Khmer")
+        logger.info("📈 Analysis complete: %.1f%% Khmer", analysis_result.get("khmer_percentage", 0),
+                    extra={"event": "analyze.done", "chars": len(payload.text_input)})
         
         return analysis_result
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"❌ Analysis error: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception("❌ Analysis error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -226,27 +406,47 @@ def analyze_text(payload: SegmentRequest):
 # Main prediction endpoint
 # ────────────────────────────────────────────────
 
+def _classify_for_prediction(text_input: str, min_words: int, min_chars: int, min_khmer_percentage: float, lane: str):
+    """Validate and classify in a worker thread (CPU-bound, holds a model slot)"""
+    with model_slot(lane):
+        # First validate the text (validation only; the model runs once, below)
+        is_valid, error_message, validation_info = classifier._validate_text_for_prediction(
+            text_input,
+            min_khmer_percentage=min_khmer_percentage,
+            min_words=min_words,
+            min_chars=min_chars
+        )
+        validation_result = {"valid": is_valid, "error": error_message, "validation_info": validation_info}
+        
+        if not is_valid:
+            return validation_result, None, 0.0, {}
+        
+        # If validation passed, proceed with prediction
+        processed_text = preprocessing.preprocess_for_model(text_input)
+        
+        # Get prediction, or reuse the label of an already classified near-duplicate
+        category, confidence, prediction_info = classifier.predict_or_reuse(processed_text, raw_text=text_input)
+        return validation_result, category, confidence, prediction_info
+
+
 @router.post("/predict", response_model=PredictionResponse)
-def predict_article(
+async def predict_article(
     text_input: str = Body(..., embed=True),
     feedback: Optional[bool] = Body(None),
     min_words: Optional[int] = Body(50, description="Minimum words required"),
     min_chars: Optional[int] = Body(100, description="Minimum characters required"),
     min_khmer_percentage: Optional[float] = Body(50.0, description="Minimum Khmer percentage required"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    lane: str = Depends(priority_lane())
 ):
     """Classify Khmer article text with validation"""
     try:
-        logger.info("🎯 Prediction request received")
-        logger.info(f"   Text length: {len(text_input)} characters")
-        logger.info(f"   Validation requirements: min_words={min_words}, min_chars={min_chars}, min_khmer={min_khmer_percentage}%")
+        logger.debug("🎯 Prediction request: %d characters, min_words=%s, min_chars=%s, min_khmer=%s%%, lane %s",
+                     len(text_input), min_words, min_chars, min_khmer_percentage, lane)
         
-        # First validate the text
-        validation_result = classifier.predict_with_validation(
-            text_input,
-            min_khmer_percentage=min_khmer_percentage,
-            min_words=min_words,
-            min_chars=min_chars
+        # Inference runs in the threadpool; only the DB write stays on the event loop
+        validation_result, category, confidence, prediction_info = await run_in_threadpool(
+            _classify_for_prediction, text_input, min_words, min_chars, min_khmer_percentage, lane
         )
         
         if not validation_result["valid"]:
@@ -254,7 +454,7 @@ def predict_article(
             error_msg = validation_result.get("error", "Text validation failed")
             validation_info = validation_result.get("validation_info", {})
             
-            logger.warning(f"❌ Prediction rejected: {error_msg}")
+            logger.warning("❌ Prediction rejected: %s", error_msg)
             
             raise HTTPException(
                 status_code=400, 
@@ -265,33 +465,27 @@ def predict_article(
                 }
             )
         
-        # If validation passed, proceed with prediction
-        processed_text = preprocessing.preprocess_for_model(text_input)
-        
-        # Get prediction
-        category, confidence, prediction_info = classifier.predict(
-            processed_text,
-            min_khmer_percentage=min_khmer_percentage,
-            min_words=min_words,
-            min_chars=min_chars,
-            skip_validation=True  # Already validated
-        )
-        
-        # Log successful prediction
-        logger.info(f"✅ Prediction successful: {category} ({confidence:.3f}%)")
-        
         # Save to database
-        db_prediction = crud.create_prediction(
-            db=db,
+        db_prediction = await save_prediction(
+            db,
             text_input=text_input,           # original text
             label_classified=category,
             accuracy=confidence,
-            feedback=feedback
+            feedback=feedback,
+            model_version=prediction_info.get("model_version"),
+            probabilities=prediction_info.get("probabilities"),
+            validation_summary=classifier.validation_summary(validation_result.get("validation_info", {}))
         )
         
+        logger.info("✅ Prediction successful: %s (%.3f%%)", category, confidence,
+                    extra={"event": "predict.done", "prediction_id": db_prediction.id, "label": category,
+                           "confidence": round(confidence, 3), "chars": len(text_input), "lane": lane})
+        
         # Convert SQLAlchemy object to dict and add validation info
-        response_dict = {k: v for k, v in db_prediction.__dict__.items() if not k.startswith('_')}
+        response_dict = {k: v for k, v in db_prediction.__dict__.items() if not k.startswith('_') and k != "article"}
+        response_dict["text_input"] = db_prediction.text_input
         response_dict["validation_info"] = validation_result.get("validation_info", {})
+        response_dict["near_duplicate"] = prediction_info.get("near_duplicate")
         
         # Ensure the response matches PredictionResponse schema
         return response_dict
@@ -300,14 +494,70 @@ def predict_article(
         # Re-raise HTTP exceptions
         raise http_error
     except Exception as e:
-        logger.error(f"❌ Prediction error: {e}")
-        logger.error(traceback.format_exc())
-        crud.create_error_log(
-            db=db,
-            error_message=str(e),
-            error_type="MODEL",
-            endpoint="/predict"
+        logger.exception("❌ Prediction error: %s", e)
+        await log_error(db, error_message=str(e), error_type="MODEL", endpoint="/predict")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ────────────────────────────────────────────────
+# Multi-item prediction endpoint
+# ────────────────────────────────────────────────
+
+def _iter_batch_predictions(payload: BatchPredictRequest, lane: str):
+    """Classify items STREAM_BATCH_SIZE at a time, yielding results as each batch finishes"""
+    batch_size = settings.STREAM_BATCH_SIZE
+    for start in range(0, len(payload.items), batch_size):
+        items = payload.items[start:start + batch_size]
+        with model_slot(lane):
+            results = classifier.classify_batch(
+                [item.text_input for item in items],
+                min_khmer_percentage=payload.min_khmer_percentage,
+                min_words=payload.min_words,
+                min_chars=payload.min_chars
+            )
+        for offset, (item, result) in enumerate(zip(items, results)):
+            yield {
+                "index": start + offset,
+                "id": item.id,
+                "valid": result["valid"],
+                "label_classified": result.get("category"),
+                "accuracy": result.get("confidence"),
+                "error": result.get("error"),
+                "validation_info": result.get("validation_info", {}),
+                "near_duplicate": result.get("prediction_info", {}).get("near_duplicate")
+            }
+
+
+@router.post("/predict/batch")
+def predict_batch(
+    payload: BatchPredictRequest,
+    request: Request,
+    stream: bool = False,
+    lane: str = Depends(priority_lane(BATCH))
+):
+    """
+    Classify several articles in one request (results are not saved to history).
+    
+    With ?stream=true (or Accept: application/x-ndjson) results are streamed as
+    NDJSON, one line per item, as soon as each batch of items is classified.
+    """
+    logger.info("🎯 Batch prediction request received: %d items, lane: %s", len(payload.items), lane,
+                extra={"event": "predict_batch.received", "items": len(payload.items), "lane": lane})
+    if len(payload.items) > settings.BATCH_PREDICT_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many items ({len(payload.items)} > {settings.BATCH_PREDICT_MAX_ITEMS}); use /jobs for bulk runs"
         )
+    
+    if wants_ndjson(request, stream):
+        return ndjson_response(_iter_batch_predictions(payload, lane))
+    
+    try:
+        return {"results": list(_iter_batch_predictions(payload, lane))}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("❌ Batch prediction error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -320,60 +570,50 @@ def get_probabilities(
     text_input: str = Body(..., embed=True),
     min_words: Optional[int] = Body(50, description="Minimum words required"),
     min_chars: Optional[int] = Body(100, description="Minimum characters required"),
-    min_khmer_percentage: Optional[float] = Body(50.0, description="Minimum Khmer percentage required")
+    min_khmer_percentage: Optional[float] = Body(50.0, description="Minimum Khmer percentage required"),
+    lane: str = Depends(priority_lane())
 ):
     """Get probabilities for all categories with validation"""
     try:
-        logger.info("📊 Probabilities request received")
-        logger.info(f"   Text length: {len(text_input)} characters")
+        logger.debug("📊 Probabilities request: %d characters", len(text_input))
         
-        # First validate the text
-        validation_result = classifier.predict_with_validation(
-            text_input,
-            min_khmer_percentage=min_khmer_percentage,
-            min_words=min_words,
-            min_chars=min_chars
-        )
+        # Validates the raw text and runs the model once, on the preprocessed text
+        processed_text = preprocessing.preprocess_for_model(text_input)
+        with model_slot(lane):
+            probabilities_result = classifier.get_all_probabilities(
+                processed_text,
+                min_khmer_percentage=min_khmer_percentage,
+                min_words=min_words,
+                min_chars=min_chars,
+                raw_text=text_input
+            )
         
-        if not validation_result["valid"]:
-            # Validation failed
-            error_msg = validation_result.get("error", "Text validation failed")
-            validation_info = validation_result.get("validation_info", {})
+        if not probabilities_result["valid"]:
+            if "suggestion" not in probabilities_result:
+                # The model failed, not the text
+                raise HTTPException(status_code=500, detail=probabilities_result.get("error", "Probabilities failed"))
             
-            logger.warning(f"❌ Probabilities request rejected: {error_msg}")
+            error_msg = probabilities_result.get("error", "Text validation failed")
+            logger.warning("❌ Probabilities request rejected: %s", error_msg)
             
             raise HTTPException(
                 status_code=400,
                 detail={
                     "error": error_msg,
-                    "validation_info": validation_info,
-                    "suggestion": f"Please provide longer Khmer text (minimum {min_words} words or {min_chars} characters with {min_khmer_percentage}% Khmer content)"
+                    "validation_info": probabilities_result["validation_info"],
+                    "suggestion": probabilities_result["suggestion"]
                 }
             )
         
-        # If valid, get probabilities
-        processed_text = preprocessing.preprocess_for_model(text_input)
-        
-        # Use the get_all_probabilities method
-        probabilities_result = classifier.get_all_probabilities(
-            processed_text,
-            min_khmer_percentage=min_khmer_percentage,
-            min_words=min_words,
-            min_chars=min_chars
-        )
-        
-        if not probabilities_result.get("valid", True):
-            # This shouldn't happen since we already validated
-            raise HTTPException(status_code=500, detail="Unexpected validation failure")
-        
-        logger.info(f"✅ Probabilities calculated successfully")
+        logger.info("✅ Probabilities calculated successfully",
+                    extra={"event": "probabilities.done", "model_used": probabilities_result.get("model_used"),
+                           "chars": len(text_input)})
         return probabilities_result
         
     except HTTPException as http_error:
         raise http_error
     except Exception as e:
-        logger.error(f"❌ Probabilities error: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception("❌ Probabilities error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -381,15 +621,82 @@ def get_probabilities(
 # History & feedback
 # ────────────────────────────────────────────────
 
-@router.get("/predictions", response_model=PaginatedResponse)
-def get_predictions(
+def _parse_history_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if fields is None:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in async_crud.HISTORY_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)} (allowed: {', '.join(async_crud.HISTORY_FIELDS)})"
+        )
+    return requested
+
+
+def _segment_previews(rows: List[Dict[str, Any]], preview_words: int):
+    """Replace character previews with the first preview_words segmented words"""
+    for row in rows:
+        if row.get("text_preview"):
+            row["text_preview"] = preprocessing.segment_for_display(row["text_preview"], max_words=preview_words)
+
+
+def _preview_chars(preview_chars: int, preview_words: Optional[int]) -> int:
+    # Enough characters to hold preview_words Khmer words
+    return max(preview_chars, preview_words * 16) if preview_words else preview_chars
+
+
+async def _finish_history_page(predictions, has_more: bool, field_list: Optional[List[str]], preview_words: Optional[int]):
+    """Next keyset cursor, then trim projected rows to the requested fields"""
+    next_cursor = None
+    if has_more and predictions:
+        last = predictions[-1]
+        if field_list is None:
+            next_cursor = encode_cursor(last.created_at, last.id)
+        else:
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+    
+    if field_list is not None:
+        # Drop the cursor columns unless they were asked for
+        keep = {"id", *field_list}
+        predictions = [{k: v for k, v in row.items() if k in keep} for row in predictions]
+        if preview_words and "text_preview" in field_list:
+            await run_in_threadpool(_segment_previews, predictions, preview_words)
+    return predictions, next_cursor
+
+
+def _decode_cursor_param(cursor: str):
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/predictions", response_model=PaginatedResponse, response_model_exclude_unset=True)
+async def get_predictions(
     page: int = 1,
     limit: int = 10,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor; empty string for the first page"),
+    total: str = Query("exact", pattern="^(exact|estimate|none)$", description="How to compute the total count"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,created_at,label_classified,text_preview"),
+    preview_chars: int = Query(100, ge=1, le=2000, description="Length of text_preview in characters"),
+    preview_words: Optional[int] = Query(None, ge=1, le=200, description="Make text_preview the first N segmented words instead"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get predictions with pagination"""
+    """
+    Get predictions, most recent first.
+    
+    Pass `cursor` (from the previous response's next_cursor, or empty for the
+    first page) for keyset pagination; otherwise `page` selects an OFFSET page.
+    `total=estimate` returns a cheap cached/planner estimate instead of an
+    exact count, and `total=none` skips counting entirely.
+    
+    With `fields`, only those columns are read from the database and returned;
+    `text_preview` and `text_length` are computed in SQL so full article
+    bodies never leave Postgres. Use /predictions/{id} for the full text.
+    """
     try:
-        logger.info(f"📜 History request - page: {page}, limit: {limit}")
+        logger.debug("📜 History request - page: %d, limit: %d, cursor: %r, total: %s, fields: %s", page, limit, cursor, total, fields)
         
         # Validate inputs
         if page < 1:
@@ -397,44 +704,137 @@ def get_predictions(
         if limit < 1 or limit > 100:
             limit = 10
         
-        # Calculate skip
-        skip = (page - 1) * limit
+        field_list = _parse_history_fields(fields)
+        projection = {"fields": field_list, "preview_chars": _preview_chars(preview_chars, preview_words)}
         
-        # Get total count
-        total = crud.get_total_predictions(db)
-        logger.info(f"📊 Total predictions in database: {total}")
+        if cursor is not None:
+            # Keyset page: no OFFSET scan, cost independent of how deep we are
+            after = _decode_cursor_param(cursor)
+            predictions, has_more = await async_crud.get_predictions_by_cursor(db, after, limit=limit, **projection)
+        else:
+            # Calculate skip
+            skip = (page - 1) * limit
+            
+            # Get paginated predictions (most recent first)
+            predictions = await async_crud.get_predictions_with_pagination(db, skip=skip, limit=limit + 1, **projection)
+            has_more = len(predictions) > limit
+            predictions = predictions[:limit]
+        logger.info("📋 Retrieved %d predictions for page %d", len(predictions), page,
+                    extra={"event": "history.done", "rows": len(predictions), "keyset": cursor is not None})
         
-        # Get paginated predictions (most recent first)
-        predictions = crud.get_predictions_with_pagination(db, skip=skip, limit=limit)
-        logger.info(f"📋 Retrieved {len(predictions)} predictions for page {page}")
+        predictions, next_cursor = await _finish_history_page(predictions, has_more, field_list, preview_words)
+        
+        # Get total count
+        total_count = None
+        if total == "exact":
+            total_count = await async_crud.get_total_predictions(db)
+        elif total == "estimate":
+            total_count = await async_crud.estimate_total_predictions(db)
+        logger.debug("📊 Total predictions in database (%s): %s", total, total_count)
         
         # Calculate total pages
-        total_pages = (total + limit - 1) // limit if limit > 0 else 0
+        total_pages = None
+        if total_count is not None:
+            total_pages = (total_count + limit - 1) // limit if limit > 0 else 0
         
         return PaginatedResponse(
             predictions=predictions,
-            total=total,
+            total=total_count,
             page=page,
             limit=limit,
-            total_pages=total_pages
+            total_pages=total_pages,
+            total_is_estimate=(total == "estimate"),
+            next_cursor=next_cursor
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"❌ Error getting predictions: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception("❌ Error getting predictions: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/predictions/{prediction_id}", response_model=PredictionResponse)
-def get_prediction(prediction_id: int, db: Session = Depends(get_db)):
-    """Get a single prediction by ID"""
+# Declared before /predictions/{prediction_id} so "search" is not parsed as an id
+@router.get("/predictions/search", response_model=SearchResponse, response_model_exclude_unset=True)
+async def search_predictions(
+    q: str = Query(..., min_length=settings.SEARCH_MIN_QUERY_CHARS, description="Text the article must contain"),
+    label: Optional[str] = Query(None, description="Only predictions with this label"),
+    date_from: Optional[date] = Query(None, description="First day to include"),
+    date_to: Optional[date] = Query(None, description="Last day to include"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor"),
+    limit: int = Query(10, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, as for /predictions"),
+    preview_chars: int = Query(100, ge=1, le=2000),
+    preview_words: Optional[int] = Query(None, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Find past predictions by article content, most recent first.
+    
+    Matches `q` as a case-insensitive substring of the stored article text
+    (no word segmentation needed), optionally filtered by label and by an
+    inclusive date range. Page with `cursor` = previous `next_cursor`.
+    """
+    try:
+        logger.debug("🔎 Search - q: %r, label: %s, dates: %s..%s, cursor: %r", q[:50], label, date_from, date_to, cursor)
+        field_list = _parse_history_fields(fields)
+        after = _decode_cursor_param(cursor) if cursor else None
+        
+        predictions, has_more = await async_crud.search_predictions(
+            db,
+            q.strip(),
+            label=label,
+            date_from=date_from,
+            date_to=date_to,
+            cursor=after,
+            limit=limit,
+            fields=field_list,
+            preview_chars=_preview_chars(preview_chars, preview_words)
+        )
+        predictions, next_cursor = await _finish_history_page(predictions, has_more, field_list, preview_words)
+        logger.info("🔎 Search returned %d predictions", len(predictions), extra={"event": "search.done", "rows": len(predictions)})
+        return SearchResponse(predictions=predictions, limit=limit, next_cursor=next_cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("❌ Error searching predictions: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/predictions/{prediction_id}", response_model=PredictionDetail, response_model_exclude_unset=True)
+async def get_prediction(
+    prediction_id: int,
+    include: Optional[str] = Query(None, description="Comma-separated extras: probabilities, validation"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a single prediction by ID, optionally with its stored probabilities and validation summary"""
+    extras = set(filter(None, (part.strip() for part in (include or "").split(","))))
+    unknown = extras - {"probabilities", "validation"}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(sorted(unknown))}")
     try:
-        logger.info(f"🔍 Getting prediction with ID: {prediction_id}")
-        prediction = crud.get_prediction(db, prediction_id)
+        logger.debug("🔍 Getting prediction with ID: %s", prediction_id)
+        prediction = await async_crud.get_prediction(db, prediction_id)
+        if not prediction and write_behind.enabled:
+            prediction = write_behind.get_pending_prediction(prediction_id)
         if not prediction:
-            logger.warning(f"⚠️ Prediction not found: {prediction_id}")
+            logger.warning("⚠️ Prediction not found: %s", prediction_id)
             raise HTTPException(status_code=404, detail="Prediction not found")
-        return prediction
+        
+        detail = PredictionDetail(
+            **PredictionResponse.model_validate(prediction).model_dump(),
+            model_version=prediction.model_version
+        )
+        if "probabilities" in extras and prediction.probabilities is not None:
+            vector = prediction.probability_vector
+            # Same shape as /probabilities: model label -> percentage
+            detail.probabilities = {
+                label: probability * 100
+                for label, probability in zip(classifier.class_labels(len(vector)), vector)
+            }
+        if "validation" in extras:
+            detail.validation_summary = prediction.validation_summary
+        return detail
     except HTTPException:
         raise
     except Exception as e:
@@ -443,21 +843,25 @@ def get_prediction(prediction_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/predictions/{prediction_id}/feedback")
-def add_feedback(
+async def add_feedback(
     prediction_id: int,
     feedback_request: FeedbackRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add feedback to a prediction"""
     try:
-        logger.info(f"👍 Feedback for prediction {prediction_id}: {feedback_request.feedback}")
-        prediction = crud.update_prediction_feedback(
-            db, prediction_id, feedback_request.feedback
-        )
+        logger.info("👍 Feedback for prediction %s: %s", prediction_id, feedback_request.feedback)
+        prediction = None
+        if write_behind.enabled:
+            prediction = write_behind.update_pending_feedback(prediction_id, feedback_request.feedback)
         if not prediction:
-            logger.warning(f"⚠️ Prediction not found for feedback: {prediction_id}")
+            prediction = await async_crud.update_prediction_feedback(
+                db, prediction_id, feedback_request.feedback
+            )
+        if not prediction:
+            logger.warning("⚠️ Prediction not found for feedback: %s", prediction_id)
             raise HTTPException(status_code=404, detail="Prediction not found")
-        return {"message": "Feedback updated", "prediction": prediction}
+        return {"message": "Feedback updated", "prediction": PredictionResponse.model_validate(prediction)}
     except HTTPException:
         raise
     except Exception as e:
@@ -465,16 +869,160 @@ def add_feedback(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ────────────────────────────────────────────────
+# Bulk classification jobs
+# ────────────────────────────────────────────────
+
+def _iter_job_upload(upload: UploadFile):
+    """Parse a JSONL upload of {"text_input": ..., "id": optional} lines"""
+    for line_no, raw_line in enumerate(upload.file, start=1):
+        line = raw_line.decode("utf-8").strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {line_no}: invalid JSON ({e.msg})")
+        text = record.get("text_input") if isinstance(record, dict) else None
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError(f"Line {line_no}: missing or empty 'text_input'")
+        external_id = record.get("id")
+        yield {
+            "text_input": text,
+            "external_id": str(external_id) if external_id is not None else None
+        }
+
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+def create_job(
+    file: UploadFile = File(..., description="JSONL file, one {\"text_input\": ...} object per line"),
+    batch_size: int = settings.JOB_BATCH_SIZE,
+    db: Session = Depends(get_db)
+):
+    """Queue a bulk classification job; poll /jobs/{id} and download /jobs/{id}/results"""
+    try:
+        logger.info("📦 Job upload received: %s", file.filename)
+        batch_size = max(1, min(batch_size, settings.JOB_MAX_BATCH_SIZE))
+        
+        job = crud.create_job(db, _iter_job_upload(file), batch_size=batch_size)
+        
+        logger.info("📦 Job %s queued with %d items", job.id, job.total_items)
+        return job
+    
+    except ValueError as e:
+        db.rollback()
+        logger.warning("⚠️ Job upload rejected: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        logger.exception("❌ Error creating job: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    """Get job status and progress"""
+    job = crud.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/results")
+def get_job_results(job_id: str, db: Session = Depends(get_db)):
+    """Stream the results stored so far as NDJSON, in upload order"""
+    job = crud.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    def generate():
+        for result in crud.iter_job_results(db, job_id):
+            yield json.dumps({
+                "seq": result.seq,
+                "id": result.external_id,
+                "label_classified": result.label_classified,
+                "accuracy": float(result.accuracy) if result.accuracy is not None else None,
+                "error": result.error_message
+            }, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"X-Job-Status": job.status, "X-Job-Processed": str(job.processed_items)}
+    )
+
+
+# ────────────────────────────────────────────────
+# Training data export
+# ────────────────────────────────────────────────
+
+@router.get("/export/training")
+def export_training_data(
+    format: str = Query("jsonl", pattern="^(jsonl|parquet)$"),
+    since: Optional[str] = Query(None, description="Watermark from a previous export's X-Export-Watermark header"),
+    date_from: Optional[date] = Query(None, description="First prediction day to include"),
+    date_to: Optional[date] = Query(None, description="Last prediction day to include"),
+    label: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream every prediction that has feedback, for retraining and distillation.
+    
+    Rows are read with a server-side cursor and written as they arrive, so
+    memory use does not depend on the table size. Pass the returned
+    X-Export-Watermark as `since` next time to get only feedback given since.
+    """
+    try:
+        since_time = export.parse_watermark(since) if since else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    until = export.watermark_now()
+    logger.info("📤 Training export (%s) since=%s until=%s label=%s dates=%s..%s", format, since_time, until, label, date_from, date_to)
+    
+    records = export.iter_training_records(
+        db,
+        batch_size=settings.EXPORT_BATCH_SIZE,
+        since=since_time,
+        until=until,
+        date_from=date_from,
+        date_to=date_to,
+        label=label
+    )
+    headers = {"X-Export-Watermark": until.isoformat()}
+    if format == "parquet":
+        try:
+            schema = export.parquet_schema()
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+        headers["Content-Disposition"] = 'attachment; filename="training.parquet"'
+        return StreamingResponse(
+            iter_parquet_stream(records, schema, row_group_size=settings.EXPORT_BATCH_SIZE * 10),
+            media_type="application/vnd.apache.parquet",
+            headers=headers
+        )
+    
+    return StreamingResponse(
+        (json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records),
+        media_type="application/x-ndjson",
+        headers=headers
+    )
+
+
 # ────────────────────────────────────────────────
 # Utility endpoints
 # ────────────────────────────────────────────────
 
 @router.get("/stats")
-def get_statistics(db: Session = Depends(get_db)):
-    """Get prediction statistics"""
+async def get_statistics(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    label: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get prediction statistics (overall, per label and per day) from the daily rollup"""
     try:
-        logger.info("📈 Getting statistics")
-        stats = crud.get_prediction_stats(db)
+        logger.debug("📈 Getting statistics (from=%s, to=%s, label=%s)", date_from, date_to, label)
+        stats = await async_crud.get_prediction_stats(db, date_from=date_from, date_to=date_to, label=label)
         return stats
     except Exception as e:
         logger.error(f"❌ Error getting statistics: {e}")
@@ -485,7 +1033,7 @@ def get_statistics(db: Session = Depends(get_db)):
 def get_model_info():
     """Get model information"""
     try:
-        logger.info("🤖 Getting model info")
+        logger.debug("🤖 Getting model info")
         model_info = classifier.get_model_info()
         return model_info
     except Exception as e:
@@ -493,10 +1041,36 @@ def get_model_info():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/lanes")
+def get_lane_stats():
+    """Get priority lane usage (slots in use, queue depth, wait times)"""
+    return scheduler.stats()
+
+
+@router.get("/segment/cache")
+def get_segment_cache_stats():
+    """Get sentence segmentation cache usage for this worker (entries, bytes, hit rate, evictions)"""
+    from app.ml.segment_cache import segmentation_cache
+    return {"enabled": settings.SEGMENT_CACHE_ENABLED, **segmentation_cache.stats()}
+
+
+@router.get("/dedup")
+def get_dedup_stats():
+    """Get near-duplicate index usage for this worker (entries, hit rate, evictions, memory)"""
+    from app.ml.dedup import near_duplicates
+    return {"enabled": settings.DEDUP_ENABLED, **near_duplicates.stats()}
+
+
+@router.get("/db/pool")
+def get_pool_stats():
+    """Get database connection-pool utilization for this worker"""
+    return pool_status()
+
+
 @router.get("/validation-rules")
 def get_validation_rules():
     """Get current validation rules"""
-    logger.info("📋 Getting validation rules")
+    logger.debug("📋 Getting validation rules")
     return {
         "minimum_requirements": {
             "words": 50,
@@ -524,10 +1098,21 @@ def health_check(db: Session = Depends(get_db)):
     except Exception:
         db_connected = False
     
+    from app.db.partitions import partition_maintainer
+    partitions_status = partition_maintainer.status()
+    
+    from app.db.migrations import search_index_status
+    try:
+        search_status = search_index_status(db.connection())
+    except Exception as e:
+        search_status = {"ok": False, "error": str(e)}
+    
     return {
-        "status": "healthy",
+        "status": "healthy" if partitions_status["ok"] and search_status["ok"] else "degraded",
         "model_loaded": classifier.model is not None,
         "database": "connected" if db_connected else "disconnected",
+        "partition_maintenance": partitions_status,
+        "search_index": search_status,
         "validation_enabled": True,
         "minimum_requirements": {
             "words": 50,
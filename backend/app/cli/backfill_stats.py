@@ -0,0 +1,42 @@
+"""
+Rebuild the /stats rollup table from existing predictions
+
+Run once after deploying the rollup (or any time the counters need repair).
+On PostgreSQL the predictions table is locked against writes while the
+rollup is rebuilt, so concurrent traffic is neither double counted nor lost.
+Months already archived by the partition retention policy are no longer in
+predictions, so a rebuild drops them from /stats.
+
+Usage (from backend/):
+    python -m app.cli.backfill_stats
+
+File: backend/app/cli/backfill_stats.py
+"""
+
+import logging
+import time
+
+from sqlalchemy import func, select
+
+from app.db import models, rollups
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    models.Base.metadata.create_all(bind=engine, tables=[models.PredictionDailyStat.__table__])
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        rollups.rebuild(conn)
+        rows, total = conn.execute(
+            select(func.count(), func.coalesce(func.sum(models.PredictionDailyStat.total), 0))
+        ).one()
+
+    logger.info(f"✅ Rebuilt {rows} rollup rows covering {total} predictions in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Build the word lexicon used by the trie segmenter
+
+Segments a corpus with khmernltk and writes every Khmer word seen at least
+--min-count times, with its count, as "word<TAB>count" lines, most frequent
+first. The corpus is either text files (plain text, or JSONL with a
+"text_input" field) or the stored articles in the database.
+
+Usage (from backend/):
+    python -m app.cli.build_lexicon --from-db -o ml/lexicon/khmer_words.tsv
+    python -m app.cli.build_lexicon corpus.jsonl more.txt -o lexicon.tsv --min-count 2
+
+Point SEGMENTER_LEXICON_PATH at the output. The default,
+/app/ml/lexicon/khmer_words.tsv, is what the first example writes inside the
+image (WORKDIR /app is backend/), next to the model in /app/ml/artifacts.
+
+File: backend/app/cli/build_lexicon.py
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from typing import Iterator, List, Optional
+
+from app.ml import preprocessing, trie_segmenter
+
+logger = logging.getLogger(__name__)
+
+
+def iter_file_texts(path: str) -> Iterator[str]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                text = json.loads(line).get("text_input")
+                if text:
+                    yield text
+            else:
+                yield line
+
+
+def iter_db_texts(batch_size: int = 500) -> Iterator[str]:
+    from sqlalchemy import select
+    from app.db import models
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        query = select(models.Article.text_input).execution_options(stream_results=True, yield_per=batch_size)
+        for (text,) in db.execute(query):
+            yield text
+    finally:
+        db.close()
+
+
+def run(args) -> dict:
+    started = time.perf_counter()
+    counts = Counter()
+    texts = iter_db_texts() if args.from_db else (t for path in args.inputs for t in iter_file_texts(path))
+    articles = 0
+    for text in texts:
+        cleaned = preprocessing.remove_non_khmer_english_and_punct(text)
+        words = preprocessing.count_khmer_words(cleaned, max_words=10 ** 9, engine="khmernltk")["words"]
+        counts.update(trie_segmenter.build_lexicon(words))
+        articles += 1
+        if articles % 1000 == 0:
+            print(f"  {articles} articles, {len(counts)} distinct words", file=sys.stderr)
+
+    kept = [(word, count) for word, count in counts.most_common() if count >= args.min_count]
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output + ".tmp", "w", encoding="utf-8") as f:
+        for word, count in kept:
+            f.write(f"{word}\t{count}\n")
+    os.replace(args.output + ".tmp", args.output)
+
+    summary = {
+        "articles": articles,
+        "distinct_words": len(counts),
+        "written_words": len(kept),
+        "elapsed_seconds": round(time.perf_counter() - started, 1),
+    }
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    return summary
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build a Khmer word lexicon for the trie segmenter")
+    parser.add_argument("inputs", nargs="*", help="Text or JSONL corpus files")
+    parser.add_argument("--from-db", action="store_true", help="Use the stored articles as the corpus")
+    parser.add_argument("-o", "--output", required=True, help="Lexicon file to write (word<TAB>count)")
+    parser.add_argument("--min-count", type=int, default=1, help="Drop words seen fewer times")
+    args = parser.parse_args(argv)
+    if not args.inputs and not args.from_db:
+        parser.error("give corpus files or --from-db")
+
+    logging.basicConfig(level=logging.WARNING)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Offline bulk classification of a JSONL or CSV file
+
+Streams the input, validates/cleans/classifies it in batches across a process
+pool, and writes JSONL or Parquet output incrementally. No database or web
+server is involved. Progress is checkpointed to <output>.state.json after
+every flush, and re-running the same command resumes from the last
+checkpointed input offset.
+
+Usage (from backend/):
+    python -m app.cli.classify_file articles.jsonl -o results.jsonl
+    python -m app.cli.classify_file articles.csv -o results/ --output-format parquet --workers 4
+
+Input rows need a "text_input" field (JSONL key or CSV column); an optional
+"id" field is copied to the output (as a string in Parquet).
+
+File: backend/app/cli/classify_file.py
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter, deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.utils.writers import open_writer
+
+logger = logging.getLogger(__name__)
+
+# Validation thresholds, set per worker process by _init_worker
+_thresholds: Dict[str, Any] = {}
+
+
+# ────────────────────────────────────────────────
+# Input
+# ────────────────────────────────────────────────
+
+def _iter_lines(path: str, start_offset: int) -> Iterator[Tuple[int, bytes]]:
+    """Yield (offset after line, line) from a binary file starting at start_offset"""
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        offset = start_offset
+        for line in f:
+            offset += len(line)
+            yield offset, line
+
+
+def _iter_csv_records(path: str, start_offset: int) -> Iterator[Tuple[int, Dict[str, str]]]:
+    with open(path, "rb") as f:
+        header_line = f.readline()
+    header = next(csv.reader([header_line.decode("utf-8-sig")]))
+    start_offset = max(start_offset, len(header_line))
+
+    pending = b""
+    for offset, line in _iter_lines(path, start_offset):
+        pending += line
+        # A quoted field may span lines; wait until quotes are balanced
+        if pending.count(b'"') % 2:
+            continue
+        row = next(csv.reader(io.StringIO(pending.decode("utf-8"))), None)
+        pending = b""
+        if row:
+            yield offset, dict(zip(header, row))
+
+
+def _iter_jsonl_records(path: str, start_offset: int) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    for offset, line in _iter_lines(path, start_offset):
+        line = line.strip()
+        if line:
+            yield offset, json.loads(line)
+
+
+def iter_records(path: str, fmt: str, start_offset: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (byte offset after record, record) pairs"""
+    if fmt == "csv":
+        return _iter_csv_records(path, start_offset)
+    return _iter_jsonl_records(path, start_offset)
+
+
+def iter_batches(records: Iterator[Tuple[int, Dict[str, Any]]], batch_size: int) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """Group records into (offset after last record, records) batches"""
+    batch = []
+    offset = None
+    for offset, record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield offset, batch
+            batch = []
+    if batch:
+        yield offset, batch
+
+
+# ────────────────────────────────────────────────
+# Worker side
+# ────────────────────────────────────────────────
+
+def _init_worker(thresholds: Dict[str, Any], torch_threads: int):
+    _thresholds.update(thresholds)
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+
+
+def _classify_records(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    from app.ml.model import classifier
+
+    texts = [record.get("text_input") or "" for record in records]
+    results = classifier.classify_batch(texts, **_thresholds)
+    rows = []
+    for record, result in zip(records, results):
+        rows.append({
+            "id": record.get("id"),
+            "label_classified": result["category"] if result["valid"] else None,
+            "accuracy": round(result["confidence"], 2) if result["valid"] else None,
+            "valid": result["valid"],
+            "error": result.get("error"),
+        })
+    return rows
+
+
+def output_schema():
+    """Explicit Parquet schema so parts whose labels or errors are all NULL still agree"""
+    import pyarrow as pa
+    return pa.schema([
+        ("id", pa.string()),  # JSONL ids may be numbers, CSV ids are strings
+        ("label_classified", pa.string()),
+        ("accuracy", pa.float64()),
+        ("valid", pa.bool_()),
+        ("error", pa.string()),
+    ])
+
+
+# ────────────────────────────────────────────────
+# Checkpoint state
+# ────────────────────────────────────────────────
+
+def _state_path(output: str) -> str:
+    return output.rstrip("/\\") + ".state.json"
+
+
+def _load_state(output: str, input_path: str) -> Optional[Dict[str, Any]]:
+    path = _state_path(output)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        state = json.load(f)
+    if state.get("input") != os.path.abspath(input_path):
+        raise SystemExit(f"{path} belongs to a different input ({state.get('input')}); use --restart")
+    return state
+
+
+def _save_state(output: str, state: Dict[str, Any]):
+    path = _state_path(output)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+# ────────────────────────────────────────────────
+# Driver
+# ────────────────────────────────────────────────
+
+def run(args) -> Dict[str, Any]:
+    input_fmt = args.input_format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    output_fmt = args.output_format
+
+    state = None if args.restart else _load_state(args.output, args.input)
+    if state is None:
+        state = {"input": os.path.abspath(args.input), "input_offset": 0, "output_position": 0, "records": 0}
+    elif state.get("done"):
+        print(f"Nothing to do: {args.input} already fully classified into {args.output}", file=sys.stderr)
+        return state
+    else:
+        print(f"Resuming at byte {state['input_offset']} ({state['records']} records already written)", file=sys.stderr)
+
+    thresholds = {
+        "min_words": args.min_words,
+        "min_chars": args.min_chars,
+        "min_khmer_percentage": args.min_khmer_percentage,
+    }
+
+    # Load the model once in the parent; forked workers share its memory pages
+    from app.ml.model import classifier
+    if hasattr(classifier.model, "share_memory"):
+        classifier.model.share_memory()
+
+    pool = None
+    if args.workers > 0:
+        pool = multiprocessing.get_context("fork").Pool(
+            args.workers, initializer=_init_worker, initargs=(thresholds, args.torch_threads)
+        )
+    else:
+        _init_worker(thresholds, args.torch_threads)
+
+    schema = output_schema() if output_fmt == "parquet" else None
+    writer = open_writer(args.output, output_fmt, resume_from=state["output_position"], schema=schema)
+    labels = Counter()
+    invalid = 0
+    written = 0
+    since_checkpoint = 0
+    started = time.perf_counter()
+
+    def checkpoint(offset: int):
+        writer.flush()
+        state.update(input_offset=offset, output_position=writer.position(), records=state["records"] + since_checkpoint)
+        _save_state(args.output, state)
+
+    # At most max_pending batches are in flight, so memory is bounded by
+    # batch_size * max_pending no matter how large the input is
+    max_pending = max(1, args.workers) * 2
+    pending = deque()
+    batches = iter_batches(iter_records(args.input, input_fmt, state["input_offset"]), args.batch_size)
+
+    try:
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_pending:
+                item = next(batches, None)
+                if item is None:
+                    exhausted = True
+                    break
+                offset, records = item
+                if pool:
+                    pending.append((offset, pool.apply_async(_classify_records, (records,))))
+                else:
+                    pending.append((offset, _classify_records(records)))
+            if not pending:
+                break
+
+            offset, result = pending.popleft()
+            rows = result.get() if pool else result
+            if schema is not None:
+                for row in rows:
+                    if row["id"] is not None:
+                        row["id"] = str(row["id"])
+            writer.write(rows)
+            for row in rows:
+                if row["valid"]:
+                    labels[row["label_classified"]] += 1
+                else:
+                    invalid += 1
+            written += len(rows)
+            since_checkpoint += len(rows)
+
+            if since_checkpoint >= args.checkpoint_every:
+                checkpoint(offset)
+                since_checkpoint = 0
+                elapsed = time.perf_counter() - started
+                print(f"  {state['records']} records, {written / elapsed:.1f} rec/s", file=sys.stderr)
+
+        if since_checkpoint or not state["records"]:
+            checkpoint(offset if written else state["input_offset"])
+            since_checkpoint = 0
+        state["done"] = True
+        _save_state(args.output, state)
+    finally:
+        writer.close()
+        if pool:
+            pool.terminate()
+            pool.join()
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "records": written,
+        "valid": written - invalid,
+        "invalid": invalid,
+        "labels": dict(labels),
+        "elapsed_seconds": round(elapsed, 2),
+        "records_per_second": round(written / elapsed, 2) if elapsed > 0 else 0.0,
+        "workers": args.workers,
+        "batch_size": args.batch_size,
+    }
+    print(json.dumps(summary, ensure_ascii=False, indent=2), file=sys.stderr)
+    return summary
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Classify a JSONL/CSV file of Khmer articles offline")
+    parser.add_argument("input", help="Input .jsonl or .csv file with a text_input field")
+    parser.add_argument("-o", "--output", required=True, help="Output .jsonl file, or directory for parquet")
+    parser.add_argument("--input-format", choices=["jsonl", "csv"], help="Default: from the file extension")
+    parser.add_argument("--output-format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Process pool size; 0 runs in-process")
+    parser.add_argument("--torch-threads", type=int, default=1, help="Torch intra-op threads per worker")
+    parser.add_argument("--batch-size", type=int, default=16, help="Texts per forward pass")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="Records between output flushes/checkpoints")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint and start over")
+    parser.add_argument("--min-words", type=int, default=50)
+    parser.add_argument("--min-chars", type=int, default=100)
+    parser.add_argument("--min-khmer-percentage", type=float, default=50.0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Move prediction texts into the content-addressed articles table
+
+For databases created before predictions referenced articles: adds the
+articles table and predictions.article_hash, makes predictions.text_input
+nullable (the current code no longer writes it), then walks predictions in id
+order, hashing each text in Python (same normalization as the API) and
+upserting one article per distinct text. Every batch commits on its own, so
+the command can be interrupted and re-run; it continues with the rows that
+have no article_hash yet.
+
+The API does the same at startup in a background thread
+(app.db.migrations.start_article_backfill); this command runs it in the
+foreground, waiting for a backfill already in progress, and is needed for
+--drop-column.
+
+Once every row is linked, --drop-column makes article_hash NOT NULL and drops
+predictions.text_input (PostgreSQL only). Run VACUUM FULL predictions
+afterwards to give the space back to the OS.
+
+Usage (from backend/):
+    python -m app.cli.migrate_articles
+    python -m app.cli.migrate_articles --drop-column
+
+File: backend/app/cli/migrate_articles.py
+"""
+
+import argparse
+import logging
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from app.db.migrations import add_article_link, backfill_article_hashes
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+
+def _prepare_schema():
+    # The API adds the column at startup too; this also sets lz4 on article bodies
+    has_text_column = add_article_link(engine)
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE articles ALTER COLUMN text_input SET COMPRESSION lz4"))
+    return has_text_column
+
+
+def _drop_text_column():
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("--drop-column is only supported on PostgreSQL")
+    with engine.begin() as conn:
+        remaining = conn.scalar(text("SELECT count(*) FROM predictions WHERE article_hash IS NULL"))
+        if remaining:
+            raise SystemExit(f"{remaining} predictions are not linked to an article yet; run without --drop-column first")
+        conn.execute(text("ALTER TABLE predictions ALTER COLUMN article_hash SET NOT NULL"))
+        conn.execute(text("ALTER TABLE predictions DROP COLUMN text_input"))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Deduplicate prediction texts into the articles table")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Predictions per transaction")
+    parser.add_argument("--drop-column", action="store_true", help="Drop predictions.text_input once every row is linked")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    has_text_column = _prepare_schema()
+    if has_text_column:
+        # Waits for a backfill an API process may already be running
+        migrated = backfill_article_hashes(engine, args.batch_size, wait=True)
+        with engine.connect() as conn:
+            article_count = conn.scalar(text("SELECT count(*) FROM articles"))
+        logger.info(f"✅ Linked {migrated} predictions; {article_count} distinct articles stored")
+        if args.drop_column:
+            _drop_text_column()
+            logger.info("✅ Dropped predictions.text_input")
+    else:
+        logger.info("✅ predictions.text_input already dropped; nothing to migrate")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Manage the monthly partitions of the predictions table (PostgreSQL)
+
+Commands:
+    status    list partitions and their approximate row counts
+    maintain  create upcoming partitions and apply the retention policy now
+    convert   turn an existing unpartitioned predictions table into a
+              partitioned one (one transaction; writes to predictions block
+              until it finishes, reads keep working)
+
+Usage (from backend/):
+    python -m app.cli.partitions status
+    python -m app.cli.partitions maintain --retention-months 12 --archive-dir /backups/predictions
+    python -m app.cli.partitions convert
+
+`convert` needs every prediction linked to an article
+(run `python -m app.cli.migrate_articles` first).
+
+File: backend/app/cli/partitions.py
+"""
+
+import argparse
+import json
+import logging
+import time
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db import models, partitions
+from app.db.migrations import add_missing_columns
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+
+def status():
+    with engine.connect() as conn:
+        if not partitions.is_partitioned(conn):
+            print("predictions is not partitioned (run: python -m app.cli.partitions convert)")
+            return
+        rows = conn.execute(text(
+            "SELECT c.relname, greatest(c.reltuples, 0)::bigint, pg_total_relation_size(c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'predictions'::regclass ORDER BY c.relname"
+        )).all()
+    for name, estimated_rows, size in rows:
+        print(f"{name:28} ~{estimated_rows:>12} rows  {size / 1024 / 1024:10.1f} MB")
+
+
+def convert(months_ahead: int):
+    started = time.perf_counter()
+    add_missing_columns(engine, models.Prediction)
+    with engine.begin() as conn:
+        if engine.dialect.name != "postgresql":
+            raise SystemExit("Partitioning is only supported on PostgreSQL")
+        if partitions.is_partitioned(conn):
+            logger.info("✅ predictions is already partitioned")
+            return
+
+        # Readers keep working; inserts and feedback wait for the swap
+        conn.execute(text("LOCK TABLE predictions IN EXCLUSIVE MODE"))
+        unlinked = conn.scalar(text("SELECT count(*) FROM predictions WHERE article_hash IS NULL"))
+        if unlinked:
+            raise SystemExit(f"{unlinked} predictions have no article_hash; run python -m app.cli.migrate_articles first")
+
+        sequence = conn.scalar(text("SELECT pg_get_serial_sequence('predictions', 'id')"))
+        oldest = conn.scalar(text("SELECT min(created_at) FROM predictions"))
+        first_month = partitions.month_start(oldest.date() if oldest else date.today())
+        last_month = partitions.add_months(partitions.month_start(date.today()), months_ahead)
+
+        conn.execute(text(
+            f"CREATE TABLE predictions_partitioned ({partitions.PARENT_COLUMNS}) PARTITION BY RANGE (created_at)"
+        ))
+        month = first_month
+        while month <= last_month:
+            conn.execute(text(partitions.create_partition_sql(month, parent="predictions_partitioned")))
+            month = partitions.add_months(month, 1)
+        conn.execute(text(f"CREATE TABLE {partitions.DEFAULT_PARTITION} PARTITION OF predictions_partitioned DEFAULT"))
+
+        copied = conn.execute(text(
+            "INSERT INTO predictions_partitioned (id, article_hash, label_classified, accuracy, feedback, created_at, "
+            "feedback_at, model_version, probabilities, validation_summary) "
+            "SELECT id, article_hash, label_classified, accuracy, feedback, coalesce(created_at, now()), "
+            "feedback_at, model_version, probabilities, validation_summary FROM predictions"
+        )).rowcount
+
+        # Keep the existing id sequence so ids continue where they left off
+        conn.execute(text(f"ALTER TABLE predictions_partitioned ALTER COLUMN id SET DEFAULT nextval('{sequence}')"))
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY predictions_partitioned.id"))
+        conn.execute(text("DROP TABLE predictions"))
+        conn.execute(text("ALTER TABLE predictions_partitioned RENAME TO predictions"))
+        for statement in partitions.INDEXES:
+            conn.execute(text(statement))
+        conn.execute(text("ANALYZE predictions"))
+
+    logger.info(f"✅ Partitioned predictions: {copied} rows copied in {time.perf_counter() - started:.1f}s")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Manage monthly partitions of the predictions table")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="List partitions")
+
+    maintain = commands.add_parser("maintain", help="Create upcoming partitions and archive expired ones")
+    maintain.add_argument("--months-ahead", type=int, default=settings.PARTITION_MONTHS_AHEAD)
+    maintain.add_argument("--retention-months", type=int, default=settings.PARTITION_RETENTION_MONTHS,
+                          help="Archive partitions older than this many months; 0 keeps everything")
+    maintain.add_argument("--archive-dir", default=settings.PARTITION_ARCHIVE_DIR)
+    maintain.add_argument("--prune-articles", action="store_true",
+                          help="Also delete articles that no remaining prediction references")
+
+    convert_parser = commands.add_parser("convert", help="Partition an existing unpartitioned predictions table")
+    convert_parser.add_argument("--months-ahead", type=int, default=settings.PARTITION_MONTHS_AHEAD)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "status":
+        status()
+    elif args.command == "convert":
+        convert(args.months_ahead)
+    else:
+        summary = partitions.run_maintenance(args.months_ahead, args.retention_months, args.archive_dir)
+        if args.prune_articles:
+            with engine.begin() as conn:
+                summary["pruned_articles"] = partitions.prune_articles(conn)
+        print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Logging pipeline: background writer, JSON records, request ids, sampling
+
+setup_logging() replaces the root handlers with one QueueHandler. On the
+calling (request) thread a record only gets its request id, passes the
+sampling filter, has its message merged and is put on a bounded queue; a
+QueueListener thread turns it into JSON (or text) and writes it to stderr.
+When the queue is full the record is dropped and counted in
+log_records_dropped_total instead of blocking the request.
+
+RequestIdMiddleware gives every HTTP request an id (the caller's X-Request-ID
+when it is a plausible id, otherwise a new uuid), echoes it in the
+X-Request-ID response header and puts it on every record logged while the
+request is handled, including from threadpool calls.
+
+Records logged with extra={"event": "<name>"} are sampled: LOG_SAMPLE_RATES
+("predict.done=0.1,segment.done=0.01") keeps that fraction of them, and the
+kept ones carry sample_rate so counts can be scaled back up. WARNING and
+above are never sampled out. Other extra fields become JSON keys.
+
+File: backend/app/core/logs.py
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from app.core import metrics
+from app.core.config import settings
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:\-]{1,64}")
+
+# Attributes every LogRecord has; anything else on a record came from extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def request_id() -> Optional[str]:
+    """Id of the HTTP request being handled, if any"""
+    return _request_id.get()
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """"predict.done=0.1, segment.done=0.01" -> {"predict.done": 0.1, "segment.done": 0.01}"""
+    rates = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        event, _, rate = item.partition("=")
+        try:
+            rates[event.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            raise ValueError(f"Invalid LOG_SAMPLE_RATES entry {item.strip()!r}, expected event=rate")
+    return rates
+
+
+# ────────────────────────────────────────────────
+# Filters and formatters
+# ────────────────────────────────────────────────
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request id ("-" outside requests)"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get() or "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a configured fraction of the records of each sampled event"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(getattr(record, "event", None), 1.0)
+        if rate >= 1.0:
+            return True
+        record.sample_rate = rate
+        return random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, request_id, then extra fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and key != "request_id":
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+
+# ────────────────────────────────────────────────
+# Queue handler
+# ────────────────────────────────────────────────
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread with as little work as possible on the caller's"""
+
+    def prepare(self, record):
+        # Merge args and render the traceback now, while they still describe this moment;
+        # JSON encoding and the write happen on the listener thread. The root logger has
+        # no other handler, so the record is changed in place instead of copied.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.LOG_RECORDS_DROPPED.inc()
+
+
+def setup_logging():
+    """Route all logging through the background writer (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    if settings.LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(parse_sample_rates(settings.LOG_SAMPLE_RATES)))
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    # Neither format shows the caller's file/line, thread or process, so records skip collecting them
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+    atexit.register(shutdown)
+
+
+def shutdown():
+    """Write out everything still queued and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+# ────────────────────────────────────────────────
+# Middleware
+# ────────────────────────────────────────────────
+
+class RequestIdMiddleware:
+    """ASGI middleware setting the request id for logging and echoing it in X-Request-ID"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rid = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                rid = value.decode("latin-1").strip()
+                break
+        if not rid or not _VALID_REQUEST_ID.fullmatch(rid):
+            rid = uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", rid.encode("latin-1"))]}
+            await send(message)
+
+        token = _request_id.set(rid)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_id.reset(token)
@@ -0,0 +1,181 @@
+"""
+Prometheus metrics
+
+Per-stage latency histograms for the classification pipeline, prediction and
+validation counters, input token lengths and in-flight HTTP requests, served
+at GET /metrics.
+
+Under gunicorn every worker is its own process, so gunicorn.conf.py sets
+PROMETHEUS_MULTIPROC_DIR before the workers import anything; prometheus_client
+then keeps the values in per-process files there and /metrics aggregates all
+of them. Without that variable (uvicorn, CLIs) the default in-process
+registry is used.
+
+Stages nest: "validate" includes the "segment" call it makes, and "segment"
+and "clean" are also observed for /segment, /debug/khmer and batch work.
+
+File: backend/app/core/metrics.py
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+from app.core import timing
+
+STAGES = ("clean", "segment", "validate", "tokenize", "forward", "softmax", "db_write")
+
+STAGE_SECONDS = Histogram(
+    "classifier_stage_seconds",
+    "Time spent in each classification pipeline stage",
+    ["stage"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+for _stage in STAGES:
+    STAGE_SECONDS.labels(_stage)  # export every stage from the start, even before it first runs
+
+PREDICTIONS = Counter(
+    "classifier_predictions_total",
+    "Classifications served (/predict, /predict/batch, jobs) by label and by what produced the label",
+    ["label", "model_used"],
+)
+
+VALIDATION_FAILURES = Counter(
+    "classifier_validation_failures_total",
+    "Texts rejected before classification, by validation_type",
+    ["validation_type"],
+)
+
+DUMMY_MODEL_FALLBACKS = Counter(
+    "classifier_dummy_model_fallbacks_total",
+    "Texts classified by the keyword dummy model because no real model is loaded",
+)
+
+INPUT_TOKENS = Histogram(
+    "classifier_input_tokens",
+    "Model input length in tokens after truncation (the 512 bucket minus the 511 bucket counts truncated texts)",
+    buckets=(16, 32, 64, 128, 256, 384, 511, 512),
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests being handled",
+    multiprocess_mode="livesum",
+)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+PARTITION_MAINTENANCE_FAILURES = Counter(
+    "partition_maintenance_failures_total",
+    "Failed runs of the predictions partition maintainer (creating partitions, retention)",
+)
+
+WRITE_BEHIND_DEAD_LETTERS = Counter(
+    "write_behind_dead_letters_total",
+    "Buffered rows that could not be written and were moved to the spill file",
+)
+
+WRITE_BEHIND_FALLBACKS = Counter(
+    "write_behind_fallbacks_total",
+    "Writes done synchronously because the write-behind buffer stayed full",
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records discarded because the background log queue was full",
+)
+
+
+@contextmanager
+def stage(name: str):
+    """Observe the duration of the enclosed block as pipeline stage `name` (and add it to the request's Server-Timing)"""
+    recorder = timing.current()
+    if recorder is not None:
+        recorder.enter()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(name).observe(elapsed)
+        if recorder is not None:
+            recorder.exit(name, elapsed)
+
+
+def timed(name: str):
+    """Decorator form of stage()"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_input_tokens(attention_mask):
+    """Record the token count of every row of a tokenizer attention mask"""
+    for length in attention_mask.sum(dim=1).tolist():
+        INPUT_TOKENS.observe(length)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting in-flight requests and timing each one until its
+    last body chunk is sent (so streamed responses are timed in full)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        started = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            REQUEST_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), status
+            ).observe(time.perf_counter() - started)
+
+
+def render() -> tuple:
+    """(body, content type) of the current metrics, aggregated over processes in multiprocess mode"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
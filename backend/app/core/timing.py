@@ -0,0 +1,273 @@
+"""
+Per-request stage timings (Server-Timing) and opt-in sampled profiles
+
+ServerTimingMiddleware puts a StageRecorder in a context variable for each
+HTTP request. metrics.stage() adds every pipeline stage it times to the
+current recorder (threadpool calls run in a copy of the request's context,
+so stages in worker threads land in the same recorder), and the totals go
+out in a Server-Timing header:
+
+    Server-Timing: validate;dur=41.2, segment;dur=38.9, forward;dur=120.4, total;dur=171.0
+
+Stages finished after the response has started (streamed bodies) are not
+included. With no recorder active, stage() pays one ContextVar lookup.
+
+With PROFILING_ENABLED, a request sent with "X-Profile: 1" (or picked at
+PROFILE_SAMPLE_RATE) is also profiled: a sampler thread records the Python
+stack of every thread currently inside one of the request's stages each
+PROFILE_INTERVAL_MS. The result is written to PROFILE_DIR (shared by all
+workers), its id is returned in X-Profile-Id, and it is served by
+GET /debug/profiles/{id}.
+
+File: backend/app/core/timing.py
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_recorder: ContextVar[Optional["StageRecorder"]] = ContextVar("stage_recorder", default=None)
+
+
+class StageRecorder:
+    """Summed duration and call count per stage for one request"""
+
+    def __init__(self, profiled: bool = False):
+        self.started = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.profiled = profiled
+        # Threads inside one of this request's stages (ident -> nesting depth), for the sampler
+        self.active_threads: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def enter(self):
+        if self.profiled:
+            ident = threading.get_ident()
+            with self._lock:
+                self.active_threads[ident] = self.active_threads.get(ident, 0) + 1
+
+    def exit(self, stage: str, seconds: float):
+        with self._lock:
+            self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+            if self.profiled:
+                ident = threading.get_ident()
+                depth = self.active_threads.get(ident, 0) - 1
+                if depth > 0:
+                    self.active_threads[ident] = depth
+                else:
+                    self.active_threads.pop(ident, None)
+
+    def threads(self) -> List[int]:
+        with self._lock:
+            return list(self.active_threads)
+
+    def header(self) -> str:
+        with self._lock:
+            parts = []
+            for stage, seconds in self.durations.items():
+                part = f"{stage};dur={seconds * 1000:.1f}"
+                if self.calls[stage] > 1:
+                    part += f';desc="{self.calls[stage]} calls"'
+                parts.append(part)
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def current() -> Optional[StageRecorder]:
+    return _recorder.get()
+
+
+# ────────────────────────────────────────────────
+# Sampling profiler
+# ────────────────────────────────────────────────
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Background thread sampling the stacks of a recorder's active threads"""
+
+    def __init__(self, recorder: StageRecorder, interval: float):
+        self.recorder = recorder
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            idents = self.recorder.threads()
+            if not idents:
+                continue
+            frames = sys._current_frames()
+            for ident in idents:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[";".join(reversed(stack))] += 1
+                    self.samples += 1
+
+    def report(self, top: int = 30) -> dict:
+        """Folded stacks (flamegraph.pl / speedscope input) and the functions most often on top"""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+        samples = max(self.samples, 1)
+        return {
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "top_self": [
+                {"function": f, "samples": n, "percent": round(100 * n / samples, 1)}
+                for f, n in self_counts.most_common(top)
+            ],
+            "top_total": [
+                {"function": f, "samples": n, "percent": round(100 * n / samples, 1)}
+                for f, n in total_counts.most_common(top)
+            ],
+            "folded": "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()),
+        }
+
+
+def _wants_profile(scope) -> bool:
+    if not settings.PROFILING_ENABLED:
+        return False
+    for name, value in scope.get("headers", []):
+        if name == b"x-profile":
+            return value.strip().lower() in (b"1", b"true", b"yes")
+    return settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+def _save_profile(profile: dict):
+    directory = settings.PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{profile['id']}.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+    # Keep only the most recent PROFILE_KEEP profiles. Every worker prunes the shared
+    # directory, so a file listed here may already be gone by the time it is stat'ed or
+    # removed; that race is harmless because the OSError is caught and the file is gone
+    # either way.
+    files = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".json")]
+    if len(files) > settings.PROFILE_KEEP:
+        files.sort(key=_mtime)
+        for old in files[:len(files) - settings.PROFILE_KEEP]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def load_profile(profile_id: str) -> Optional[dict]:
+    """A saved profile by id, or None (ids are uuid hex, so no path tricks get through)"""
+    try:
+        uuid.UUID(hex=profile_id)
+    except ValueError:
+        return None
+    path = os.path.join(settings.PROFILE_DIR, f"{profile_id}.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        # Never saved, or pruned by another worker
+        return None
+
+
+# ────────────────────────────────────────────────
+# Middleware
+# ────────────────────────────────────────────────
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding a Server-Timing header and, on request, a sampled profile"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.SERVER_TIMING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        recorder = StageRecorder(profiled=_wants_profile(scope))
+        sampler = None
+        profile_id = None
+        if recorder.profiled:
+            profile_id = uuid.uuid4().hex
+            sampler = StackSampler(recorder, settings.PROFILE_INTERVAL_MS / 1000)
+            sampler.start()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", recorder.header().encode("latin-1")))
+                if profile_id:
+                    headers.append((b"x-profile-id", profile_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _recorder.set(recorder)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _recorder.reset(token)
+            if sampler is not None:
+                # Joining the sampler and writing JSON block; keep them off the event loop
+                await run_in_threadpool(_finish_profile, scope, recorder, sampler, profile_id)
+
+
+def _finish_profile(scope, recorder: StageRecorder, sampler: StackSampler, profile_id: str):
+    sampler.stop()
+    profile = {
+        "id": profile_id,
+        "method": scope["method"],
+        "path": scope["path"],
+        "duration_ms": round((time.perf_counter() - recorder.started) * 1000, 1),
+        "stages_ms": {stage: round(s * 1000, 1) for stage, s in recorder.durations.items()},
+        **sampler.report(),
+    }
+    try:
+        _save_profile(profile)
+        logger.info(f"🔬 Profiled {scope['method']} {scope['path']}: {profile['samples']} samples, id {profile_id}")
+    except OSError as e:
+        logger.warning(f"⚠️ Could not save profile {profile_id}: {e}")
@@ -0,0 +1,52 @@
+"""
+Content-addressed article storage
+
+Article bodies live once in `articles`, keyed by the SHA-256 of their
+normalized text (see preprocessing.content_hash); predictions reference them
+by `article_hash`. Large bodies are compressed by Postgres TOAST (lz4, set in
+init.sql), which keeps them searchable and transparently readable.
+"""
+
+from datetime import datetime
+from typing import Iterable, List
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.db import models
+from app.ml.preprocessing import content_hash
+
+
+def article_row(text_input: str) -> dict:
+    return {
+        "content_hash": content_hash(text_input),
+        "text_input": text_input,
+        "char_count": len(text_input),
+        "created_at": datetime.utcnow(),
+    }
+
+
+def unique_rows(rows: Iterable[dict]) -> List[dict]:
+    """One row per hash, the earliest (a multi-row upsert may not touch the same key twice)"""
+    unique = {}
+    for row in rows:
+        kept = unique.get(row["content_hash"])
+        if kept is None or row["created_at"] < kept["created_at"]:
+            unique[row["content_hash"]] = row
+    return list(unique.values())
+
+
+def upsert_statement(dialect_name: str, rows: List[dict]):
+    """
+    INSERT ... ON CONFLICT (content_hash): the first copy of an article wins,
+    but created_at moves back to the earliest row seen. Search relies on an
+    article being no newer than any of its predictions (backfills link
+    predictions out of time order).
+    """
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    statement = dialect_insert(models.Article.__table__).values(rows)
+    table = models.Article.__table__
+    return statement.on_conflict_do_update(
+        index_elements=["content_hash"],
+        set_={"created_at": statement.excluded.created_at},
+        where=statement.excluded.created_at < table.c.created_at
+    )
@@ -0,0 +1,306 @@
+"""
+Async versions of the crud functions used on the prediction and history paths
+
+These run on the asyncpg engine (see session.get_async_db) so DB-bound
+endpoints await Postgres instead of blocking threadpool threads that
+inference needs. Semantics match the sync functions in crud.py.
+"""
+
+from sqlalchemy import CHAR, any_, bindparam, select, func, text, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+from app.core.config import settings
+from app.db import articles, models, partitions, rollups
+from app.db.pagination import CountCache
+from datetime import datetime, date, time, timedelta
+from decimal import Decimal
+from typing import List, Optional, Sequence, Tuple
+
+_total_count_cache = CountCache(ttl=settings.TOTAL_COUNT_CACHE_SECONDS)
+
+# Fields a history listing can project; text_preview/text_length are computed in SQL.
+# Text fields come from the articles table, which is only joined when one is requested.
+HISTORY_FIELDS = ("id", "text_input", "label_classified", "accuracy", "feedback", "created_at", "text_preview", "text_length")
+
+
+def _history_select(fields: Optional[Sequence[str]], preview_chars: int, join_articles: bool = False):
+    """Full ORM rows when fields is None, otherwise only the requested columns"""
+    prediction, article = models.Prediction, models.Article
+    if fields is None:
+        if join_articles:
+            # Filter on the joined article and load it from the same join
+            return select(prediction).join(prediction.article).options(contains_eager(prediction.article))
+        return select(prediction)
+    
+    # id and created_at are always fetched: they make up the keyset cursor
+    columns = {"id": prediction.id, "created_at": prediction.created_at}
+    for field in fields:
+        if field == "text_input":
+            columns[field] = article.text_input
+        elif field == "text_preview":
+            columns[field] = func.substr(article.text_input, 1, preview_chars).label(field)
+        elif field == "text_length":
+            columns[field] = article.char_count.label(field)
+        else:
+            columns[field] = getattr(prediction, field)
+    query = select(*columns.values())
+    if join_articles or {"text_input", "text_preview", "text_length"} & set(fields):
+        query = query.join(article, prediction.article_hash == article.content_hash)
+    return query
+
+
+def _after_cursor(query, cursor: Optional[Tuple[datetime, int]]):
+    """Keyset condition plus newest-first order, shared by history and search"""
+    if cursor is not None:
+        # The plain created_at bound is redundant but lets Postgres prune newer partitions
+        query = query.where(
+            models.Prediction.created_at <= cursor[0],
+            tuple_(models.Prediction.created_at, models.Prediction.id) < tuple_(*cursor)
+        )
+    return query.order_by(models.Prediction.created_at.desc(), models.Prediction.id.desc())
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _in_hashes(db: AsyncSession, hashes: List[str]):
+    """article_hash IN hashes; one array parameter on Postgres (thousands of IN parameters are slow to render)"""
+    if db.bind.dialect.name == "postgresql":
+        return models.Prediction.article_hash == any_(bindparam("hashes", hashes, type_=postgresql.ARRAY(CHAR(64))))
+    return models.Prediction.article_hash.in_(hashes)
+
+
+async def _fetch_history(db: AsyncSession, query, projected: bool):
+    if projected:
+        return [dict(row) for row in (await db.execute(query)).mappings().all()]
+    return (await db.scalars(query)).all()
+
+
+async def create_prediction(
+    db: AsyncSession,
+    text_input: str,
+    label_classified: str,
+    accuracy: float,
+    feedback: bool = None,
+    model_version: str = None,
+    probabilities: Optional[List[float]] = None,
+    validation_summary: dict = None
+):
+    article = articles.article_row(text_input)
+    await db.execute(articles.upsert_statement(db.bind.dialect.name, [article]))
+    prediction = models.Prediction(
+        article_hash=article["content_hash"],
+        label_classified=label_classified,
+        accuracy=Decimal(str(accuracy)),
+        feedback=feedback,
+        created_at=datetime.utcnow(),
+        model_version=model_version,
+        probabilities=models.pack_probabilities(probabilities),
+        validation_summary=validation_summary
+    )
+    if feedback is not None:
+        prediction.feedback_at = prediction.created_at
+    db.add(prediction)
+    await db.execute(rollups.upsert_statement(db.bind.dialect.name, [
+        rollups.prediction_delta(prediction.created_at, label_classified, prediction.accuracy, feedback)
+    ]))
+    await db.commit()
+    await db.refresh(prediction, ["article"])
+    return prediction
+
+
+async def get_prediction_stats(db: AsyncSession, date_from: date = None, date_to: date = None, label: str = None):
+    """Get prediction statistics from the daily rollup"""
+    rows = (await db.execute(rollups.stats_query(date_from, date_to, label))).all()
+    return rollups.summarize(rows)
+
+
+async def get_total_predictions(db: AsyncSession):
+    return await db.scalar(select(func.count(models.Prediction.id)))
+
+
+async def estimate_total_predictions(db: AsyncSession) -> int:
+    """
+    Cheap approximate row count.
+    
+    On PostgreSQL this reads the planner estimate (pg_class.reltuples, kept
+    fresh by autovacuum/ANALYZE), summed over the monthly partitions when the
+    table is partitioned (the parent itself stores no rows); elsewhere, or before the table was ever
+    analyzed, it falls back to an exact count cached for TOTAL_COUNT_CACHE_SECONDS.
+    """
+    cached = _total_count_cache.get()
+    if cached is not None:
+        return cached
+    
+    estimate = None
+    if db.bind.dialect.name == "postgresql":
+        # -1 means "never analyzed"; empty future partitions stay at -1
+        estimate = await db.scalar(text(
+            "SELECT CASE WHEN max(c.reltuples) < 0 THEN -1 ELSE sum(greatest(c.reltuples, 0)) END::bigint "
+            "FROM pg_class c WHERE c.oid IN ("
+            "  SELECT inhrelid FROM pg_inherits WHERE inhparent = 'predictions'::regclass"
+            ") OR (c.oid = 'predictions'::regclass AND c.relkind = 'r')"
+        ))
+    if estimate is None or estimate < 0:
+        estimate = await get_total_predictions(db)
+    
+    _total_count_cache.set(int(estimate))
+    return int(estimate)
+
+
+async def get_predictions_by_cursor(
+    db: AsyncSession,
+    cursor: Optional[Tuple[datetime, int]],
+    limit: int = 10,
+    fields: Optional[Sequence[str]] = None,
+    preview_chars: int = 100
+):
+    """
+    Keyset pagination: the `limit` most recent predictions strictly older than
+    the (created_at, id) cursor. Returns (predictions, has_more); predictions
+    are ORM objects, or dicts of the requested fields when `fields` is given.
+    """
+    query = _after_cursor(_history_select(fields, preview_chars), cursor).limit(limit + 1)
+    predictions = await _fetch_history(db, query, fields is not None)
+    return predictions[:limit], len(predictions) > limit
+
+
+async def search_predictions(
+    db: AsyncSession,
+    query: str,
+    label: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    limit: int = 10,
+    fields: Optional[Sequence[str]] = None,
+    preview_chars: int = 100
+):
+    """
+    Predictions whose article contains `query` (case-insensitive substring),
+    newest first, with keyset pagination like get_predictions_by_cursor.
+    
+    The matching articles are found first. On PostgreSQL the ILIKE is
+    answered from the pg_trgm GIN index on articles.text_input, which works
+    on character trigrams and therefore needs no word boundaries (Khmer is
+    written without spaces). Their predictions are then read one month at a
+    time, newest first, so each query touches a single partition and the
+    search stops as soon as the page is full. An article is created with its
+    first prediction, so articles newer than a month are left out of that
+    month's lookup and the oldest article bounds how far back to look.
+    """
+    prediction, article = models.Prediction, models.Article
+    if db.bind.dialect.name == "postgresql":
+        # asyncpg prepares statements, and after a few runs Postgres may switch to a generic
+        # plan, which can't use the trigram index for "ILIKE $1" nor pick the index that
+        # suits each month's hashes
+        await db.execute(text("SET LOCAL plan_cache_mode = force_custom_plan"))
+    pattern = article.text_input.ilike(f"%{_escape_like(query)}%", escape="\\")
+    hits = (await db.execute(
+        select(article.content_hash, article.created_at)
+        .where(pattern)
+        .order_by(article.created_at.desc().nulls_last())
+        .limit(settings.SEARCH_MAX_ARTICLES + 1)
+    )).all()
+    if not hits:
+        return [], False
+    hashes, created = map(list, zip(*hits))
+    # Too many to list: match each month's predictions against the pattern instead
+    by_pattern = len(hashes) > settings.SEARCH_MAX_ARTICLES
+    
+    statement = _history_select(fields, preview_chars, join_articles=by_pattern)
+    newest = datetime.max if cursor is None else cursor[0]
+    oldest = None if by_pattern else created[-1]
+    if label:
+        statement = statement.where(prediction.label_classified == label)
+    if date_from:
+        statement = statement.where(prediction.created_at >= datetime.combine(date_from, time.min))
+        oldest = max(oldest or datetime.min, datetime.combine(date_from, time.min))
+    if date_to:
+        statement = statement.where(prediction.created_at < datetime.combine(date_to + timedelta(days=1), time.min))
+        newest = min(newest, datetime.combine(date_to, time.max))
+    statement = _after_cursor(statement, cursor)
+    
+    # Only walk the months that hold predictions
+    span = (await db.execute(select(func.min(prediction.created_at), func.max(prediction.created_at)))).one()
+    if span[1] is None:
+        return [], False
+    newest = min(newest, span[1])
+    oldest = max(oldest or span[0], span[0])
+    
+    predictions = []
+    newer = 0  # hits[:newer] are articles created after the current month
+    month = partitions.month_start(newest.date())
+    while len(predictions) <= limit and month >= partitions.month_start(oldest.date()):
+        month_end = datetime.combine(partitions.add_months(month, 1), time.min)
+        if by_pattern:
+            matching = pattern
+        else:
+            while newer < len(created) and created[newer] is not None and created[newer] >= month_end:
+                newer += 1
+            if newer == len(hashes):
+                break
+            matching = _in_hashes(db, hashes[newer:])
+        predictions += await _fetch_history(db, statement.where(
+            prediction.created_at >= datetime.combine(month, time.min),
+            prediction.created_at < month_end,
+            matching
+        ).limit(limit + 1 - len(predictions)), fields is not None)
+        month = partitions.add_months(month, -1)
+    return predictions[:limit], len(predictions) > limit
+
+
+async def get_predictions_with_pagination(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 10,
+    fields: Optional[Sequence[str]] = None,
+    preview_chars: int = 100
+):
+    """Get predictions with pagination, ordered by most recent first"""
+    query = _history_select(fields, preview_chars)\
+        .order_by(models.Prediction.created_at.desc(), models.Prediction.id.desc())\
+        .offset(skip)\
+        .limit(limit)
+    return await _fetch_history(db, query, fields is not None)
+
+
+async def get_prediction(db: AsyncSession, prediction_id: int):
+    return await db.get(models.Prediction, prediction_id)
+
+
+async def update_prediction_feedback(db: AsyncSession, prediction_id: int, feedback: bool):
+    # Lock the row until commit: the rollup delta depends on the feedback read here, so two
+    # concurrent updates must not both see the same old value. "of" keeps the lock off the
+    # joined article (FOR UPDATE cannot apply to the nullable side of an outer join).
+    result = await db.execute(
+        select(models.Prediction)
+        .where(models.Prediction.id == prediction_id)
+        .with_for_update(of=models.Prediction)
+        .execution_options(populate_existing=True)
+    )
+    prediction = result.scalars().first()
+    if prediction:
+        old_feedback = prediction.feedback
+        prediction.feedback = feedback
+        prediction.feedback_at = datetime.utcnow()
+        await db.execute(rollups.upsert_statement(db.bind.dialect.name, [
+            rollups.feedback_delta(prediction.created_at, prediction.label_classified, old_feedback, feedback)
+        ]))
+        await db.commit()
+        await db.refresh(prediction, ["feedback", "feedback_at", "article"])
+    return prediction
+
+
+async def create_error_log(db: AsyncSession, error_message: str, error_type: str = "OTHER", endpoint: str = None):
+    error_log = models.ErrorLog(
+        error_message=error_message,
+        error_type=error_type,
+        endpoint=endpoint
+    )
+    db.add(error_log)
+    await db.commit()
+    await db.refresh(error_log)
+    return error_log
@@ -1,36 +1,48 @@
 from sqlalchemy.orm import Session
-from app.db import models
+from sqlalchemy import insert, update, or_, and_
+from app.db import articles, models, rollups
+from datetime import datetime, date
 from decimal import Decimal
+from typing import Iterable, Iterator, List, Dict, Any, Optional
+import uuid
 
 def create_prediction(
     db: Session,
     text_input: str,
     label_classified: str,
     accuracy: float,
-    feedback: bool = None
+    feedback: bool = None,
+    model_version: str = None,
+    probabilities: Optional[List[float]] = None,
+    validation_summary: dict = None
 ):
+    article = articles.article_row(text_input)
+    db.execute(articles.upsert_statement(db.bind.dialect.name, [article]))
     prediction = models.Prediction(
-        text_input=text_input,
+        article_hash=article["content_hash"],
         label_classified=label_classified,
         accuracy=Decimal(str(accuracy)),
-        feedback=feedback
+        feedback=feedback,
+        created_at=datetime.utcnow(),
+        model_version=model_version,
+        probabilities=models.pack_probabilities(probabilities),
+        validation_summary=validation_summary
     )
+    if feedback is not None:
+        prediction.feedback_at = prediction.created_at
     db.add(prediction)
+    db.execute(rollups.upsert_statement(db.bind.dialect.name, [
+        rollups.prediction_delta(prediction.created_at, label_classified, prediction.accuracy, feedback)
+    ]))
     db.commit()
     db.refresh(prediction)
     return prediction
 
 
-def get_prediction_stats(db: Session):
-    """Get prediction statistics"""
-    total = db.query(models.Prediction).count()
-    with_feedback = db.query(models.Prediction).filter(models.Prediction.feedback.isnot(None)).count()
-    
-    return {
-        "total_predictions": total,
-        "predictions_with_feedback": with_feedback,
-        "feedback_percentage": (with_feedback / total * 100) if total > 0 else 0,
-    }
+def get_prediction_stats(db: Session, date_from: date = None, date_to: date = None, label: str = None):
+    """Get prediction statistics from the daily rollup"""
+    rows = db.execute(rollups.stats_query(date_from, date_to, label)).all()
+    return rollups.summarize(rows)
 
 def get_predictions(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Prediction).offset(skip).limit(limit).all()
@@ -41,7 +53,7 @@ def get_total_predictions(db: Session):
 def get_predictions_with_pagination(db: Session, skip: int = 0, limit: int = 10):
     """Get predictions with pagination, ordered by most recent first"""
     return db.query(models.Prediction)\
-        .order_by(models.Prediction.created_at.desc())\
+        .order_by(models.Prediction.created_at.desc(), models.Prediction.id.desc())\
         .offset(skip)\
         .limit(limit)\
         .all()
@@ -50,9 +62,19 @@ def get_prediction(db: Session, prediction_id: int):
     return db.query(models.Prediction).filter(models.Prediction.id == prediction_id).first()
 
 def update_prediction_feedback(db: Session, prediction_id: int, feedback: bool):
-    prediction = get_prediction(db, prediction_id)
+    # Row lock until commit, so concurrent updates cannot apply deltas from the same old feedback
+    prediction = db.query(models.Prediction)\
+        .filter(models.Prediction.id == prediction_id)\
+        .with_for_update(of=models.Prediction)\
+        .populate_existing()\
+        .first()
     if prediction:
+        old_feedback = prediction.feedback
         prediction.feedback = feedback
+        prediction.feedback_at = datetime.utcnow()
+        db.execute(rollups.upsert_statement(db.bind.dialect.name, [
+            rollups.feedback_delta(prediction.created_at, prediction.label_classified, old_feedback, feedback)
+        ]))
         db.commit()
         db.refresh(prediction)
     return prediction
@@ -66,4 +88,158 @@ def create_error_log(db: Session, error_message: str, error_type: str = "OTHER",
     db.add(error_log)
     db.commit()
     db.refresh(error_log)
-    return error_log
\ No newline at end of file
+    return error_log
+
+
+# ────────────────────────────────────────────────
+# Bulk classification jobs
+# ────────────────────────────────────────────────
+
+JOB_ITEM_INSERT_CHUNK = 1000
+
+def create_job(db: Session, items: Iterable[Dict[str, Any]], batch_size: int):
+    """Create a queued job from an iterable of {"text_input", "external_id"} dicts (an empty one is completed at once)"""
+    job = models.ClassificationJob(
+        id=str(uuid.uuid4()),
+        status="queued",
+        batch_size=batch_size
+    )
+    db.add(job)
+    db.flush()
+    
+    total = 0
+    chunk = []
+    for item in items:
+        chunk.append({"job_id": job.id, "seq": total, **item})
+        total += 1
+        if len(chunk) >= JOB_ITEM_INSERT_CHUNK:
+            db.execute(insert(models.JobItem), chunk)
+            chunk = []
+    if chunk:
+        db.execute(insert(models.JobItem), chunk)
+    
+    job.total_items = total
+    if total == 0:
+        job.status = "completed"
+        job.finished_at = datetime.utcnow()
+    db.commit()
+    db.refresh(job)
+    return job
+
+def get_job(db: Session, job_id: str):
+    return db.query(models.ClassificationJob).filter(models.ClassificationJob.id == job_id).first()
+
+def claim_next_job(db: Session, worker_id: str, stale_before: datetime):
+    """Claim the oldest queued job, or a running job whose worker stopped heartbeating"""
+    job = db.query(models.ClassificationJob)\
+        .filter(or_(
+            models.ClassificationJob.status == "queued",
+            and_(
+                models.ClassificationJob.status == "running",
+                models.ClassificationJob.heartbeat_at < stale_before
+            )
+        ))\
+        .order_by(models.ClassificationJob.created_at)\
+        .with_for_update(skip_locked=True)\
+        .first()
+    if job:
+        now = datetime.utcnow()
+        job.status = "running"
+        job.worker_id = worker_id
+        job.started_at = job.started_at or now
+        job.heartbeat_at = now
+        db.commit()
+        db.refresh(job)
+    return job
+
+def get_job_items(db: Session, job_id: str, start_seq: int, limit: int) -> List[models.JobItem]:
+    return db.query(models.JobItem)\
+        .filter(models.JobItem.job_id == job_id, models.JobItem.seq >= start_seq)\
+        .order_by(models.JobItem.seq)\
+        .limit(limit)\
+        .all()
+
+def save_job_batch(db: Session, job_id: str, worker_id: str, checkpoint: int, items: List[models.JobItem], results: List[Dict[str, Any]]) -> bool:
+    """
+    Store one batch of results and advance the checkpoint in the same transaction.
+    
+    Returns False (and stores nothing) if another worker took the job over or
+    the checkpoint moved, so a batch is never recorded twice.
+    """
+    failed = sum(1 for r in results if not r["valid"])
+    advanced = db.execute(
+        update(models.ClassificationJob)
+        .where(
+            models.ClassificationJob.id == job_id,
+            models.ClassificationJob.worker_id == worker_id,
+            models.ClassificationJob.processed_items == checkpoint
+        )
+        .values(
+            processed_items=checkpoint + len(items),
+            failed_items=models.ClassificationJob.failed_items + failed,
+            heartbeat_at=datetime.utcnow()
+        )
+    ).rowcount
+    if not advanced:
+        db.rollback()
+        return False
+    
+    db.execute(insert(models.JobResult), [
+        {
+            "job_id": job_id,
+            "seq": item.seq,
+            "external_id": item.external_id,
+            "label_classified": result["category"] if result["valid"] else None,
+            "accuracy": Decimal(str(round(result["confidence"], 2))) if result["valid"] else None,
+            "error_message": result.get("error")
+        }
+        for item, result in zip(items, results)
+    ])
+    db.commit()
+    return True
+
+def touch_job(db: Session, job_id: str, worker_id: str) -> bool:
+    """Refresh the heartbeat of a job this worker holds; False if another worker took it over"""
+    touched = db.execute(
+        update(models.ClassificationJob)
+        .where(models.ClassificationJob.id == job_id, models.ClassificationJob.worker_id == worker_id)
+        .values(heartbeat_at=datetime.utcnow())
+    ).rowcount
+    db.commit()
+    return bool(touched)
+
+def finish_job(db: Session, job_id: str, worker_id: str, status: str, error_message: Optional[str] = None) -> bool:
+    """Mark a job this worker is running as completed/failed; False if another worker took it over"""
+    finished = db.execute(
+        update(models.ClassificationJob)
+        .where(
+            models.ClassificationJob.id == job_id,
+            models.ClassificationJob.worker_id == worker_id,
+            models.ClassificationJob.status == "running"
+        )
+        .values(status=status, error_message=error_message, finished_at=datetime.utcnow())
+    ).rowcount
+    db.commit()
+    return bool(finished)
+
+def release_job(db: Session, job_id: str, worker_id: str) -> bool:
+    """Put a job this worker is running back in the queue; it resumes from its checkpoint"""
+    released = db.execute(
+        update(models.ClassificationJob)
+        .where(
+            models.ClassificationJob.id == job_id,
+            models.ClassificationJob.worker_id == worker_id,
+            models.ClassificationJob.status == "running"
+        )
+        .values(status="queued", worker_id=None)
+    ).rowcount
+    db.commit()
+    return bool(released)
+
+def iter_job_results(db: Session, job_id: str, batch_size: int = 500) -> Iterator[models.JobResult]:
+    """Stream a job's results in upload order without loading them all"""
+    return db.query(models.JobResult)\
+        .filter(models.JobResult.job_id == job_id)\
+        .order_by(models.JobResult.seq)\
+        .execution_options(stream_results=True)\
+        .yield_per(batch_size)
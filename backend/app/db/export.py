@@ -0,0 +1,120 @@
+"""
+Training-data export of feedback-labelled predictions
+
+Rows are read with a server-side cursor (yield_per), so memory stays
+constant however many predictions match. Each record carries what
+retraining needs (article text, predicted label, whether a user confirmed
+or rejected it) and what distillation needs (the stored softmax vector and
+the model version that produced it).
+
+Incremental exports use a watermark on feedback_at: an export covers
+feedback given in (since, until], and `until` becomes the next export's
+`since`. `until` lags the clock by EXPORT_WATERMARK_LAG_SECONDS so rows
+whose feedback transaction commits late are not skipped. Feedback that
+changes later is exported again; consumers should upsert on `id`.
+
+File: backend/app/db/export.py
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import models
+
+# Column order of exported records
+EXPORT_FIELDS = (
+    "id", "content_hash", "text", "label", "feedback", "accuracy",
+    "model_version", "probabilities", "created_at", "feedback_at",
+)
+
+
+def watermark_now() -> datetime:
+    """Upper bound for an export started now"""
+    return datetime.utcnow() - timedelta(seconds=settings.EXPORT_WATERMARK_LAG_SECONDS)
+
+
+def parse_watermark(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid watermark: {value!r} (expected an ISO timestamp)")
+
+
+def training_query(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    label: Optional[str] = None
+):
+    prediction, article = models.Prediction, models.Article
+    # Rows from before feedback_at existed fall back to their creation time
+    feedback_time = func.coalesce(prediction.feedback_at, prediction.created_at)
+    query = select(
+        prediction.id,
+        prediction.article_hash,
+        article.text_input,
+        prediction.label_classified,
+        prediction.feedback,
+        prediction.accuracy,
+        prediction.model_version,
+        prediction.probabilities,
+        prediction.created_at,
+        feedback_time.label("feedback_at"),
+    ).join(article, prediction.article_hash == article.content_hash)\
+        .where(prediction.feedback.is_not(None))
+
+    if since is not None:
+        query = query.where(feedback_time > since)
+    if until is not None:
+        query = query.where(feedback_time <= until)
+    if date_from:
+        query = query.where(prediction.created_at >= datetime.combine(date_from, time.min))
+    if date_to:
+        query = query.where(prediction.created_at < datetime.combine(date_to + timedelta(days=1), time.min))
+    if label:
+        query = query.where(prediction.label_classified == label)
+    return query.order_by(feedback_time, prediction.id)
+
+
+def to_record(row) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "content_hash": row.article_hash,
+        "text": row.text_input,
+        "label": row.label_classified,
+        "feedback": row.feedback,
+        "accuracy": float(row.accuracy) if row.accuracy is not None else None,
+        "model_version": row.model_version,
+        "probabilities": models.unpack_probabilities(row.probabilities),
+        "created_at": row.created_at,
+        "feedback_at": row.feedback_at,
+    }
+
+
+def iter_training_records(db: Session, batch_size: int = 1000, **filters) -> Iterator[Dict[str, Any]]:
+    """Stream export records; filters are those of training_query"""
+    result = db.execute(training_query(**filters).execution_options(stream_results=True, yield_per=batch_size))
+    for row in result:
+        yield to_record(row)
+
+
+def parquet_schema():
+    """Explicit schema so every part/row group agrees even when a batch has only NULLs"""
+    import pyarrow as pa
+    return pa.schema([
+        ("id", pa.int64()),
+        ("content_hash", pa.string()),
+        ("text", pa.string()),
+        ("label", pa.string()),
+        ("feedback", pa.bool_()),
+        ("accuracy", pa.float64()),
+        ("model_version", pa.string()),
+        ("probabilities", pa.list_(pa.float32())),
+        ("created_at", pa.timestamp("us")),
+        ("feedback_at", pa.timestamp("us")),
+    ])
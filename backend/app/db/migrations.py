@@ -0,0 +1,215 @@
+"""
+Additive schema upgrades for existing databases
+
+create_all() only creates missing tables. Nullable columns that were added to
+a model later are added here with ALTER TABLE at startup, so older databases
+keep working without a manual migration. Columns the model no longer maps
+(e.g. predictions.text_input until app.cli.migrate_articles --drop-column)
+lose their NOT NULL, since new rows leave them empty.
+
+Databases from before the articles table get predictions.article_hash as a
+nullable column at startup, and a background thread links the existing rows
+to articles (one process at a time, batch by batch, resumable); until it
+finishes, unlinked predictions are missing from history and search.
+app.cli.migrate_articles runs the same backfill in the foreground and
+finishes the migration. Anything else has its own command in app/cli/.
+
+Indexes that are too expensive to build during startup are created by
+running this module by hand (from backend/):
+    python -m app.db.migrations
+"""
+
+import logging
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import DateTime, Integer, Text, inspect, text
+from sqlalchemy.schema import CreateColumn
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant for pg_advisory_lock: one article backfill at a time across workers
+ARTICLE_BACKFILL_LOCK_ID = 72_0035
+
+
+def add_missing_columns(engine, model) -> list:
+    """ALTER TABLE ... ADD COLUMN for every nullable model column the table lacks"""
+    table = model.__table__
+    existing = {column["name"]: column for column in inspect(engine).get_columns(table.name)}
+    added = []
+    with engine.begin() as conn:
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            ddl = CreateColumn(column).compile(dialect=engine.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+            added.append(column.name)
+    if added:
+        logger.info(f"🛠️ Added columns to {table.name}: {', '.join(added)}")
+    relax_unmapped_columns(engine, table, existing)
+    return added
+
+
+def relax_unmapped_columns(engine, table, existing: dict = None) -> list:
+    """ALTER COLUMN ... DROP NOT NULL for NOT NULL columns the model no longer writes"""
+    if existing is None:
+        existing = {column["name"]: column for column in inspect(engine).get_columns(table.name)}
+    unmapped = [name for name, column in existing.items() if name not in table.columns and not column["nullable"]]
+    if not unmapped:
+        return []
+    if engine.dialect.name != "postgresql":
+        logger.warning(f"⚠️ {table.name} has NOT NULL columns the model no longer writes ({', '.join(unmapped)}); "
+                       f"inserts will fail until they are dropped")
+        return []
+    with engine.begin() as conn:
+        for name in unmapped:
+            conn.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN {name} DROP NOT NULL"))
+    logger.info(f"🛠️ Dropped NOT NULL on {table.name} columns no longer written: {', '.join(unmapped)}")
+    return unmapped
+
+
+# ────────────────────────────────────────────────
+# predictions.text_input -> articles
+# ────────────────────────────────────────────────
+
+def add_article_link(engine) -> bool:
+    """Add predictions.article_hash (nullable, indexed) if missing; True while predictions still has text_input"""
+    from app.db import models
+
+    models.Base.metadata.create_all(bind=engine, tables=[models.Article.__table__])
+    columns = {column["name"] for column in inspect(engine).get_columns("predictions")}
+    if "article_hash" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE predictions ADD COLUMN article_hash CHAR(64) REFERENCES articles(content_hash)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_predictions_article ON predictions(article_hash)"))
+        logger.info("🛠️ Added predictions.article_hash; existing rows are linked to articles in the background")
+    # New rows no longer write predictions.text_input
+    relax_unmapped_columns(engine, models.Prediction.__table__)
+    return "text_input" in columns
+
+
+def unlinked_predictions(engine) -> int:
+    with engine.connect() as conn:
+        return conn.scalar(text("SELECT count(*) FROM predictions WHERE article_hash IS NULL"))
+
+
+def backfill_article_hashes(engine, batch_size: int = 1000, wait: bool = False) -> int:
+    """
+    Link predictions without article_hash to articles, one committed batch at a time
+
+    Each text is hashed in Python (same normalization as the API) and one
+    article upserted per distinct text. On PostgreSQL an advisory lock keeps
+    it to one process; without `wait` this returns 0 when another holds it.
+    """
+    from app.db import articles
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        if engine.dialect.name == "postgresql":
+            if wait:
+                lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ARTICLE_BACKFILL_LOCK_ID})
+            elif not lock_conn.scalar(text("SELECT pg_try_advisory_lock(:id)"), {"id": ARTICLE_BACKFILL_LOCK_ID}):
+                logger.info("🛠️ Article backfill already running elsewhere, skipping")
+                return 0
+        try:
+            migrated = 0
+            last_id = 0
+            started = time.perf_counter()
+            while True:
+                with engine.begin() as conn:
+                    rows = conn.execute(text(
+                        "SELECT id, text_input, created_at FROM predictions "
+                        "WHERE id > :last_id AND article_hash IS NULL ORDER BY id LIMIT :limit"
+                    ).columns(id=Integer, text_input=Text, created_at=DateTime), {"last_id": last_id, "limit": batch_size}).all()
+                    if not rows:
+                        break
+
+                    links = []
+                    article_rows = []
+                    for prediction_id, text_input, created_at in rows:
+                        article = articles.article_row(text_input or "")
+                        article["created_at"] = created_at or article["created_at"]
+                        article_rows.append(article)
+                        links.append({"pid": prediction_id, "hash": article["content_hash"]})
+
+                    conn.execute(articles.upsert_statement(engine.dialect.name, articles.unique_rows(article_rows)))
+                    conn.execute(text("UPDATE predictions SET article_hash = :hash WHERE id = :pid"), links)
+
+                last_id = rows[-1][0]
+                migrated += len(rows)
+                logger.info(f"  {migrated} predictions linked ({migrated / (time.perf_counter() - started):.0f} rows/s)")
+            return migrated
+        finally:
+            if engine.dialect.name == "postgresql":
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ARTICLE_BACKFILL_LOCK_ID})
+
+
+def start_article_backfill(engine) -> Optional[threading.Thread]:
+    """Startup: link old predictions to articles in a background thread if any are unlinked"""
+    if not add_article_link(engine):
+        return None
+    unlinked = unlinked_predictions(engine)
+    if not unlinked:
+        return None
+    logger.warning(f"⚠️ {unlinked} predictions are not linked to an article yet; linking them in the background "
+                   f"(they are missing from history until then)")
+
+    def run():
+        try:
+            linked = backfill_article_hashes(engine)
+            if linked:
+                logger.info(f"✅ Linked {linked} predictions to articles")
+        except Exception as e:
+            logger.error(f"❌ Article backfill failed, it resumes on the next start: {e}")
+
+    thread = threading.Thread(target=run, name="article-backfill", daemon=True)
+    thread.start()
+    return thread
+
+
+def create_search_index(engine):
+    """Indexes behind /predictions/search; the trigram GIN index is built CONCURRENTLY so writes continue"""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_articles_text_trgm "
+            "ON articles USING gin (text_input gin_trgm_ops)"
+        ))
+        # Partitioned tables can't be indexed CONCURRENTLY; this one is small per partition
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_predictions_label_created "
+            "ON predictions(label_classified, created_at DESC, id DESC)"
+        ))
+    logger.info("🛠️ Search indexes ready")
+
+
+# A Khmer word pg_trgm has to split into trigrams for the index to narrow searches
+KHMER_TRIGRAM_SAMPLE = "ព្រះវិហារ"
+
+
+def search_index_status(connection) -> dict:
+    """
+    Whether the trigram index can serve Khmer searches. pg_trgm only keeps
+    characters the database's LC_CTYPE calls alphanumeric; under the C locale
+    that excludes all of Khmer, so every search rechecks every article.
+    """
+    if connection.dialect.name != "postgresql":
+        return {"ok": True}
+    if not connection.scalar(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")):
+        return {"ok": False, "error": "pg_trgm is not installed (python -m app.db.migrations)"}
+    if connection.scalar(text("SELECT array_length(show_trgm(:sample), 1)"), {"sample": KHMER_TRIGRAM_SAMPLE}):
+        return {"ok": True}
+    ctype = connection.scalar(text("SELECT datctype FROM pg_database WHERE datname = current_database()"))
+    return {"ok": False, "error": f"pg_trgm extracts no trigrams from Khmer under LC_CTYPE {ctype!r}; use a UTF-8 locale"}
+
+
+if __name__ == "__main__":
+    from app.db import models
+    from app.db.session import engine
+
+    logging.basicConfig(level=logging.INFO)
+    models.Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine, models.Prediction)
+    create_search_index(engine)
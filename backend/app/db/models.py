@@ -1,18 +1,65 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Numeric, func
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, Date, DateTime, Numeric, ForeignKey, LargeBinary, JSON, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
 from datetime import datetime
+from typing import List, Optional
+import struct
 
 Base = declarative_base()
 
+
+def pack_probabilities(probabilities: Optional[List[float]]) -> Optional[bytes]:
+    """Softmax vector as little-endian float32s (4 bytes per class)"""
+    if probabilities is None:
+        return None
+    return struct.pack(f"<{len(probabilities)}f", *probabilities)
+
+
+def unpack_probabilities(packed: Optional[bytes]) -> Optional[List[float]]:
+    if packed is None:
+        return None
+    return list(struct.unpack(f"<{len(packed) // 4}f", packed))
+
+
+class Article(Base):
+    """Article body stored once per distinct (normalized) text"""
+    __tablename__ = "articles"
+    
+    content_hash = Column(String(64), primary_key=True)  # sha256 of normalized text
+    text_input = Column(Text, nullable=False)             # first copy seen, as submitted
+    char_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<Article(hash={self.content_hash[:12]}, chars={self.char_count})>"
+
+
 class Prediction(Base):
     __tablename__ = "predictions"
     
     id = Column(Integer, primary_key=True, index=True)
-    text_input = Column(Text, nullable=False)
+    article_hash = Column(String(64), ForeignKey("articles.content_hash"), nullable=False, index=True)
     label_classified = Column(String(255), nullable=False)
     accuracy = Column(Numeric(5, 2), nullable=True)  # prediction accuracy (%)
     feedback = Column(Boolean, default=None, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    feedback_at = Column(DateTime, nullable=True)             # last feedback change (export watermark)
+    model_version = Column(String(64), nullable=True)
+    probabilities = Column(LargeBinary, nullable=True)       # packed float32 softmax, see pack_probabilities
+    validation_summary = Column(JSON().with_variant(JSONB, "postgresql"), nullable=True)
+    
+    article = relationship(Article, lazy="joined")
+    
+    @property
+    def text_input(self):
+        """Article body, read through the content-addressed articles table"""
+        return self.article.text_input if self.article is not None else None
+    
+    @property
+    def probability_vector(self) -> Optional[List[float]]:
+        """Softmax probabilities in model class-id order"""
+        return unpack_probabilities(self.probabilities)
     
     def __repr__(self):
         return (
@@ -22,6 +69,21 @@ class Prediction(Base):
     
 
 
+class PredictionDailyStat(Base):
+    """Per-day, per-label counters maintained incrementally (see app/db/rollups.py)"""
+    __tablename__ = "prediction_daily_stats"
+    
+    day = Column(Date, primary_key=True)
+    label = Column(String(255), primary_key=True)
+    total = Column(BigInteger, nullable=False, default=0)
+    with_feedback = Column(BigInteger, nullable=False, default=0)
+    positive_feedback = Column(BigInteger, nullable=False, default=0)
+    confidence_sum = Column(Numeric(18, 2), nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<PredictionDailyStat(day={self.day}, label='{self.label}', total={self.total})>"
+
+
 class ErrorLog(Base):
     __tablename__ = "error_logs"
     
@@ -32,4 +94,44 @@ class ErrorLog(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
     def __repr__(self):
-        return f"<ErrorLog(id={self.id}, type='{self.error_type}', message='{self.error_message[:50]}...')>"
\ No newline at end of file
+        return f"<ErrorLog(id={self.id}, type='{self.error_type}', message='{self.error_message[:50]}...')>"
+
+
+class ClassificationJob(Base):
+    __tablename__ = "classification_jobs"
+    
+    id = Column(String(36), primary_key=True)  # uuid4
+    status = Column(String(20), nullable=False, default="queued", index=True)  # 'queued', 'running', 'completed', 'failed'
+    total_items = Column(Integer, nullable=False, default=0)
+    processed_items = Column(Integer, nullable=False, default=0)  # checkpoint: items [0, processed_items) are done
+    failed_items = Column(Integer, nullable=False, default=0)
+    batch_size = Column(Integer, nullable=False)
+    worker_id = Column(String(100))
+    error_message = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    
+    def __repr__(self):
+        return f"<ClassificationJob(id={self.id}, status='{self.status}', progress={self.processed_items}/{self.total_items})>"
+
+
+class JobItem(Base):
+    __tablename__ = "job_items"
+    
+    job_id = Column(String(36), ForeignKey("classification_jobs.id", ondelete="CASCADE"), primary_key=True)
+    seq = Column(Integer, primary_key=True)  # 0-based line number in the upload
+    external_id = Column(String(255))        # optional "id" from the uploaded line
+    text_input = Column(Text, nullable=False)
+
+
+class JobResult(Base):
+    __tablename__ = "job_results"
+    
+    job_id = Column(String(36), ForeignKey("classification_jobs.id", ondelete="CASCADE"), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    external_id = Column(String(255))
+    label_classified = Column(String(255))
+    accuracy = Column(Numeric(5, 2))
+    error_message = Column(Text)
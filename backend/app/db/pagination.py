@@ -0,0 +1,48 @@
+"""
+Opaque keyset cursors and cheap row-count estimates for history pagination
+
+A cursor encodes the (created_at, id) of the last row of a page; the next
+page is everything strictly before it in (created_at DESC, id DESC) order,
+which the composite index serves without OFFSET scans.
+"""
+
+import base64
+import json
+import time
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+def encode_cursor(created_at: datetime, prediction_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), prediction_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    """Decode a cursor; an empty cursor means "first page". Raises ValueError if malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, prediction_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(prediction_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class CountCache:
+    """Per-process cache of a row count, refreshed at most every `ttl` seconds"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._value: Optional[int] = None
+        self._expires = 0.0
+
+    def get(self) -> Optional[int]:
+        if self._value is not None and time.monotonic() < self._expires:
+            return self._value
+        return None
+
+    def set(self, value: int):
+        self._value = value
+        self._expires = time.monotonic() + self.ttl
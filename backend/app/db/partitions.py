@@ -0,0 +1,353 @@
+"""
+Monthly range partitions for the predictions table
+
+On PostgreSQL, predictions is partitioned by RANGE (created_at) with one
+partition per calendar month (predictions_y2026m01, ...) plus a DEFAULT
+partition that only catches rows outside every monthly range. Each partition
+has its own small indexes, so inserts only touch the current month and old
+months can be removed with DETACH + DROP instead of DELETE + VACUUM.
+
+Maintenance (run at startup and every PARTITION_MAINTENANCE_INTERVAL_SECONDS,
+or by hand with `python -m app.cli.partitions`):
+  - create partitions for the next PARTITION_MONTHS_AHEAD months
+  - if PARTITION_RETENTION_MONTHS > 0, export partitions older than that
+    (joined with their article text) to gzip-compressed CSV in
+    PARTITION_ARCHIVE_DIR, then detach and drop them
+
+The /stats rollup is not touched by retention, so archived months still
+count towards statistics. Everything here is a no-op on databases where
+predictions is not partitioned (SQLite in development, or PostgreSQL before
+`python -m app.cli.partitions convert`).
+
+File: backend/app/db/partitions.py
+"""
+
+import gzip
+import logging
+import os
+import re
+import threading
+import traceback
+from datetime import date
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+PARENT = "predictions"
+DEFAULT_PARTITION = "predictions_default"
+PARTITION_NAME = re.compile(r"^predictions_y(\d{4})m(\d{2})$")
+
+# Arbitrary constant for pg_try_advisory_lock: one maintainer at a time across workers
+MAINTENANCE_LOCK_ID = 72_0036
+
+
+# ────────────────────────────────────────────────
+# Month arithmetic
+# ────────────────────────────────────────────────
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    match = PARTITION_NAME.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+# ────────────────────────────────────────────────
+# DDL
+# ────────────────────────────────────────────────
+
+def is_partitioned(connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(connection.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:parent))"
+    ), {"parent": PARENT}))
+
+
+def list_partitions(connection) -> List[Tuple[str, date]]:
+    """Monthly partitions currently attached, oldest first"""
+    names = connection.scalars(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:parent)"
+    ), {"parent": PARENT}).all()
+    months = [(name, partition_month(name)) for name in names]
+    return sorted((name, month) for name, month in months if month is not None)
+
+
+# Columns of the partitioned parent; the primary key has to include the partition key
+PARENT_COLUMNS = """
+    id INTEGER NOT NULL,
+    article_hash CHAR(64) NOT NULL REFERENCES articles(content_hash),
+    label_classified TEXT,
+    accuracy NUMERIC(5,2),
+    feedback BOOLEAN,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    feedback_at TIMESTAMP,
+    model_version VARCHAR(64),
+    probabilities BYTEA,
+    validation_summary JSONB,
+    PRIMARY KEY (id, created_at)
+"""
+
+COLUMN_NAMES = (
+    "id, article_hash, label_classified, accuracy, feedback, created_at, "
+    "feedback_at, model_version, probabilities, validation_summary"
+)
+
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_predictions_created ON predictions(created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_predictions_feedback ON predictions(feedback)",
+    "CREATE INDEX IF NOT EXISTS idx_predictions_article ON predictions(article_hash)",
+    "CREATE INDEX IF NOT EXISTS idx_predictions_label_created ON predictions(label_classified, created_at DESC, id DESC)",
+)
+
+
+def create_partition_sql(month: date, parent: str = PARENT) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {parent} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def _has_default_partition(connection) -> bool:
+    return bool(connection.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_inherits WHERE inhparent = to_regclass(:parent) "
+        "AND inhrelid = to_regclass(:default))"
+    ), {"parent": PARENT, "default": DEFAULT_PARTITION}))
+
+
+def create_partition(connection, month: date) -> int:
+    """
+    Create the partition for `month`; returns how many rows it took over from the default partition.
+
+    PostgreSQL refuses to create a partition while the default partition
+    holds rows in its range (rows that arrived while no partition existed,
+    e.g. maintenance was down or the clock was off). Those rows are moved:
+    the default partition is detached, the new partition created, the rows
+    moved into it and the default partition attached again, all in the
+    caller's transaction.
+    """
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    in_range = f"created_at >= '{start}' AND created_at < '{end}'"
+    stray = 0
+    if _has_default_partition(connection):
+        stray = connection.scalar(text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE {in_range}"))
+    if not stray:
+        connection.execute(text(create_partition_sql(month)))
+        return 0
+
+    connection.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {DEFAULT_PARTITION}"))
+    connection.execute(text(create_partition_sql(month)))
+    connection.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING {COLUMN_NAMES}) "
+        f"INSERT INTO {partition_name(month)} ({COLUMN_NAMES}) SELECT {COLUMN_NAMES} FROM moved"
+    ))
+    connection.execute(text(f"ALTER TABLE {PARENT} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    return stray
+
+
+def ensure_partitions(connection, months_ahead: int, today: Optional[date] = None) -> List[str]:
+    """Create the current month's partition and the next `months_ahead`; returns the new ones"""
+    current = month_start(today or date.today())
+    existing = {name for name, _ in list_partitions(connection)}
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if partition_name(month) not in existing:
+            moved = create_partition(connection, month)
+            if moved:
+                logger.warning(f"🗂️ Moved {moved} rows from {DEFAULT_PARTITION} into {partition_name(month)}")
+            created.append(partition_name(month))
+    return created
+
+
+def detached_partitions(connection) -> List[str]:
+    """Monthly tables left detached by an interrupted archive_partition(), oldest first"""
+    names = connection.scalars(text(
+        "SELECT relname FROM pg_class WHERE relkind = 'r' AND NOT relispartition "
+        "AND relname ~ '^predictions_y[0-9]{4}m[0-9]{2}$'"
+    )).all()
+    return sorted(names)
+
+
+def _fingerprint(connection, name: str) -> tuple:
+    # Changes whenever a row is added or removed, or gets feedback (which sets feedback_at)
+    return tuple(connection.execute(text(f"SELECT count(*), max(id), max(feedback_at) FROM {name}")).one())
+
+
+def _export_partition(connection, name: str, path: str):
+    """COPY a partition (joined with its article text) to gzip CSV; the file appears only once it is on disk"""
+    export = (
+        f"COPY (SELECT p.id, p.created_at, p.label_classified, p.accuracy, p.feedback, p.model_version, "
+        f"encode(p.probabilities, 'hex') AS probabilities, p.validation_summary, "
+        f"p.article_hash, a.text_input FROM {name} p JOIN articles a ON a.content_hash = p.article_hash "
+        f"ORDER BY p.created_at, p.id) TO STDOUT WITH (FORMAT csv, HEADER)"
+    )
+    cursor = connection.connection.cursor()
+    try:
+        with open(path + ".tmp", "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                cursor.copy_expert(export, f)
+            raw.flush()
+            os.fsync(raw.fileno())
+    finally:
+        cursor.close()
+    os.replace(path + ".tmp", path)
+
+
+def archive_partition(connection, name: str, archive_dir: str) -> str:
+    """
+    Export a partition to <archive_dir>/<name>.csv.gz, then detach and drop it.
+
+    Manages its own transactions (call it outside one). The export reads the
+    still-attached partition, so it only holds ACCESS SHARE locks and
+    predictions stays fully usable. DETACH, which locks predictions
+    exclusively, then runs in a transaction of its own that gives up after
+    PARTITION_LOCK_TIMEOUT_SECONDS instead of queueing every other query
+    behind it. If the month changed between export and detach (late
+    feedback), the now frozen table is exported again before the drop. A
+    table left detached by a crash is picked up by the next run.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+
+    exported = None
+    with connection.begin():
+        attached = name in {partition for partition, _ in list_partitions(connection)}
+    if attached:
+        with connection.begin():
+            # One snapshot for the fingerprint and the COPY
+            connection.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY"))
+            exported = _fingerprint(connection, name)
+            _export_partition(connection, name, path)
+        with connection.begin():
+            lock_timeout_ms = int(settings.PARTITION_LOCK_TIMEOUT_SECONDS * 1000)
+            connection.execute(text(f"SET LOCAL lock_timeout = {lock_timeout_ms}"))
+            connection.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+
+    # Detached: nothing writes to it any more
+    with connection.begin():
+        if exported is None or _fingerprint(connection, name) != exported:
+            _export_partition(connection, name, path)
+        connection.execute(text(f"DROP TABLE {name}"))
+    return path
+
+
+def expired_partitions(connection, retention_months: int, today: Optional[date] = None) -> List[str]:
+    """Partitions whose whole month is older than the retention window"""
+    cutoff = add_months(month_start(today or date.today()), -retention_months)
+    return [name for name, month in list_partitions(connection) if add_months(month, 1) <= cutoff]
+
+
+def prune_articles(connection) -> int:
+    """Delete articles no prediction references any more (after archiving)"""
+    result = connection.execute(text(
+        "DELETE FROM articles a WHERE NOT EXISTS "
+        "(SELECT 1 FROM predictions p WHERE p.article_hash = a.content_hash)"
+    ))
+    return result.rowcount
+
+
+# ────────────────────────────────────────────────
+# Maintenance
+# ────────────────────────────────────────────────
+
+def run_maintenance(
+    months_ahead: int = None,
+    retention_months: int = None,
+    archive_dir: str = None,
+    today: Optional[date] = None
+) -> dict:
+    """Create upcoming partitions and apply retention; safe to call from every worker"""
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    retention_months = settings.PARTITION_RETENTION_MONTHS if retention_months is None else retention_months
+    archive_dir = archive_dir or settings.PARTITION_ARCHIVE_DIR
+    summary = {"created": [], "archived": []}
+
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            return summary
+        if not conn.scalar(text("SELECT pg_try_advisory_lock(:id)"), {"id": MAINTENANCE_LOCK_ID}):
+            logger.info("🗂️ Partition maintenance already running elsewhere, skipping")
+            conn.rollback()
+            return summary
+        conn.commit()
+        try:
+            with conn.begin():
+                summary["created"] = ensure_partitions(conn, months_ahead, today)
+                expired = expired_partitions(conn, retention_months, today) if retention_months > 0 else []
+                leftover = detached_partitions(conn)
+            for name in leftover + expired:
+                path = archive_partition(conn, name, archive_dir)
+                summary["archived"].append(path)
+                logger.info(f"🗂️ Archived partition {name} to {path}")
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MAINTENANCE_LOCK_ID})
+            conn.commit()
+
+    if summary["created"]:
+        logger.info(f"🗂️ Created partitions: {', '.join(summary['created'])}")
+    return summary
+
+
+class PartitionMaintainer:
+    """Runs run_maintenance() at startup and then on a fixed interval"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.consecutive_failures = 0
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if engine.dialect.name != "postgresql" or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="partition-maintainer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                run_maintenance()
+                self.consecutive_failures = 0
+                self.last_error = None
+            except Exception as e:
+                self.consecutive_failures += 1
+                self.last_error = str(e)
+                metrics.PARTITION_MAINTENANCE_FAILURES.inc()
+                logger.error(f"❌ Partition maintenance failed ({self.consecutive_failures} in a row): {e}")
+                logger.error(traceback.format_exc())
+            self._stop.wait(self.interval)
+
+    def status(self) -> dict:
+        """For /health: maintenance that keeps failing eventually means inserts have no partition"""
+        return {"ok": self.consecutive_failures == 0, "consecutive_failures": self.consecutive_failures,
+                "last_error": self.last_error}
+
+
+# Global instance
+partition_maintainer = PartitionMaintainer(interval=settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS)
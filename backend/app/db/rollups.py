@@ -0,0 +1,136 @@
+"""
+Incremental per-day, per-label counters behind /stats
+
+Every prediction insert and feedback change adds a delta to the matching
+(day, label) row of prediction_daily_stats in the same transaction, so
+/stats sums a few hundred small rows instead of scanning predictions.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select, delete, case, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.db import models
+
+COUNTERS = ("total", "with_feedback", "positive_feedback", "confidence_sum")
+
+
+def prediction_delta(created_at: datetime, label: str, accuracy, feedback: Optional[bool]) -> dict:
+    """Counter deltas for inserting one prediction"""
+    return {
+        "day": created_at.date(),
+        "label": label,
+        "total": 1,
+        "with_feedback": int(feedback is not None),
+        "positive_feedback": int(feedback is True),
+        "confidence_sum": Decimal(str(accuracy or 0)),
+    }
+
+
+def feedback_delta(created_at: datetime, label: str, old: Optional[bool], new: Optional[bool]) -> dict:
+    """Counter deltas for changing one prediction's feedback from `old` to `new`"""
+    return {
+        "day": created_at.date(),
+        "label": label,
+        "total": 0,
+        "with_feedback": int(new is not None) - int(old is not None),
+        "positive_feedback": int(new is True) - int(old is True),
+        "confidence_sum": Decimal(0),
+    }
+
+
+def merge_deltas(deltas: Iterable[dict]) -> List[dict]:
+    """Sum deltas per (day, label) so a bulk write touches each rollup row once"""
+    merged: Dict[Tuple[date, str], dict] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for delta in deltas:
+        row = merged[(delta["day"], delta["label"])]
+        for counter in COUNTERS:
+            row[counter] += delta[counter]
+    return [{"day": day, "label": label, **counters} for (day, label), counters in merged.items()]
+
+
+def upsert_statement(dialect_name: str, deltas: List[dict]):
+    """INSERT ... ON CONFLICT (day, label) DO UPDATE SET counter = counter + excluded.counter"""
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    table = models.PredictionDailyStat.__table__
+    stmt = dialect_insert(table).values(deltas)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.day, table.c.label],
+        set_={counter: table.c[counter] + stmt.excluded[counter] for counter in COUNTERS}
+    )
+
+
+def stats_query(date_from: Optional[date] = None, date_to: Optional[date] = None, label: Optional[str] = None):
+    """Rollup rows in range, grouped by day and label"""
+    rollup = models.PredictionDailyStat
+    query = select(
+        rollup.day,
+        rollup.label,
+        func.sum(rollup.total),
+        func.sum(rollup.with_feedback),
+        func.sum(rollup.positive_feedback),
+        func.sum(rollup.confidence_sum),
+    )
+    if date_from:
+        query = query.where(rollup.day >= date_from)
+    if date_to:
+        query = query.where(rollup.day <= date_to)
+    if label:
+        query = query.where(rollup.label == label)
+    return query.group_by(rollup.day, rollup.label).order_by(rollup.day)
+
+
+def summarize(rows) -> dict:
+    """Turn stats_query rows into the /stats response"""
+    by_label: Dict[str, dict] = {}
+    by_day: Dict[str, int] = {}
+    total = with_feedback = 0
+    for day, label, day_total, day_feedback, day_positive, day_confidence in rows:
+        day_total, day_feedback, day_positive = int(day_total or 0), int(day_feedback or 0), int(day_positive or 0)
+        entry = by_label.setdefault(label, {"total": 0, "with_feedback": 0, "positive_feedback": 0, "confidence_sum": 0.0})
+        entry["total"] += day_total
+        entry["with_feedback"] += day_feedback
+        entry["positive_feedback"] += day_positive
+        entry["confidence_sum"] += float(day_confidence or 0)
+        key = day.isoformat() if hasattr(day, "isoformat") else str(day)
+        by_day[key] = by_day.get(key, 0) + day_total
+        total += day_total
+        with_feedback += day_feedback
+
+    for entry in by_label.values():
+        entry["approval_rate"] = (entry["positive_feedback"] / entry["with_feedback"] * 100) if entry["with_feedback"] else None
+        entry["avg_confidence"] = (entry.pop("confidence_sum") / entry["total"]) if entry["total"] else None
+
+    return {
+        "total_predictions": total,
+        "predictions_with_feedback": with_feedback,
+        "feedback_percentage": (with_feedback / total * 100) if total > 0 else 0,
+        "by_label": by_label,
+        "by_day": [{"day": day, "total": count} for day, count in by_day.items()],
+    }
+
+
+def rebuild(connection):
+    """Recompute every rollup row from predictions (backfill / repair)"""
+    prediction = models.Prediction
+    if connection.dialect.name == "postgresql":
+        # Block concurrent inserts/feedback so no delta is counted twice or lost
+        connection.execute(text("LOCK TABLE predictions IN SHARE MODE"))
+    connection.execute(delete(models.PredictionDailyStat))
+    connection.execute(
+        models.PredictionDailyStat.__table__.insert().from_select(
+            list(("day", "label") + COUNTERS),
+            select(
+                func.date(prediction.created_at),
+                prediction.label_classified,
+                func.count(),
+                func.count(prediction.feedback),
+                func.coalesce(func.sum(case((prediction.feedback.is_(True), 1), else_=0)), 0),
+                func.coalesce(func.sum(prediction.accuracy), 0),
+            ).group_by(func.date(prediction.created_at), prediction.label_classified)
+        )
+    )
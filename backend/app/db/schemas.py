@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, Optional
 from datetime import datetime
 
 class PredictionBase(BaseModel):
@@ -16,9 +16,42 @@ class PredictionResponse(BaseModel):
     accuracy: float # This comes from model prediction
     feedback: Optional[bool]
     created_at: datetime
+    near_duplicate: Optional[Dict[str, Any]] = None  # set when the label was reused from a near-duplicate article
     
     class Config:
         from_attributes = True
 
+class PredictionDetail(PredictionResponse):
+    """Single prediction; the extras are only filled in when requested (GET /predictions/{id}?include=...)"""
+    model_version: Optional[str] = None
+    probabilities: Optional[Dict[str, float]] = None
+    validation_summary: Optional[Dict[str, Any]] = None
+
+class PredictionSummary(BaseModel):
+    """History row with only the requested fields (see GET /predictions?fields=...)"""
+    id: int
+    text_input: Optional[str] = None
+    text_preview: Optional[str] = None
+    text_length: Optional[int] = None
+    label_classified: Optional[str] = None
+    accuracy: Optional[float] = None
+    feedback: Optional[bool] = None
+    created_at: Optional[datetime] = None
+
 class PredictionUpdate(BaseModel):
-    feedback: bool = Field(..., description="User feedback (True=Good, False=Bad)")
\ No newline at end of file
+    feedback: bool = Field(..., description="User feedback (True=Good, False=Bad)")
+
+class JobResponse(BaseModel):
+    id: str
+    status: str
+    total_items: int
+    processed_items: int
+    failed_items: int
+    batch_size: int
+    error_message: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
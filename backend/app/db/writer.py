@@ -0,0 +1,373 @@
+"""
+Write-behind persistence for predictions and error logs
+
+Instead of an INSERT + COMMIT + SELECT round-trip per request, rows are
+buffered in memory and written by a background thread with one multi-row
+INSERT per table, whenever the buffer reaches WRITE_BEHIND_MAX_BATCH rows or
+WRITE_BEHIND_FLUSH_INTERVAL_SECONDS pass. Ids are handed out immediately
+from blocks pre-allocated from the table's sequence, so clients still get
+their prediction id in the response.
+
+Rows are flushed on graceful shutdown; if the database stays unreachable
+they are spilled to WRITE_BEHIND_SPILL_PATH as JSONL instead of being
+dropped (rows that are already inserted and only wait for a feedback
+change are marked "inserted": true). Article bodies are upserted into the
+content-addressed articles table in the same transaction, once per distinct
+text. Only PostgreSQL is supported (sequences); on other databases the
+writer stays disabled and callers use the synchronous crud functions.
+
+A flush that fails for anything but a lost connection is retried in halves
+until the rows that cannot be written are isolated; those are dead-lettered
+to the spill file (with "error") and dropped, so one bad row cannot stall
+the buffer. Producers wait at most WRITE_BEHIND_MAX_WAIT_SECONDS for buffer
+space and then get WriteBehindFull, on which callers write synchronously.
+
+File: backend/app/db/writer.py
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, text
+
+from app.core import metrics
+from app.core.config import settings
+from app.db import articles, models, rollups
+from app.db.session import engine, is_transient_error
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT statement
+INSERT_CHUNK = 1000
+
+
+def _spill_value(value):
+    # Packed probability vectors are written as hex
+    return value.hex() if isinstance(value, bytes) else str(value)
+
+
+class WriteBehindFull(Exception):
+    """The buffer stayed full for longer than max_wait; write synchronously instead"""
+
+
+class WriteBehindWriter:
+    def __init__(self, max_batch: int, flush_interval: float, max_buffer: int, id_block: int, spill_path: str, max_wait: float):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_wait = max_wait
+        self.id_block = id_block
+        self.spill_path = spill_path
+        self.enabled = False
+
+        self._lock = threading.Condition()
+        self._buffer: Dict[type, Dict[int, dict]] = {models.Prediction: {}, models.ErrorLog: {}}
+        # Buffered predictions already inserted whose feedback changed since -> the feedback stored
+        self._inserted: Dict[int, Optional[bool]] = {}
+        self._ids: Dict[type, deque] = {models.Prediction: deque(), models.ErrorLog: deque()}
+        self._id_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ── lifecycle ────────────────────────────────
+
+    def start(self):
+        if engine.dialect.name != "postgresql":
+            logger.warning(f"Write-behind persistence needs PostgreSQL (got {engine.dialect.name}); writing synchronously")
+            return
+        self.enabled = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        logger.info(f"🗄️ Write-behind writer started (batch={self.max_batch}, interval={self.flush_interval}s)")
+
+    def stop(self, retries: int = 3):
+        """Flush everything that is buffered, spilling to disk if the database is unavailable"""
+        if not self.enabled:
+            return
+        self._stop.set()
+        with self._lock:
+            self._lock.notify_all()
+        if self._thread:
+            self._thread.join()
+
+        for attempt in range(retries):
+            try:
+                self.flush()
+                if not self._pending_count():
+                    break
+            except Exception as e:
+                logger.error(f"❌ Final write-behind flush failed (attempt {attempt + 1}/{retries}): {e}")
+                time.sleep(1)
+        self._spill_remaining()
+        self.enabled = False
+        logger.info("🗄️ Write-behind writer stopped")
+
+    # ── producers ────────────────────────────────
+
+    @staticmethod
+    def _prediction_model(row: dict) -> models.Prediction:
+        """Transient Prediction (with its article) for a buffered row"""
+        article = {key: row[key] for key in ("text_input", "char_count")}
+        prediction = {key: value for key, value in row.items() if key not in article}
+        return models.Prediction(
+            **prediction,
+            article=models.Article(content_hash=row["article_hash"], created_at=row["created_at"], **article)
+        )
+
+    def submit_prediction(
+        self,
+        text_input: str,
+        label_classified: str,
+        accuracy: float,
+        feedback: bool = None,
+        model_version: str = None,
+        probabilities: Optional[List[float]] = None,
+        validation_summary: dict = None
+    ) -> models.Prediction:
+        article = articles.article_row(text_input)
+        row = {
+            "id": self._next_id(models.Prediction),
+            "article_hash": article["content_hash"],
+            "text_input": text_input,
+            "char_count": article["char_count"],
+            "label_classified": label_classified,
+            "accuracy": Decimal(str(round(accuracy, 2))),
+            "feedback": feedback,
+            "created_at": article["created_at"],
+            "feedback_at": article["created_at"] if feedback is not None else None,
+            "model_version": model_version,
+            "probabilities": models.pack_probabilities(probabilities),
+            "validation_summary": validation_summary,
+        }
+        self._enqueue(models.Prediction, row)
+        return self._prediction_model(row)
+
+    def submit_error_log(self, error_message: str, error_type: str = "OTHER", endpoint: str = None) -> models.ErrorLog:
+        row = {
+            "id": self._next_id(models.ErrorLog),
+            "error_message": error_message,
+            "error_type": error_type,
+            "endpoint": endpoint,
+            "created_at": datetime.utcnow(),
+        }
+        self._enqueue(models.ErrorLog, row)
+        return models.ErrorLog(**row)
+
+    def get_pending_prediction(self, prediction_id: int) -> Optional[models.Prediction]:
+        """A prediction that was accepted but not flushed yet"""
+        with self._lock:
+            row = self._buffer[models.Prediction].get(prediction_id)
+            return self._prediction_model(row) if row else None
+
+    def update_pending_feedback(self, prediction_id: int, feedback: bool) -> Optional[models.Prediction]:
+        """Set feedback on a still-buffered prediction; None if it was already flushed"""
+        with self._lock:
+            row = self._buffer[models.Prediction].get(prediction_id)
+            if row is None:
+                return None
+            row["feedback"] = feedback
+            row["feedback_at"] = datetime.utcnow()
+            return self._prediction_model(row)
+
+    def _enqueue(self, model: type, row: dict):
+        with self._lock:
+            # Backpressure: never buffer more than max_buffer rows, nor wait for space forever
+            deadline = time.monotonic() + self.max_wait
+            while self._pending_count() >= self.max_buffer and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    metrics.WRITE_BEHIND_FALLBACKS.inc()
+                    raise WriteBehindFull(f"write-behind buffer full ({self.max_buffer} rows) for {self.max_wait}s")
+                self._lock.notify_all()
+                self._lock.wait(min(self.flush_interval, remaining))
+            self._buffer[model][row["id"]] = row
+            if self._pending_count() >= self.max_batch:
+                self._lock.notify_all()
+
+    def _pending_count(self) -> int:
+        return sum(len(rows) for rows in self._buffer.values())
+
+    # ── id allocation ────────────────────────────
+
+    def _next_id(self, model: type) -> int:
+        with self._id_lock:
+            pool = self._ids[model]
+            if not pool:
+                pool.extend(self._allocate_ids(model.__tablename__, self.id_block))
+            return pool.popleft()
+
+    @staticmethod
+    def _allocate_ids(table: str, count: int) -> List[int]:
+        """Reserve `count` ids from the table's serial sequence in one round-trip"""
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+                {"table": table, "count": count}
+            ).all()
+        return [row[0] for row in rows]
+
+    # ── consumer ─────────────────────────────────
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                if self._pending_count() < self.max_batch:
+                    self._lock.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                # Rows stay buffered and are retried on the next cycle
+                logger.error(f"❌ Write-behind flush failed: {e}")
+                logger.error(traceback.format_exc())
+                self._stop.wait(self.flush_interval)
+
+    def flush(self):
+        """Write all buffered rows with multi-row INSERTs (and pending feedback UPDATEs) in a single transaction"""
+        with self._lock:
+            items = [(model, dict(row)) for model, rows in self._buffer.items() for row in rows.values()]
+            inserted = dict(self._inserted)
+        if not items:
+            return
+
+        written: List[Tuple[type, dict]] = []
+        failed: List[Tuple[type, dict, Exception]] = []
+        try:
+            self._write_isolating(items, inserted, written, failed)
+        finally:
+            # Forget what was committed even if a later part of the batch hit a lost connection
+            self._forget(written)
+            if failed:
+                self._dead_letter(failed)
+        logger.debug("Write-behind flushed %d rows", len(written))
+
+    def _write_isolating(self, items: list, inserted: dict, written: list, failed: list):
+        """Write items; on a row-level error retry each half, down to single rows, which are given up"""
+        try:
+            self._write(items, inserted)
+            written.extend(items)
+        except Exception as e:
+            # Every row would fail the same way, so retry the batch as is
+            if is_transient_error(e):
+                raise
+            if len(items) == 1:
+                model, row = items[0]
+                failed.append((model, row, e))
+                return
+            middle = len(items) // 2
+            self._write_isolating(items[:middle], inserted, written, failed)
+            self._write_isolating(items[middle:], inserted, written, failed)
+
+    @staticmethod
+    def _write(items: list, inserted: dict):
+        """One transaction for the given rows: article upserts, INSERTs, feedback UPDATEs, rollups"""
+        predictions = [row for model, row in items if model is models.Prediction]
+        # Predictions already in the database only need their late feedback applied
+        updates = [row for row in predictions if row["id"] in inserted]
+        new_predictions = [row for row in predictions if row["id"] not in inserted]
+        new_rows = {
+            models.Prediction: new_predictions,
+            models.ErrorLog: [row for model, row in items if model is models.ErrorLog],
+        }
+
+        with engine.begin() as conn:
+            article_rows = articles.unique_rows(
+                {"content_hash": row["article_hash"], "text_input": row["text_input"],
+                 "char_count": row["char_count"], "created_at": row["created_at"]}
+                for row in new_predictions
+            )
+            for start in range(0, len(article_rows), INSERT_CHUNK):
+                conn.execute(articles.upsert_statement(engine.dialect.name, article_rows[start:start + INSERT_CHUNK]))
+            for model, rows in new_rows.items():
+                columns = model.__table__.columns.keys()
+                rows = [{key: row[key] for key in columns if key in row} for row in rows]
+                for start in range(0, len(rows), INSERT_CHUNK):
+                    conn.execute(insert(model.__table__).values(rows[start:start + INSERT_CHUNK]))
+            if new_predictions:
+                conn.execute(rollups.upsert_statement(engine.dialect.name, rollups.merge_deltas(
+                    rollups.prediction_delta(row["created_at"], row["label_classified"], row["accuracy"], row["feedback"])
+                    for row in new_predictions
+                )))
+            if updates:
+                conn.execute(
+                    # created_at lets Postgres go straight to the row's partition
+                    text("UPDATE predictions SET feedback = :feedback, feedback_at = :feedback_at WHERE id = :pid AND created_at = :created_at"),
+                    [
+                        {"pid": row["id"], "created_at": row["created_at"], "feedback": row["feedback"], "feedback_at": row["feedback_at"]}
+                        for row in updates
+                    ]
+                )
+                conn.execute(rollups.upsert_statement(engine.dialect.name, rollups.merge_deltas(
+                    rollups.feedback_delta(row["created_at"], row["label_classified"], inserted[row["id"]], row["feedback"])
+                    for row in updates
+                )))
+
+    def _forget(self, written: list):
+        """Drop committed rows from the buffer. A row whose feedback changed while it
+        was being written stays buffered, and the next flush updates it"""
+        with self._lock:
+            for model, row in written:
+                current = self._buffer[model].get(row["id"])
+                if current is None:
+                    continue
+                if current == row:
+                    del self._buffer[model][row["id"]]
+                    self._inserted.pop(row["id"], None)
+                else:
+                    self._inserted[row["id"]] = row["feedback"]
+            self._lock.notify_all()
+
+    def _dead_letter(self, failed: list):
+        """Spill rows that cannot be written (with the error) and stop retrying them"""
+        with self._lock:
+            rows = []
+            for model, row, error in failed:
+                self._buffer[model].pop(row["id"], None)
+                if row["id"] in self._inserted:
+                    row = {**row, "inserted": True}
+                    self._inserted.pop(row["id"])
+                rows.append((model.__tablename__, {**row, "error": str(error)}))
+            self._lock.notify_all()
+        self._write_spill(rows)
+        metrics.WRITE_BEHIND_DEAD_LETTERS.inc(len(rows))
+        for table, row in rows:
+            logger.error(f"☠️ Dead-lettered {table} row {row['id']} to {self.spill_path}: {row['error']}")
+
+    def _spill_remaining(self):
+        with self._lock:
+            remaining = [
+                (model.__tablename__, {**row, "inserted": True} if row["id"] in self._inserted else row)
+                for model, rows in self._buffer.items() for row in rows.values()
+            ]
+            for rows in self._buffer.values():
+                rows.clear()
+            self._inserted.clear()
+        if not remaining:
+            return
+        self._write_spill(remaining)
+        logger.error(f"⚠️ Spilled {len(remaining)} unwritten rows to {self.spill_path}")
+
+    def _write_spill(self, rows: List[Tuple[str, dict]]):
+        os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            for table, row in rows:
+                f.write(json.dumps({"table": table, **row}, ensure_ascii=False, default=_spill_value) + "\n")
+
+
+# Global instance
+write_behind = WriteBehindWriter(
+    max_batch=settings.WRITE_BEHIND_MAX_BATCH,
+    flush_interval=settings.WRITE_BEHIND_FLUSH_INTERVAL_SECONDS,
+    max_buffer=settings.WRITE_BEHIND_MAX_BUFFER,
+    id_block=settings.WRITE_BEHIND_ID_BLOCK,
+    spill_path=settings.WRITE_BEHIND_SPILL_PATH,
+    max_wait=settings.WRITE_BEHIND_MAX_WAIT_SECONDS
+)
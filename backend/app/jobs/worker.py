@@ -0,0 +1,130 @@
+"""
+Background worker for bulk classification jobs
+
+Each API process runs one worker thread. A worker claims a queued job (or a
+running job whose worker stopped heartbeating), classifies its items in
+batches through the background lane, and commits every batch of results
+together with the job checkpoint, so a restarted worker resumes after the
+last committed batch instead of starting over. A database outage puts the
+job back in the queue rather than failing it; only errors from the job
+itself mark it failed.
+
+File: backend/app/jobs/worker.py
+"""
+
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.core.config import settings
+from app.db import crud
+from app.db.session import SessionLocal, is_transient_error
+from app.ml.model import classifier
+from app.ml.scheduler import scheduler, LaneTimeout, BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    def __init__(self, poll_interval: float, stale_after: float):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="job-worker", daemon=True)
+        self._thread.start()
+        logger.info(f"🧵 Job worker started ({self.worker_id})")
+
+    def stop(self, timeout: float = 30.0):
+        """Stop after the current batch; uncommitted work is picked up again later"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        logger.info("🧵 Job worker stopped")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job_id = self._claim()
+                if job_id is None:
+                    self._stop.wait(self.poll_interval)
+                    continue
+                self.run_job(job_id)
+            except Exception as e:
+                logger.error(f"❌ Job worker error: {e}")
+                logger.error(traceback.format_exc())
+                self._stop.wait(self.poll_interval)
+
+    def _claim(self) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            stale_before = datetime.utcnow() - timedelta(seconds=self.stale_after)
+            job = crud.claim_next_job(db, self.worker_id, stale_before)
+            return job.id if job else None
+        finally:
+            db.close()
+
+    def run_job(self, job_id: str):
+        """Process a claimed job from its checkpoint until done, stopped or taken over"""
+        db = SessionLocal()
+        try:
+            job = crud.get_job(db, job_id)
+            logger.info(f"📦 Job {job_id}: resuming at item {job.processed_items}/{job.total_items}")
+            checkpoint = job.processed_items
+            batch_size = job.batch_size
+
+            while not self._stop.is_set():
+                items = crud.get_job_items(db, job_id, checkpoint, batch_size)
+                if not items:
+                    if crud.finish_job(db, job_id, self.worker_id, "completed"):
+                        logger.info(f"✅ Job {job_id} completed")
+                    else:
+                        logger.warning(f"⚠️ Job {job_id} was taken over by another worker, abandoning")
+                    return
+
+                try:
+                    with scheduler.slot(BACKGROUND):
+                        results = classifier.classify_batch([item.text_input for item in items])
+                except LaneTimeout:
+                    # Model busy with higher-priority work; keep the claim alive and retry
+                    if not crud.touch_job(db, job_id, self.worker_id):
+                        logger.warning(f"⚠️ Job {job_id} was taken over by another worker, abandoning")
+                        return
+                    continue
+
+                if not crud.save_job_batch(db, job_id, self.worker_id, checkpoint, items, results):
+                    logger.warning(f"⚠️ Job {job_id} was taken over by another worker, abandoning")
+                    return
+                checkpoint += len(items)
+                logger.info(f"📦 Job {job_id}: {checkpoint}/{job.total_items} items")
+
+        except Exception as e:
+            db.rollback()
+            if is_transient_error(e):
+                # Database unreachable, not a problem with the job: hand it back to resume from
+                # the checkpoint. If the release fails too, the job goes stale and is reclaimed.
+                logger.warning(f"⚠️ Job {job_id} interrupted by a database error, releasing it: {e}")
+                crud.release_job(db, job_id, self.worker_id)
+                raise
+            logger.error(f"❌ Job {job_id} failed: {e}")
+            logger.error(traceback.format_exc())
+            crud.finish_job(db, job_id, self.worker_id, "failed", error_message=str(e))
+        finally:
+            db.close()
+
+
+# Global instance
+job_worker = JobWorker(
+    poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+    stale_after=settings.JOB_STALE_SECONDS
+)
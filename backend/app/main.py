@@ -1,13 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import logging
+from app.core import logs, metrics, timing
 from app.core.config import settings
 from app.api.routes import router as api_router  # IMPORTANT
 from app.db.session import engine
 from app.db import models
+from app.db.migrations import add_missing_columns, search_index_status, start_article_backfill
 
-logging.basicConfig(level=logging.INFO)
+logs.setup_logging()
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
@@ -34,8 +36,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id", "X-Request-ID"],
 )
 
+# Request latency and in-flight requests for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Per-stage durations in a Server-Timing header, and opt-in profiles
+app.add_middleware(timing.ServerTimingMiddleware)
+
+# Request ids on every log record (outermost, so all of the above log with it)
+app.add_middleware(logs.RequestIdMiddleware)
+
 @app.on_event("startup")
 def startup_event():
     """Initialize on startup"""
@@ -44,7 +56,13 @@ def startup_event():
     # Create database tables
     try:
         models.Base.metadata.create_all(bind=engine)
+        add_missing_columns(engine, models.Prediction)
+        start_article_backfill(engine)
         logger.info("Database tables created")
+        with engine.connect() as conn:
+            search_status = search_index_status(conn)
+        if not search_status["ok"]:
+            logger.error(f"❌ /predictions/search will scan every article: {search_status['error']}")
     except Exception as e:
         logger.error(f"Database error: {e}")
         logger.warning("Database connection failed, but API will continue")
@@ -53,6 +71,56 @@ def startup_event():
     from app.ml.model import classifier
     model_info = classifier.get_model_info()
     logger.info(f"Model loaded: {model_info}")
+    
+    # Warm the near-duplicate index from the previous run
+    if settings.DEDUP_ENABLED:
+        from app.ml.dedup import near_duplicates
+        try:
+            near_duplicates.load(settings.DEDUP_INDEX_PATH)
+        except Exception as e:
+            logger.warning(f"Could not load near-duplicate index: {e}")
+    
+    # Start buffered persistence
+    if settings.WRITE_BEHIND_ENABLED:
+        from app.db.writer import write_behind
+        write_behind.start()
+    
+    # Start the bulk job worker
+    if settings.JOB_WORKER_ENABLED:
+        from app.jobs.worker import job_worker
+        job_worker.start()
+    
+    # Keep future monthly partitions created and apply retention
+    from app.db.partitions import partition_maintainer
+    partition_maintainer.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Stop background work on shutdown"""
+    from app.db.partitions import partition_maintainer
+    partition_maintainer.stop()
+    
+    if settings.DEDUP_ENABLED:
+        from app.ml.dedup import near_duplicates
+        try:
+            near_duplicates.save(settings.DEDUP_INDEX_PATH)
+        except Exception as e:
+            logger.warning(f"Could not save near-duplicate index: {e}")
+    
+    if settings.JOB_WORKER_ENABLED:
+        from app.jobs.worker import job_worker
+        job_worker.stop()
+    
+    from app.ml import segment_pool
+    segment_pool.shutdown()
+    
+    # Flush buffered rows last so nothing accepted is lost
+    if settings.WRITE_BEHIND_ENABLED:
+        from app.db.writer import write_behind
+        write_behind.stop()
+    
+    # Write out queued log records
+    logs.shutdown()
 
 app.include_router(api_router, prefix=settings.API_V1_PREFIX)
 
@@ -73,5 +141,10 @@ def health():
         "model_loaded": classifier.model is not None
     }
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, headers={"Content-Type": content_type})
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
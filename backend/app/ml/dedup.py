@@ -0,0 +1,262 @@
+"""
+Near-duplicate lookup for recently classified articles
+
+Wire services republish the same story with small edits. Before the
+transformer runs, the article's words (as validation segmented them, so they
+come from the segmentation cache) are shingled and reduced to a MinHash
+signature; locality-sensitive hashing over signature bands finds
+candidate matches in O(bands) dictionary lookups, and a candidate whose
+estimated Jaccard similarity is at least DEDUP_THRESHOLD has its stored
+label, confidence and probabilities reused instead of running the model.
+
+Every article that does go through the model is added to the index.
+Signatures and confidences are preallocated NumPy buffers of
+DEDUP_MAX_ENTRIES rows; when full, the least recently used entry is evicted,
+so memory is fixed. The index is saved to DEDUP_INDEX_PATH on shutdown (as
+plain numeric and string arrays, loaded without pickle) and reloaded at
+startup; entries from another model version are never reused.
+
+File: backend/app/ml/dedup.py
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+from app.ml import preprocessing
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class MinHasher:
+    """MinHash signatures over word shingles (universal hashing, NumPy-vectorized)"""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 2, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, tokens: Sequence[str]) -> set:
+        k = self.shingle_size
+        if len(tokens) < k:
+            return {" ".join(tokens)} if tokens else set()
+        return {" ".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+
+    def signature(self, tokens: Sequence[str]) -> np.ndarray:
+        shingles = self.shingles(tokens)
+        if not shingles:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        # crc32 is stable across processes (unlike hash()), so saved signatures stay valid
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        with np.errstate(over="ignore"):
+            permuted = (hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=0).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    def __init__(
+        self,
+        capacity: int,
+        threshold: float = 0.9,
+        num_perm: int = 64,
+        bands: int = 8,
+        shingle_size: int = 2,
+        max_tokens: int = 2048
+    ):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.capacity = capacity
+        self.threshold = threshold
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.max_tokens = max_tokens
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+
+        self._lock = threading.Lock()
+        self._signatures = np.zeros((capacity, num_perm), dtype=np.uint32)
+        self._confidences = np.zeros(capacity, dtype=np.float32)
+        self._labels: List[Optional[str]] = [None] * capacity
+        self._versions: List[Optional[str]] = [None] * capacity
+        self._probabilities: List[Optional[List[float]]] = [None] * capacity
+        self._buckets: List[Dict[bytes, set]] = [{} for _ in range(bands)]
+        self._lru: "OrderedDict[int, None]" = OrderedDict()  # slot -> None, least recent first
+        self._free = list(range(capacity - 1, -1, -1))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_settings(cls) -> "NearDuplicateIndex":
+        return cls(
+            capacity=settings.DEDUP_MAX_ENTRIES,
+            threshold=settings.DEDUP_THRESHOLD,
+            num_perm=settings.DEDUP_NUM_PERM,
+            bands=settings.DEDUP_BANDS,
+            shingle_size=settings.DEDUP_SHINGLE_SIZE
+        )
+
+    # ── signatures ───────────────────────────────
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash of the raw (as validated) text's words; same text and engine as validation, so segmentation is a cache hit"""
+        tokens = preprocessing.count_khmer_words(
+            text, max_words=self.max_tokens, engine=settings.VALIDATION_SEGMENTER_ENGINE or None
+        )["words"]
+        return self.hasher.signature(tokens)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        r = self.rows_per_band
+        return [signature[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    # ── lookup / insert ──────────────────────────
+
+    def lookup(self, signature: np.ndarray, model_version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Best stored match with similarity >= threshold (and the same model version)"""
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidates |= self._buckets[band].get(key, set())
+            if model_version is not None:
+                candidates = {slot for slot in candidates if self._versions[slot] == model_version}
+            if not candidates:
+                self.misses += 1
+                return None
+
+            slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            similarities = (self._signatures[slots] == signature).mean(axis=1)
+            best = int(similarities.argmax())
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            slot = int(slots[best])
+            self._lru.move_to_end(slot)
+            self.hits += 1
+            return {
+                "label": self._labels[slot],
+                "confidence": float(self._confidences[slot]),
+                "probabilities": self._probabilities[slot],
+                "model_version": self._versions[slot],
+                "similarity": round(float(similarities[best]), 3),
+            }
+
+    def add(
+        self,
+        signature: np.ndarray,
+        label: str,
+        confidence: float,
+        model_version: Optional[str] = None,
+        probabilities: Optional[List[float]] = None
+    ):
+        with self._lock:
+            slot = self._free.pop() if self._free else self._evict()
+            self._signatures[slot] = signature
+            self._confidences[slot] = confidence
+            self._labels[slot] = label
+            self._versions[slot] = model_version
+            self._probabilities[slot] = probabilities
+            for band, key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault(key, set()).add(slot)
+            self._lru[slot] = None
+
+    def _evict(self) -> int:
+        slot, _ = self._lru.popitem(last=False)
+        for band, key in enumerate(self._band_keys(self._signatures[slot])):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(slot)
+                if not bucket:
+                    del self._buckets[band][key]
+        self._labels[slot] = None
+        self._probabilities[slot] = None
+        self.evictions += 1
+        return slot
+
+    # ── persistence ──────────────────────────────
+
+    def save(self, path: str):
+        with self._lock:
+            slots = np.fromiter(self._lru.keys(), dtype=np.int64, count=len(self._lru))
+            num_classes = max((len(p) for p in self._probabilities if p), default=0)
+            probabilities = np.full((len(slots), num_classes), np.nan, dtype=np.float32)
+            for row, slot in enumerate(slots):
+                stored = self._probabilities[slot]
+                if stored:
+                    probabilities[row, :len(stored)] = stored
+            arrays = {
+                "signatures": self._signatures[slots],
+                "confidences": self._confidences[slots],
+                "labels": np.array([self._labels[s] for s in slots], dtype=str),
+                "versions": np.array([self._versions[s] or "" for s in slots], dtype=str),
+                "probabilities": probabilities,
+            }
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # Every worker process saves on shutdown: each writes its own temp file and the
+        # last rename wins, instead of interleaving writes into one shared .tmp
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        logger.info(f"💾 Saved {len(slots)} near-duplicate entries to {path}")
+
+    def load(self, path: str) -> int:
+        if not os.path.exists(path):
+            return 0
+        with np.load(path) as npz:
+            try:
+                data = {name: npz[name] for name in npz.files}
+            except ValueError:
+                # Object arrays from an older save; loading those would mean unpickling
+                logger.warning(f"⚠️ Ignoring {path}: saved in an older format")
+                return 0
+        if data["signatures"].shape[1:] != self._signatures.shape[1:]:
+            logger.warning(f"⚠️ Ignoring {path}: saved with a different signature size")
+            return 0
+        count = len(data["labels"])
+        # Oldest first, so the most recent entries survive if capacity shrank
+        for row in range(max(0, count - self.capacity), count):
+            probabilities = data["probabilities"][row] if data["probabilities"].size else None
+            self.add(
+                data["signatures"][row],
+                str(data["labels"][row]),
+                float(data["confidences"][row]),
+                model_version=str(data["versions"][row]) or None,
+                probabilities=probabilities[~np.isnan(probabilities)].tolist() if probabilities is not None else None
+            )
+        logger.info(f"💾 Loaded {min(count, self.capacity)} near-duplicate entries from {path}")
+        return min(count, self.capacity)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._lru),
+                "capacity": self.capacity,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_bytes": self._signatures.nbytes + self._confidences.nbytes,
+            }
+
+
+# Global instance
+near_duplicates = NearDuplicateIndex.from_settings()
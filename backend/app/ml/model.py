@@ -1,17 +1,14 @@
 # D:\Year 5\S1\Advanced_programming\article_classifier\backend\app\ml\model.py
 import os
 import logging
-import re
-from typing import Tuple, Optional, Dict, Any
+from typing import Tuple, Optional, Dict, Any, List
+from app.core import metrics
 from app.core.config import settings
+from app.ml import text_stats
+from app.ml.text_stats import TextStats
 
 logger = logging.getLogger(__name__)
 
-# Khmer Unicode range (Main Khmer + Khmer symbols)
-KHMER_UNICODE_RANGE = re.compile(
-    r'[\u1780-\u17FF\u19E0-\u19FF]+'
-)
-
 # Label mapping - ONLY 6 labels (LABEL_0 to LABEL_5)
 LABEL_MAPPING = {
     # Map by Khmer name
@@ -42,6 +39,7 @@ class ArticleClassifier:
         self.model = None
         self.tokenizer = None
         self.model_has_extra_class = False
+        self.model_version = "dummy"
         self._load_model()
     
     def _load_model(self):
@@ -80,6 +78,7 @@ class ArticleClassifier:
                     
                     # Move model to evaluation mode
                     self.model.eval()
+                    self.model_version = self._read_model_version(model_path)
                     
                     logger.info("✅ Hugging Face model loaded successfully!")
                     logger.info(f"Model type: {type(self.model).__name__}")
@@ -114,6 +113,28 @@ class ArticleClassifier:
             logger.error(traceback.format_exc())
             self.model = self._create_dummy_model()
     
+    @staticmethod
+    def _read_model_version(model_path: str) -> str:
+        """Artifact version from version.txt, stored with every prediction"""
+        version_file = os.path.join(model_path, "version.txt")
+        if os.path.exists(version_file):
+            with open(version_file, encoding="utf-8") as f:
+                version = f.read().strip()
+            if version:
+                return version
+        return "unknown"
+    
+    def class_labels(self, num_classes: int) -> List[str]:
+        """Model label names in class-id order (the order of stored probability vectors)"""
+        id2label = getattr(getattr(self.model, "config", None), "id2label", None) or {}
+        return [id2label.get(idx, f"LABEL_{idx}") for idx in range(num_classes)]
+    
+    @staticmethod
+    def validation_summary(validation_info: Dict[str, Any]) -> Dict[str, Any]:
+        """The parts of validation_info worth keeping with a stored prediction"""
+        keys = ("validation_type", "char_count", "khmer_word_count", "total_word_count", "khmer_percentage", "passed_by")
+        return {key: validation_info[key] for key in keys if key in validation_info}
+    
     def _create_dummy_model(self):
         """Fallback dummy model"""
         class DummyModel:
@@ -142,51 +163,42 @@ class ArticleClassifier:
         
         return DummyModel()
     
-    def _calculate_khmer_percentage(self, text: str) -> float:
-        """Calculate percentage of Khmer characters in text"""
-        if not text or len(text.strip()) == 0:
-            return 0.0
-        
-        # Remove whitespace for calculation
-        text_no_spaces = re.sub(r'\s+', '', text)
-        if len(text_no_spaces) == 0:
-            return 0.0
-        
-        # Find all Khmer character sequences
-        khmer_matches = KHMER_UNICODE_RANGE.findall(text_no_spaces)
-        khmer_chars = sum(len(match) for match in khmer_matches)
-        
-        # Calculate percentage
-        percentage = (khmer_chars / len(text_no_spaces)) * 100
-        return percentage
+    def _calculate_khmer_percentage(self, text: str, stats: Optional[TextStats] = None) -> float:
+        """Calculate percentage of Khmer characters in text (whitespace excluded)"""
+        stats = stats or text_stats.compute(text)
+        return stats.khmer_percentage
     
-    def _count_khmer_words(self, text: str) -> int:
+    def _count_khmer_words(self, text: str, stats: Optional[TextStats] = None) -> int:
         """Count Khmer words in text (compatible with segmentation endpoint)"""
         try:
             from app.ml import preprocessing
-            # Use the same function as the segmentation endpoint
-            result = preprocessing.count_khmer_words(text, max_words=10000)
+            # Use the same function as the segmentation endpoint; a count only needs
+            # rough boundaries, so VALIDATION_SEGMENTER_ENGINE may pick the faster engine
+            result = preprocessing.count_khmer_words(
+                text, max_words=10000, engine=settings.VALIDATION_SEGMENTER_ENGINE or None
+            )
             return result["count"]
         except Exception as e:
             logger.warning(f"Could not use preprocessing.count_khmer_words: {e}")
             # Fallback to simple Khmer word detection
-            # Find Khmer sequences and count them as words
-            khmer_sequences = KHMER_UNICODE_RANGE.findall(text)
-            return len(khmer_sequences)
+            # Count Khmer character runs as words
+            stats = stats or text_stats.compute(text)
+            return stats.khmer_runs
     
-    def _validate_text_length(self, text: str, min_words: int = 50, min_chars: int = 100) -> Tuple[bool, str, Dict]:
+    def _validate_text_length(self, text: str, min_words: int = 50, min_chars: int = 100, stats: Optional[TextStats] = None) -> Tuple[bool, str, Dict]:
         """Validate text length before processing - FIXED VERSION"""
-        if not text or len(text.strip()) == 0:
+        stats = stats or text_stats.compute(text)
+        if stats.stripped_length == 0:
             return False, "Text is empty", {"char_count": 0, "word_count": 0}
         
         # Count characters (including spaces)
-        char_count = len(text.strip())
+        char_count = stats.stripped_length
         
         # Count Khmer words using the same method as segmentation endpoint
-        khmer_word_count = self._count_khmer_words(text)
+        khmer_word_count = self._count_khmer_words(text, stats)
         
         # Get total word count (all words) for reference
-        total_word_count = len(text.strip().split())
+        total_word_count = stats.tokens
         
         # FIXED LOGIC: Text should have at least min_chars characters OR min_words words
         # This matches what your error messages suggest
@@ -209,44 +221,52 @@ class ArticleClassifier:
             "passed_by": "characters" if char_count >= min_chars else "words"
         }
     
-    def _is_valid_khmer_text(self, text: str, min_percentage: float = 50.0) -> Tuple[bool, float, Dict]:
+    def _is_valid_khmer_text(self, text: str, min_percentage: float = 50.0, stats: Optional[TextStats] = None) -> Tuple[bool, float, Dict]:
         """Check if text contains sufficient Khmer characters"""
-        if not text or len(text.strip()) < 10:  # Minimum 10 characters
+        stats = stats or text_stats.compute(text)
+        if stats.stripped_length < 10:  # Minimum 10 characters
             return False, 0.0, {"error": "Text too short"}
         
-        percentage = self._calculate_khmer_percentage(text)
+        percentage = self._calculate_khmer_percentage(text, stats)
         
         analysis = {
             "khmer_percentage": percentage,
-            "text_length": len(text),
+            "text_length": stats.length,
             "is_khmer_dominant": percentage >= min_percentage,
             "suggestion": "Text is suitable for classification" if percentage >= min_percentage else "Text may not be Khmer"
         }
         
         return percentage >= min_percentage, percentage, analysis
     
+    @metrics.timed("validate")
     def _validate_text_for_prediction(self, text: str, min_khmer_percentage: float = 50.0, min_words: int = 50, min_chars: int = 100) -> Tuple[bool, str, Dict]:
         """Complete text validation for prediction - FIXED VERSION"""
+        # One scan of the text serves every check below
+        stats = text_stats.compute(text)
+        
         # 1. Check text length with OR logic
-        is_length_valid, length_msg, length_info = self._validate_text_length(text, min_words, min_chars)
+        is_length_valid, length_msg, length_info = self._validate_text_length(text, min_words, min_chars, stats)
         
         # Log what we found
-        logger.info(f"📏 Length validation: chars={length_info.get('char_count', 0)}, "
-                   f"khmer_words={length_info.get('khmer_word_count', 0)}, "
-                   f"total_words={length_info.get('total_word_count', 0)}")
+        logger.debug("📏 Length validation: chars=%s, khmer_words=%s, total_words=%s",
+                     length_info.get("char_count", 0), length_info.get("khmer_word_count", 0),
+                     length_info.get("total_word_count", 0))
         
         if not is_length_valid:
-            logger.warning(f"📏 Length validation failed: {length_msg}")
+            # Callers report the rejection; the counter keeps the totals
+            logger.debug("📏 Length validation failed: %s", length_msg)
+            metrics.VALIDATION_FAILURES.labels("length").inc()
             return False, length_msg, {"validation_type": "length", **length_info}
         
         # 2. Check Khmer content
-        is_khmer, khmer_percent, khmer_analysis = self._is_valid_khmer_text(text, min_khmer_percentage)
+        is_khmer, khmer_percent, khmer_analysis = self._is_valid_khmer_text(text, min_khmer_percentage, stats)
         
         # Log Khmer percentage
-        logger.info(f"🔤 Khmer validation: {khmer_percent:.1f}% (min: {min_khmer_percentage}%)")
+        logger.debug("🔤 Khmer validation: %.1f%% (min: %s%%)", khmer_percent, min_khmer_percentage)
         
         if not is_khmer:
-            logger.warning(f"🔤 Khmer validation failed: {khmer_percent:.1f}% < {min_khmer_percentage}%")
+            logger.debug("🔤 Khmer validation failed: %.1f%% < %s%%", khmer_percent, min_khmer_percentage)
+            metrics.VALIDATION_FAILURES.labels("khmer_content").inc()
             return False, f"Not enough Khmer content ({khmer_percent:.1f}% < {min_khmer_percentage}% required)", {
                 "validation_type": "khmer_content",
                 "khmer_percentage": khmer_percent,
@@ -255,7 +275,7 @@ class ArticleClassifier:
             }
         
         # All validations passed
-        logger.info("✅ All validations passed!")
+        logger.debug("✅ All validations passed!")
         return True, "Text is valid for classification", {
             "validation_type": "all_passed",
             "char_count": length_info["char_count"],
@@ -278,7 +298,7 @@ class ArticleClassifier:
         
         # Handle extra class (index 6 or "ផ្សេងៗ")
         if predicted_id >= 6 or raw_label in FALLBACK_MAPPING:
-            logger.warning(f"Model predicted unexpected class: {raw_label} (id={predicted_id}), mapping to fallback")
+            logger.warning("Model predicted unexpected class: %s (id=%s), mapping to fallback", raw_label, predicted_id)
             if predicted_id in FALLBACK_MAPPING:
                 return FALLBACK_MAPPING[predicted_id]["code"]
             elif raw_label in FALLBACK_MAPPING:
@@ -287,7 +307,7 @@ class ArticleClassifier:
         # Last resort: clamp to valid range
         if predicted_id >= 6:
             clamped_id = predicted_id % 6  # Wrap around to 0-5
-            logger.warning(f"Clamping invalid ID {predicted_id} to {clamped_id}")
+            logger.warning("Clamping invalid ID %s to %s", predicted_id, clamped_id)
             return f"LABEL_{clamped_id}"
         
         # Fallback
@@ -305,7 +325,7 @@ class ArticleClassifier:
             )
             
             if not is_valid:
-                logger.warning(f"Text validation failed: {error_message}")
+                logger.debug("Text validation failed: %s", error_message)
                 # Return a special result for invalid text
                 return "UNKNOWN", 0.0, {
                     "error": error_message,
@@ -314,12 +334,13 @@ class ArticleClassifier:
                 }
         else:
             # If validation was skipped, create minimal validation info
+            stats = text_stats.compute(text)
             validation_info = {
                 "validation_type": "skipped",
-                "char_count": len(text),
-                "khmer_word_count": self._count_khmer_words(text),
-                "total_word_count": len(text.strip().split()),
-                "khmer_percentage": self._calculate_khmer_percentage(text),
+                "char_count": stats.length,
+                "khmer_word_count": self._count_khmer_words(text, stats),
+                "total_word_count": stats.tokens,
+                "khmer_percentage": stats.khmer_percentage,
                 "passed_by": "validation_skipped"
             }
         
@@ -328,18 +349,22 @@ class ArticleClassifier:
                 import torch
                 
                 # Tokenize
-                inputs = self.tokenizer(
-                    text, 
-                    return_tensors="pt", 
-                    truncation=True, 
-                    max_length=512,
-                    padding=True
-                )
+                with metrics.stage("tokenize"):
+                    inputs = self.tokenizer(
+                        text, 
+                        return_tensors="pt", 
+                        truncation=True, 
+                        max_length=512,
+                        padding=True
+                    )
+                metrics.observe_input_tokens(inputs["attention_mask"])
                 
                 # Predict
                 with torch.no_grad():
-                    outputs = self.model(**inputs)
-                    predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
+                    with metrics.stage("forward"):
+                        outputs = self.model(**inputs)
+                    with metrics.stage("softmax"):
+                        predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
                 
                 # Get predicted class and confidence (ACTUAL values)
                 predicted_class_id = predictions.argmax().item()
@@ -354,34 +379,182 @@ class ArticleClassifier:
                 # Convert to standard format
                 normalized_label = self._normalize_label(actual_label, predicted_class_id)
                 
-                logger.info(f"Actual prediction: class={actual_label} (id={predicted_class_id}), confidence={confidence:.2f}%")
+                logger.debug("Actual prediction: class=%s (id=%s), confidence=%.2f%%", actual_label, predicted_class_id, confidence)
                 
                 # Return with validation info
-                return normalized_label, confidence, {
+                info = {
                     "validation_passed": True,
                     "validation_info": validation_info,
                     "model_used": "real_model" if self.model and hasattr(self.model, 'config') else "dummy_model",
-                    "actual_model_label": actual_label
+                    "actual_model_label": actual_label,
+                    "model_version": self.model_version,
+                    "probabilities": predictions[0].tolist()
                 }
+                return normalized_label, confidence, info
                 
             else:
                 # Dummy model
                 label, confidence = self.model.predict(text)
+                metrics.DUMMY_MODEL_FALLBACKS.inc()
                 return label, confidence, {
                     "validation_passed": True,
                     "validation_info": validation_info,
-                    "model_used": "dummy_model"
+                    "model_used": "dummy_model",
+                    "model_version": self.model_version
                 }
                 
         except Exception as e:
-            logger.error(f"Prediction error: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.exception("Prediction error: %s", e)
             return "LABEL_2", 0.0, {
                 "error": str(e),
                 "validation_info": validation_info
             }
     
+    def predict_batch(self, texts: List[str]) -> List[Tuple[str, float, Dict]]:
+        """Classify already-preprocessed texts in one forward pass (no validation)"""
+        if not texts:
+            return []
+        
+        if self.model is not None and hasattr(self.model, 'config'):
+            import torch
+            
+            # Sort by length so each padded batch wastes as little compute as possible
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+            with metrics.stage("tokenize"):
+                inputs = self.tokenizer(
+                    [texts[i] for i in order],
+                    return_tensors="pt",
+                    truncation=True,
+                    max_length=512,
+                    padding=True
+                )
+            metrics.observe_input_tokens(inputs["attention_mask"])
+            
+            with torch.no_grad():
+                with metrics.stage("forward"):
+                    outputs = self.model(**inputs)
+                with metrics.stage("softmax"):
+                    predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
+            
+            results = [None] * len(texts)
+            for row, original_index in enumerate(order):
+                predicted_class_id = predictions[row].argmax().item()
+                confidence = predictions[row][predicted_class_id].item() * 100
+                if hasattr(self.model.config, 'id2label'):
+                    actual_label = self.model.config.id2label.get(predicted_class_id, f"LABEL_{predicted_class_id}")
+                else:
+                    actual_label = f"LABEL_{predicted_class_id}"
+                results[original_index] = (
+                    self._normalize_label(actual_label, predicted_class_id),
+                    confidence,
+                    {
+                        "model_used": "real_model",
+                        "actual_model_label": actual_label,
+                        "model_version": self.model_version,
+                        "probabilities": predictions[row].tolist()
+                    }
+                )
+            
+            logger.debug("Batch prediction: %d texts, %d tokens padded length", len(texts), inputs["input_ids"].shape[1])
+            return results
+        
+        # Dummy model
+        metrics.DUMMY_MODEL_FALLBACKS.inc(len(texts))
+        return [(*self.model.predict(text), {"model_used": "dummy_model", "model_version": self.model_version}) for text in texts]
+    
+    def predict_or_reuse(self, text: str, raw_text: Optional[str] = None) -> Tuple[str, float, Dict]:
+        """predict() on already-validated, preprocessed text, reusing the label of a near-duplicate if one is indexed"""
+        return self.predict_batch_or_reuse([text], None if raw_text is None else [raw_text])[0]
+    
+    def predict_batch_or_reuse(self, texts: List[str], raw_texts: Optional[List[str]] = None) -> List[Tuple[str, float, Dict]]:
+        """
+        predict_batch() that only runs the model on texts without an indexed near-duplicate
+        
+        This is the path classifications are served from, so metrics.PREDICTIONS
+        is counted here rather than in predict(), which /validate-text also runs.
+        raw_texts are the texts as validated, before preprocessing; near-duplicate
+        signatures are taken from them so their segmentation is a cache hit.
+        """
+        results = self._predict_batch_or_reuse(texts, raw_texts)
+        for category, _, info in results:
+            metrics.PREDICTIONS.labels(category, info.get("model_used", "unknown")).inc()
+        return results
+    
+    def _predict_batch_or_reuse(self, texts: List[str], raw_texts: Optional[List[str]]) -> List[Tuple[str, float, Dict]]:
+        if not settings.DEDUP_ENABLED:
+            return self.predict_batch(texts)
+        from app.ml.dedup import near_duplicates
+        
+        results = [None] * len(texts)
+        signatures = [near_duplicates.signature(text) for text in (texts if raw_texts is None else raw_texts)]
+        to_predict = []
+        for i, signature in enumerate(signatures):
+            match = near_duplicates.lookup(signature, model_version=self.model_version)
+            if match is None:
+                to_predict.append(i)
+                continue
+            logger.info("♻️ Near-duplicate (similarity %.2f), reusing %s", match["similarity"], match["label"],
+                        extra={"event": "dedup.reuse", "similarity": round(match["similarity"], 3)})
+            results[i] = (match["label"], match["confidence"], {
+                "model_used": "near_duplicate",
+                "model_version": match["model_version"],
+                "probabilities": match["probabilities"],
+                "near_duplicate": {"similarity": match["similarity"]}
+            })
+        
+        if to_predict:
+            predictions = self.predict_batch([texts[i] for i in to_predict])
+            for i, (category, confidence, info) in zip(to_predict, predictions):
+                near_duplicates.add(
+                    signatures[i],
+                    category,
+                    confidence,
+                    model_version=info.get("model_version"),
+                    probabilities=info.get("probabilities")
+                )
+                results[i] = (category, confidence, info)
+        return results
+    
+    def classify_batch(self, texts: List[str], min_khmer_percentage: float = 50.0, min_words: int = 50, min_chars: int = 100) -> List[Dict[str, Any]]:
+        """Validate, clean and classify raw texts; invalid texts get an error instead of a label"""
+        from app.ml import preprocessing
+        
+        results = []
+        to_predict = []
+        for text in texts:
+            is_valid, error_message, validation_info = self._validate_text_for_prediction(
+                text,
+                min_khmer_percentage=min_khmer_percentage,
+                min_words=min_words,
+                min_chars=min_chars
+            )
+            if is_valid:
+                to_predict.append(len(results))
+                results.append({"valid": True, "validation_info": validation_info})
+            else:
+                results.append({
+                    "valid": False,
+                    "category": "UNKNOWN",
+                    "confidence": 0.0,
+                    "error": error_message,
+                    "validation_info": validation_info
+                })
+        
+        if to_predict:
+            processed = [preprocessing.preprocess_for_model(texts[i]) for i in to_predict]
+            try:
+                predictions = self.predict_batch_or_reuse(processed, [texts[i] for i in to_predict])
+            except Exception as e:
+                logger.exception("Batch prediction error: %s", e)
+                for i in to_predict:
+                    results[i].update({"valid": False, "category": "UNKNOWN", "confidence": 0.0, "error": str(e)})
+                return results
+            
+            for i, (category, confidence, prediction_info) in zip(to_predict, predictions):
+                results[i].update({"category": category, "confidence": confidence, "prediction_info": prediction_info})
+        
+        return results
+    
     def predict_with_validation(self, text: str, min_khmer_percentage: float = 50.0, min_words: int = 50, min_chars: int = 100) -> Dict[str, Any]:
         """Predict with detailed validation results"""
         # First validate the text
@@ -413,18 +586,23 @@ class ArticleClassifier:
             "prediction_info": prediction_info
         }
     
-    def get_all_probabilities(self, text: str, min_khmer_percentage: float = 50.0, min_words: int = 50, min_chars: int = 100) -> Dict[str, Any]:
-        """Get ACTUAL probabilities with comprehensive validation"""
+    def get_all_probabilities(self, text: str, min_khmer_percentage: float = 50.0, min_words: int = 50, min_chars: int = 100, raw_text: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get ACTUAL probabilities with comprehensive validation
+        
+        raw_text is the text before preprocessing; when given, it is what gets
+        validated, and the model still sees `text`.
+        """
         # Validate text first
         is_valid, error_message, validation_info = self._validate_text_for_prediction(
-            text,
+            text if raw_text is None else raw_text,
             min_khmer_percentage=min_khmer_percentage,
             min_words=min_words,
             min_chars=min_chars
         )
         
         if not is_valid:
-            logger.warning(f"Cannot get probabilities: {error_message}")
+            logger.debug("Cannot get probabilities: %s", error_message)
             return {
                 "valid": False,
                 "error": error_message,
@@ -438,18 +616,22 @@ class ArticleClassifier:
                 import torch
                 
                 # Tokenize the text
-                inputs = self.tokenizer(
-                    text, 
-                    return_tensors="pt", 
-                    truncation=True, 
-                    max_length=512,
-                    padding=True
-                )
+                with metrics.stage("tokenize"):
+                    inputs = self.tokenizer(
+                        text, 
+                        return_tensors="pt", 
+                        truncation=True, 
+                        max_length=512,
+                        padding=True
+                    )
+                metrics.observe_input_tokens(inputs["attention_mask"])
                 
                 # Get model predictions
                 with torch.no_grad():
-                    outputs = self.model(**inputs)
-                    predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
+                    with metrics.stage("forward"):
+                        outputs = self.model(**inputs)
+                    with metrics.stage("softmax"):
+                        predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
                 
                 # Get the number of classes from the model
                 num_classes = predictions.shape[1]
@@ -470,7 +652,7 @@ class ArticleClassifier:
                     # Store the actual probability
                     probabilities[label_name] = probability
                 
-                logger.info(f"Actual model outputs: {probabilities}")
+                logger.debug("Actual model outputs: %s", probabilities)
                 
                 return {
                     "valid": True,
@@ -481,6 +663,7 @@ class ArticleClassifier:
                     
             else:
                 # If using dummy model, return simple fixed probabilities
+                metrics.DUMMY_MODEL_FALLBACKS.inc()
                 return {
                     "valid": True,
                     "probabilities": {
@@ -496,9 +679,7 @@ class ArticleClassifier:
                 }
                 
         except Exception as e:
-            logger.error(f"Error getting probabilities: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.exception("Error getting probabilities: %s", e)
             return {
                 "valid": False,
                 "error": str(e),
@@ -508,19 +689,20 @@ class ArticleClassifier:
     
     def analyze_text(self, text: str) -> Dict[str, Any]:
         """Analyze text without making prediction (for debugging)"""
-        is_khmer, percentage, analysis = self._is_valid_khmer_text(text)
+        stats = text_stats.compute(text)
+        is_khmer, percentage, analysis = self._is_valid_khmer_text(text, stats=stats)
         
         # Count characters by type
-        total_chars = len(text)
-        khmer_chars = sum(len(match) for match in KHMER_UNICODE_RANGE.findall(text))
+        total_chars = stats.length
+        khmer_chars = stats.khmer_chars
         non_khmer_chars = total_chars - khmer_chars
         
         # Get different word counts
-        total_word_count = len(text.strip().split())
-        khmer_word_count = self._count_khmer_words(text)
+        total_word_count = stats.tokens
+        khmer_word_count = self._count_khmer_words(text, stats)
         
         # Check if text would pass validation with OR logic
-        char_count = len(text)
+        char_count = stats.length
         length_valid = (char_count >= 100) or (khmer_word_count >= 50)
         khmer_valid = percentage >= 50.0
         
@@ -538,6 +720,8 @@ class ArticleClassifier:
             "khmer_percentage": percentage,
             "khmer_characters": khmer_chars,
             "non_khmer_characters": non_khmer_chars,
+            "character_classes": stats.character_classes(),
+            "sentence_count": stats.sentences,
             "is_khmer": is_khmer,
             "length_validation": {
                 "valid": length_valid,
@@ -574,6 +758,7 @@ class ArticleClassifier:
                 "model_name": self.model.config._name_or_path if hasattr(self.model.config, '_name_or_path') else "Local Model",
                 "model_loaded": True,
                 "model_format": "safetensors",
+                "model_version": self.model_version,
                 "num_labels": self.model.config.num_labels if hasattr(self.model.config, 'num_labels') else "Unknown",
                 "expected_labels": 6,
                 "labels": model_labels,
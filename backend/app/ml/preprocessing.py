@@ -5,52 +5,160 @@ File: backend/app/ml/preprocessing.py
 """
 
 import re
+import hashlib
 import logging
+import unicodedata
+from typing import NamedTuple, Optional
+
+from app.core import metrics
 
 logger = logging.getLogger(__name__)
 
-def remove_non_khmer_english_and_punct(text: str) -> str:
+SEGMENTER_ENGINES = ("khmernltk", "trie")
+
+# Khmer sentence terminators: ។ (khan) and ៕ (bariyoosan)
+KHMER_SENTENCE_END = re.compile(r'(?<=[។៕])\s*')
+
+# Characters removed by cleaning. Keep:
+# - Khmer Unicode range: U+1780-U+17FF (main Khmer block)
+# - Khmer Symbols: U+19E0-U+19FF (extended Khmer symbols)
+# - Zero-width space/non-joiner/joiner: U+200B-U+200D (for proper Khmer rendering)
+# - English letters: a-zA-Z
+# - Numbers: 0-9
+# - Whitespace and basic punctuation: .,!? (។ ៕ are in the Khmer block)
+NON_KEPT_CHARS = re.compile(r'[^\u1780-\u17FF\u19E0-\u19FF\u200B-\u200Da-zA-Z0-9\s.,!?]+')
+
+_ZERO_WIDTH = ('\u200B', '\u200C', '\u200D')
+_ASCII_LETTERS = b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_ASCII_DIGITS = b'0123456789'
+
+
+class NormalizedText(NamedTuple):
+    """Output of normalize(); counts refer to `text`"""
+    text: str
+    khmer_chars: int      # U+1780-U+17FF and U+19E0-U+19FF
+    latin_chars: int      # a-z, A-Z
+    digit_chars: int      # 0-9
+    space_chars: int
+    other_chars: int      # kept punctuation and zero-width characters
+    removed_chars: int    # input characters deleted by cleaning (collapsed whitespace not included)
+
+
+def _is_khmer_char(char: str) -> bool:
+    return '\u1780' <= char <= '\u17FF'
+
+
+@metrics.timed("clean")
+def normalize(text: str, join_khmer: bool = True) -> NormalizedText:
     """
-    Remove special characters but keep Khmer, English, numbers, and basic punctuation
+    Clean, whitespace-normalize and (optionally) Khmer-join text in one pass
+    
+    Produces exactly what the former chain of regex substitutions did:
+    characters outside the kept set are deleted, whitespace runs become one
+    space and the ends are stripped, and with join_khmer a space between two
+    main-block Khmer characters (U+1780-U+17FF) is removed, since the model
+    expects continuous Khmer text. Every step is a C-level scan (one
+    precompiled substitution, split, join); the Khmer join only looks at word
+    boundaries.
+    
+    Character counts are derived without another per-character pass: the
+    cleaned text holds only Khmer, zero-width and ASCII characters, so its
+    ASCII subset (bytes) and three str.count calls are enough.
     
     Args:
-        text: Input text to clean
+        text: Raw input text
+        join_khmer: Remove spaces between Khmer characters (model input)
         
     Returns:
-        Cleaned text with only valid characters
+        NormalizedText with the result and its character-class counts
     """
     if not text:
-        return ""
+        return NormalizedText("", 0, 0, 0, 0, 0, 0)
     
-    # Keep: 
-    # - Khmer Unicode range: U+1780-U+17FF (main Khmer block)
-    # - Khmer Symbols: U+19E0-U+19FF (extended Khmer symbols)
-    # - Zero-width joiner/non-joiner: U+200B-U+200D (for proper Khmer rendering)
-    # - English letters: a-zA-Z
-    # - Numbers: 0-9
-    # - Spaces and basic punctuation: .,!?។៕
-    # NOTE: Fixed the zero-width character range syntax
-    pattern = r'[^\u1780-\u17FF\u19E0-\u19FF\u200B-\u200Da-zA-Z0-9\s.,!?។៕]'
-    cleaned = re.sub(pattern, '', text)
+    kept = NON_KEPT_CHARS.sub('', text)
+    removed = len(text) - len(kept)
+    words = kept.split()
+    if not words:
+        return NormalizedText("", 0, 0, 0, 0, 0, removed)
     
-    # Normalize whitespace (multiple spaces → single space)
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+    if join_khmer:
+        pieces = [words[0]]
+        spaces = 0
+        for previous, word in zip(words, words[1:]):
+            if not (_is_khmer_char(previous[-1]) and _is_khmer_char(word[0])):
+                pieces.append(' ')
+                spaces += 1
+            pieces.append(word)
+        cleaned = ''.join(pieces)
+    else:
+        cleaned = ' '.join(words)
+        spaces = len(words) - 1
     
-    logger.debug(f"Original text length: {len(text)}, Cleaned text length: {len(cleaned)}")
+    ascii_chars = cleaned.encode('ascii', 'ignore')
+    latin = len(ascii_chars) - len(ascii_chars.translate(None, _ASCII_LETTERS))
+    digits = len(ascii_chars) - len(ascii_chars.translate(None, _ASCII_DIGITS))
+    zero_width = sum(cleaned.count(char) for char in _ZERO_WIDTH)
+    khmer = len(cleaned) - len(ascii_chars) - zero_width
+    punctuation = len(ascii_chars) - latin - digits - spaces
+    return NormalizedText(cleaned, khmer, latin, digits, spaces, punctuation + zero_width, removed)
+
+
+def remove_non_khmer_english_and_punct(text: str) -> str:
+    """
+    Remove special characters but keep Khmer, English, numbers, and basic punctuation
     
+    Args:
+        text: Input text to clean
+        
+    Returns:
+        Cleaned text with only valid characters, whitespace collapsed
+    """
+    cleaned = normalize(text, join_khmer=False).text
+    logger.debug("Original text length: %d, Cleaned text length: %d", len(text or ""), len(cleaned))
     return cleaned
 
 
-def count_khmer_words(text: str, max_words: int = 512) -> dict:
+def _iter_sentence_words(sentences: list, word_tokenize, parallel: bool = False):
+    """
+    Yield the non-blank khmernltk tokens of each sentence, in order
+    
+    Cached sentences come from the segmentation cache. With parallel, the
+    rest are segmented in the segmentation process pool; otherwise here.
+    """
+    from app.ml.segment_cache import segmentation_cache
+    
+    cached = [segmentation_cache.get(sentence) for sentence in sentences]
+    if parallel:
+        from app.ml import segment_pool
+        computed = segment_pool.segment_parallel([s for s, words in zip(sentences, cached) if words is None])
+    else:
+        # Filter out empty strings and whitespace-only tokens
+        computed = (tuple(w.strip() for w in word_tokenize(s) if w.strip()) for s, words in zip(sentences, cached) if words is None)
+    
+    try:
+        for sentence, words in zip(sentences, cached):
+            if words is None:
+                words = next(computed)
+                segmentation_cache.put(sentence, words)
+            yield words
+    finally:
+        computed.close()
+
+
+@metrics.timed("segment")
+def count_khmer_words(text: str, max_words: int = 512, engine: Optional[str] = None) -> dict:
     """
     Count and segment Khmer words using khmernltk
     
     This function uses khmernltk's word_tokenize for accurate Khmer word segmentation.
+    With engine="trie" the much faster lexicon segmenter is used instead
+    (falling back to khmernltk if no lexicon is installed).
     Falls back to simple space-based splitting if khmernltk is not available.
     
     Args:
         text: Khmer text to segment
         max_words: Maximum number of words to return
+        engine: "khmernltk" or "trie"; defaults to settings.SEGMENTER_ENGINE
         
     Returns:
         dict with keys:
@@ -66,30 +174,51 @@ def count_khmer_words(text: str, max_words: int = 512) -> dict:
             "truncated": False
         }
     
+    from app.core.config import settings
+    
+    engine = engine or settings.SEGMENTER_ENGINE
+    if engine not in SEGMENTER_ENGINES:
+        raise ValueError(f"Unknown segmenter engine: {engine!r} (expected one of {', '.join(SEGMENTER_ENGINES)})")
+    
+    if engine == "trie":
+        from app.ml import trie_segmenter
+        words = trie_segmenter.segment(text)
+        if words is not None:
+            return {
+                "count": min(len(words), max_words),
+                "words": words[:max_words],
+                "truncated": len(words) > max_words
+            }
+    
     try:
         # CRITICAL: Try to use khmernltk for proper Khmer word segmentation
         try:
             from khmernltk import word_tokenize
             
-            logger.info("✅ Using khmernltk for Khmer word segmentation")
+            logger.debug("✅ Using khmernltk for Khmer word segmentation")
             
-            # Tokenize using khmernltk - this properly segments Khmer words!
-            words = word_tokenize(text)
+            from app.ml import segment_pool
             
-            logger.info(f"khmernltk segmented text into {len(words)} words")
-            logger.debug(f"First 5 words: {words[:5] if len(words) > 5 else words}")
+            # Segment sentence by sentence so unchanged sentences come from the cache
+            # and long articles can be spread over the process pool; stop once more
+            # than max_words are known (enough to report truncation)
+            sentences = [sentence.strip() for sentence in split_sentences(text)]
+            parallel = segment_pool.enabled() and len(text) >= settings.SEGMENT_PARALLEL_MIN_CHARS and len(sentences) > 1
+            words = []
+            for sentence_words in _iter_sentence_words(sentences, word_tokenize, parallel=parallel):
+                words.extend(sentence_words)
+                if len(words) > max_words:
+                    break
             
-            # Filter out empty strings and whitespace-only tokens
-            words = [w.strip() for w in words if w.strip()]
-            
-            original_count = len(words)
+            logger.debug("khmernltk segmented text into %d words", len(words))
+            logger.debug("First 5 words: %s", words[:5])
             
             # Check if truncation is needed
-            truncated = original_count > max_words
+            truncated = len(words) > max_words
             
             if truncated:
                 words = words[:max_words]
-                logger.info(f"✂️ Text truncated from {original_count} to {max_words} words")
+                logger.debug("✂️ Text truncated to %d words", max_words)
             
             return {
                 "count": len(words),
@@ -107,14 +236,14 @@ def count_khmer_words(text: str, max_words: int = 512) -> dict:
             words = text.split()
             words = [w.strip() for w in words if w.strip()]
             
-            logger.warning(f"Fallback produced {len(words)} words (space-based)")
+            logger.warning("Fallback produced %d words (space-based)", len(words))
             
             original_count = len(words)
             truncated = original_count > max_words
             
             if truncated:
                 words = words[:max_words]
-                logger.info(f"Fallback: Text truncated from {original_count} to {max_words} words")
+                logger.debug("Fallback: Text truncated from %d to %d words", original_count, max_words)
             
             return {
                 "count": len(words),
@@ -123,9 +252,7 @@ def count_khmer_words(text: str, max_words: int = 512) -> dict:
             }
             
     except Exception as e:
-        logger.error(f"❌ Error in count_khmer_words: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
+        logger.exception("❌ Error in count_khmer_words: %s", e)
         
         # Emergency fallback
         words = text.split()
@@ -143,7 +270,9 @@ def preprocess_for_model(text: str) -> str:
     Preprocess text for model prediction
     
     This function cleans the text but does NOT segment it into words,
-    as the transformer model does its own tokenization.
+    as the transformer model does its own tokenization. Spaces between
+    Khmer characters are removed because the model expects continuous
+    Khmer text.
     
     Args:
         text: Raw input text
@@ -151,24 +280,9 @@ def preprocess_for_model(text: str) -> str:
     Returns:
         Cleaned text ready for model input
     """
-    if not text:
-        return ""
-    
-    # Step 1: Remove special characters (keep Khmer, English, numbers, basic punctuation)
-    cleaned = remove_non_khmer_english_and_punct(text)
-    
-    logger.debug(f"After cleaning: '{cleaned}'")
-    
-    # Step 2: Normalize whitespace
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-    
-    # Step 3: For Khmer text, remove spaces between Khmer characters
-    # This is important because some Khmer text has spaces between words,
-    # but the model expects continuous Khmer text
-    # Pattern: space between Khmer characters → remove space
-    cleaned = re.sub(r'(?<=[\u1780-\u17FF])\s+(?=[\u1780-\u17FF])', '', cleaned)
+    cleaned = normalize(text).text
     
-    logger.info(f"Preprocessed text length: {len(cleaned)} characters")
+    logger.debug("Preprocessed text length: %d characters", len(cleaned))
     
     return cleaned
 
@@ -189,4 +303,67 @@ def segment_for_display(text: str, max_words: int = 50) -> str:
     if result["truncated"]:
         return ' '.join(result["words"]) + '...'
     else:
-        return ' '.join(result["words"])
\ No newline at end of file
+        return ' '.join(result["words"])
+
+
+def split_sentences(text: str) -> list:
+    """
+    Split text after Khmer sentence terminators (។, ៕)
+    
+    Args:
+        text: Text to split
+        
+    Returns:
+        List of non-empty sentences, terminators kept at the end of each
+    """
+    return [s for s in KHMER_SENTENCE_END.split(text) if s.strip()]
+
+
+def iter_text_chunks(text: str, max_chars: int = 2000):
+    """
+    Group sentences into chunks of roughly max_chars characters
+    
+    Sentences are never split, so a single sentence longer than max_chars
+    becomes its own chunk.
+    
+    Args:
+        text: Text to chunk
+        max_chars: Target chunk size in characters
+        
+    Yields:
+        Consecutive chunks that together cover every sentence in order
+    """
+    chunk = []
+    size = 0
+    for sentence in split_sentences(text):
+        if chunk and size + len(sentence) > max_chars:
+            yield ' '.join(chunk)
+            chunk = []
+            size = 0
+        chunk.append(sentence)
+        size += len(sentence)
+    if chunk:
+        yield ' '.join(chunk)
+
+
+def normalize_for_hash(text: str) -> str:
+    """
+    Canonical form used to decide whether two articles are the same
+    
+    NFC-normalizes the text and collapses all whitespace runs, so copies that
+    differ only in spacing or Unicode composition map to the same key.
+    """
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def content_hash(text: str) -> str:
+    """
+    SHA-256 hex digest of the normalized text (article key, cache key)
+    
+    Args:
+        text: Raw article text
+        
+    Returns:
+        64-character lowercase hex string
+    """
+    return hashlib.sha256(normalize_for_hash(text).encode('utf-8')).hexdigest()
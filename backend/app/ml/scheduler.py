@@ -0,0 +1,197 @@
+"""
+Priority lanes for classification work
+
+Interactive UI traffic and bulk backfills share the same model. Every unit of
+classification work (cleaning, segmentation, validation, inference) is
+admitted through a lane; lanes get weighted-fair dispatch into a fixed number
+of model slots and each lane has its own concurrency cap, so bulk traffic can
+never occupy the slots reserved for interactive requests.
+
+File: backend/app/ml/scheduler.py
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+BACKGROUND = "background"
+LANES = (INTERACTIVE, BATCH, BACKGROUND)
+
+
+class LaneTimeout(Exception):
+    """Raised when work waited longer than allowed for a model slot"""
+
+    def __init__(self, lane: str, waited: float):
+        super().__init__(f"Lane '{lane}' is saturated (waited {waited:.1f}s for a model slot)")
+        self.lane = lane
+        self.waited = waited
+
+
+class _Ticket:
+    __slots__ = ("event", "granted")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+
+class _Lane:
+    def __init__(self, name: str, weight: int, max_concurrency: int):
+        self.name = name
+        self.weight = max(1, weight)
+        self.max_concurrency = max(1, max_concurrency)
+        self.active = 0
+        self.waiting = deque()
+        self.virtual_time = 0.0
+        # Counters for /lanes
+        self.dispatched = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class LaneScheduler:
+    """
+    Weighted-fair scheduler over a fixed pool of model slots.
+
+    Uses start-time fair queuing: each lane carries a virtual time that advances
+    by 1/weight per dispatched unit, and the backlogged lane with the smallest
+    virtual time gets the next free slot. A lane coming back from idle is moved
+    up to the current virtual time so it cannot bank credit while idle.
+    """
+
+    def __init__(self, capacity: int, lanes: Dict[str, Dict[str, int]], max_wait: Optional[float] = None):
+        self.capacity = max(1, capacity)
+        self.max_wait = max_wait
+        self._lanes = {
+            name: _Lane(name, cfg["weight"], min(cfg["max_concurrency"], self.capacity))
+            for name, cfg in lanes.items()
+        }
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._virtual_time = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "LaneScheduler":
+        return cls(
+            capacity=settings.MODEL_CONCURRENCY,
+            lanes={
+                INTERACTIVE: {
+                    "weight": settings.LANE_INTERACTIVE_WEIGHT,
+                    "max_concurrency": settings.LANE_INTERACTIVE_MAX_CONCURRENCY,
+                },
+                BATCH: {
+                    "weight": settings.LANE_BATCH_WEIGHT,
+                    "max_concurrency": settings.LANE_BATCH_MAX_CONCURRENCY,
+                },
+                BACKGROUND: {
+                    "weight": settings.LANE_BACKGROUND_WEIGHT,
+                    "max_concurrency": settings.LANE_BACKGROUND_MAX_CONCURRENCY,
+                },
+            },
+            max_wait=settings.LANE_MAX_WAIT_SECONDS,
+        )
+
+    def resolve(self, lane: Optional[str], default: str = INTERACTIVE) -> str:
+        """Map a requested lane name to a known lane, falling back to the default"""
+        if lane:
+            name = lane.strip().lower()
+            if name in self._lanes:
+                return name
+            logger.warning(f"Unknown priority lane '{lane}', using '{default}'")
+        return default
+
+    @contextmanager
+    def slot(self, lane: str = INTERACTIVE):
+        """Hold one model slot in the given lane for the duration of the block"""
+        self._acquire(lane)
+        try:
+            yield
+        finally:
+            self._release(lane)
+
+    def _acquire(self, lane_name: str):
+        lane = self._lanes[lane_name]
+        ticket = _Ticket()
+        started = time.monotonic()
+
+        with self._lock:
+            if not lane.waiting and lane.active == 0:
+                # Lane was idle: don't let it claim credit for the idle period
+                lane.virtual_time = max(lane.virtual_time, self._virtual_time)
+            lane.waiting.append(ticket)
+            self._dispatch()
+
+        if not ticket.event.wait(self.max_wait):
+            with self._lock:
+                if not ticket.granted:
+                    lane.waiting.remove(ticket)
+                    lane.timeouts += 1
+                    raise LaneTimeout(lane_name, time.monotonic() - started)
+
+        waited = time.monotonic() - started
+        with self._lock:
+            lane.total_wait += waited
+            lane.max_wait = max(lane.max_wait, waited)
+
+    def _release(self, lane_name: str):
+        with self._lock:
+            self._lanes[lane_name].active -= 1
+            self._in_use -= 1
+            self._dispatch()
+
+    def _dispatch(self):
+        """Hand free slots to waiting tickets. Caller must hold the lock."""
+        while self._in_use < self.capacity:
+            eligible = [
+                lane for lane in self._lanes.values()
+                if lane.waiting and lane.active < lane.max_concurrency
+            ]
+            if not eligible:
+                return
+
+            lane = min(eligible, key=lambda l: l.virtual_time)
+            self._virtual_time = lane.virtual_time
+            lane.virtual_time += 1.0 / lane.weight
+
+            ticket = lane.waiting.popleft()
+            ticket.granted = True
+            lane.active += 1
+            lane.dispatched += 1
+            self._in_use += 1
+            ticket.event.set()
+
+    def stats(self) -> Dict[str, object]:
+        """Snapshot of slot usage per lane"""
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "in_use": self._in_use,
+                "max_wait_seconds": self.max_wait,
+                "lanes": {
+                    lane.name: {
+                        "weight": lane.weight,
+                        "max_concurrency": lane.max_concurrency,
+                        "active": lane.active,
+                        "waiting": len(lane.waiting),
+                        "dispatched": lane.dispatched,
+                        "timeouts": lane.timeouts,
+                        "avg_wait_ms": (lane.total_wait / lane.dispatched * 1000) if lane.dispatched else 0.0,
+                        "max_wait_ms": lane.max_wait * 1000,
+                    }
+                    for lane in self._lanes.values()
+                },
+            }
+
+
+# Global instance
+scheduler = LaneScheduler.from_settings()
@@ -0,0 +1,128 @@
+"""
+Process pool for segmenting long articles in parallel
+
+khmernltk's CRF segmenter is pure Python and holds the GIL, so threads don't
+help: a 20k-character article takes ~0.5 s on one core. For texts of at
+least SEGMENT_PARALLEL_MIN_CHARS characters, count_khmer_words hands
+sentences that are not in the segmentation cache to this pool in shards of
+about SEGMENT_SHARD_CHARS characters, and merges the results in order.
+
+Workers are spawned (not forked, since the server process runs threads)
+on first use and load the CRF model once. They live until shutdown() runs
+at application shutdown. Shards are submitted a window at a time so that a
+small max_words stops the work early, the same as the in-process path.
+
+The pool is off by default (SEGMENT_POOL_WORKERS=0). Each gunicorn worker
+gets its own pool, so it only pays off when every pool process has a core of
+its own: at least WEB_CONCURRENCY * (1 + SEGMENT_POOL_WORKERS) cores, e.g.
+12 for 4 workers with pools of 2. Without spare cores the pickling and
+scheduling cost is pure overhead (on one CPU: 0.45x at 4k characters, 0.86x
+at 20k). Run benchmarks.segmentation on the target host and enable the pool
+only where it reports a speedup above 1 for the article sizes the service
+sees, with SEGMENT_PARALLEL_MIN_CHARS at the smallest such size.
+
+File: backend/app/ml/segment_pool.py
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _init_worker():
+    # Load the CRF model once per worker rather than on its first shard
+    from khmernltk import word_tokenize
+    logging.getLogger("khmer-nltk").setLevel(logging.WARNING)
+    word_tokenize("ក")
+
+
+def segment_shard(sentences: Sequence[str]) -> List[Tuple[str, ...]]:
+    """Non-blank tokens of each sentence (runs in a pool worker)"""
+    from khmernltk import word_tokenize
+    return [tuple(w.strip() for w in word_tokenize(sentence) if w.strip()) for sentence in sentences]
+
+
+def enabled() -> bool:
+    return settings.SEGMENT_POOL_WORKERS > 0
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.SEGMENT_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+            logger.info(f"🧵 Started segmentation pool with {settings.SEGMENT_POOL_WORKERS} workers")
+            if (os.cpu_count() or 1) <= settings.SEGMENT_POOL_WORKERS:
+                logger.warning(f"⚠️ Segmentation pool has {settings.SEGMENT_POOL_WORKERS} workers on "
+                               f"{os.cpu_count()} CPUs; it can only add overhead here")
+        return _executor
+
+
+def make_shards(sentences: Sequence[str], shard_chars: int) -> List[List[str]]:
+    """Group consecutive sentences into shards of roughly shard_chars characters"""
+    shards, shard, size = [], [], 0
+    for sentence in sentences:
+        if shard and size + len(sentence) > shard_chars:
+            shards.append(shard)
+            shard, size = [], 0
+        shard.append(sentence)
+        size += len(sentence)
+    if shard:
+        shards.append(shard)
+    return shards
+
+
+def segment_parallel(sentences: Sequence[str]) -> Iterator[Tuple[str, ...]]:
+    """
+    Yield each sentence's tokens in order, segmenting shards in the pool
+
+    At most one shard per worker (plus one) is in flight, and shards not yet
+    started are cancelled when the consumer stops iterating. Falls back to
+    segmenting in this process if the pool breaks.
+    """
+    shards = make_shards(sentences, settings.SEGMENT_SHARD_CHARS)
+    window = settings.SEGMENT_POOL_WORKERS + 1
+    finished = 0  # shards fully yielded
+    pending = []
+    try:
+        executor = _get_executor()
+        pending = [executor.submit(segment_shard, shard) for shard in shards[:window]]
+        while pending:
+            results = pending[0].result()
+            pending.pop(0)
+            submitted = finished + 1 + len(pending)
+            if submitted < len(shards):
+                pending.append(executor.submit(segment_shard, shards[submitted]))
+            yield from results
+            finished += 1
+    except (BrokenProcessPool, OSError) as e:
+        logger.error(f"❌ Segmentation pool failed, segmenting in-process: {e}")
+        shutdown()
+        for shard in shards[finished:]:
+            yield from segment_shard(shard)
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,161 @@
+"""
+Character-level statistics of an article, computed in one scan
+
+Validation and analysis need the same handful of numbers (Khmer share of
+non-whitespace characters, stripped length, whitespace token count, ...).
+compute() derives all of them from a single classification of every code
+point, so a request scans its text once instead of once per check.
+
+Texts of at least NUMPY_MIN_CHARS characters are classified as a NumPy
+code-point array through a lookup table; shorter texts (titles, short
+probes) use a plain loop, which beats NumPy's fixed per-call overhead
+there. Both paths give identical results.
+
+Definitions match the checks they replace: Khmer means U+1780-U+17FF and
+U+19E0-U+19FF (Khmer digits and punctuation included), whitespace is what
+str.isspace() / regex \\s accept, Latin and digits are ASCII.
+
+File: backend/app/ml/text_stats.py
+"""
+
+from typing import Dict, NamedTuple
+
+import numpy as np
+
+NUMPY_MIN_CHARS = 80   # crossover measured on CPython 3.11 / NumPy 1.26
+
+# Character classes
+OTHER, KHMER, LATIN, DIGIT, WHITESPACE = range(5)
+SENTENCE_TERMINATORS = ("\u17D4", "\u17D5")  # khan, bariyoosan
+
+# No code point above U+3000 is whitespace, so classes are tabulated up to
+# there; one extra OTHER slot takes every higher code point after clipping.
+_TABLE_SIZE = 0x3002
+
+
+def _classify(code: int) -> int:
+    char = chr(code)
+    if 0x1780 <= code <= 0x17FF or 0x19E0 <= code <= 0x19FF:
+        return KHMER
+    if char.isspace():
+        return WHITESPACE
+    if char.isascii() and char.isalpha():
+        return LATIN
+    if char.isascii() and char.isdigit():
+        return DIGIT
+    return OTHER
+
+
+_CLASS_TABLE = np.array([_classify(code) for code in range(_TABLE_SIZE - 1)] + [OTHER], dtype=np.uint8)
+_CLASS_LOOKUP = {chr(code): int(cls) for code, cls in enumerate(_CLASS_TABLE[:-1]) if cls != OTHER}
+
+
+class TextStats(NamedTuple):
+    length: int               # len(text)
+    stripped_length: int      # len(text.strip())
+    khmer_chars: int
+    latin_chars: int
+    digit_chars: int
+    whitespace_chars: int
+    other_chars: int
+    tokens: int               # whitespace-separated tokens, len(text.split())
+    khmer_runs: int           # maximal runs of Khmer characters (rough word count without a segmenter)
+    sentences: int            # as many as preprocessing.split_sentences() returns
+
+    @property
+    def non_whitespace_chars(self) -> int:
+        return self.length - self.whitespace_chars
+
+    @property
+    def khmer_percentage(self) -> float:
+        """Share of Khmer among non-whitespace characters, 0-100"""
+        if not self.non_whitespace_chars:
+            return 0.0
+        return self.khmer_chars / self.non_whitespace_chars * 100
+
+    def character_classes(self) -> Dict[str, int]:
+        return {
+            "khmer": self.khmer_chars,
+            "latin": self.latin_chars,
+            "digit": self.digit_chars,
+            "whitespace": self.whitespace_chars,
+            "other": self.other_chars,
+        }
+
+
+def _sentence_count(text: str) -> int:
+    # Every terminator closes a sentence; text after the last one is a sentence if not blank
+    terminators = sum(text.count(t) for t in SENTENCE_TERMINATORS)
+    last = max(text.rfind(t) for t in SENTENCE_TERMINATORS)
+    tail = text[last + 1:] if last >= 0 else text
+    return terminators + (1 if tail and not tail.isspace() else 0)
+
+
+def _runs(mask: np.ndarray) -> int:
+    """Number of maximal True runs"""
+    if not mask.size:
+        return 0
+    return int(mask[0]) + int(np.count_nonzero(mask[1:] & ~mask[:-1]))
+
+
+def _compute_numpy(text: str) -> TextStats:
+    codes = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    classes = _CLASS_TABLE[np.minimum(codes, _TABLE_SIZE - 1)]
+    counts = np.bincount(classes, minlength=5)
+
+    whitespace = classes == WHITESPACE
+    content = np.flatnonzero(~whitespace)
+    stripped_length = int(content[-1] - content[0] + 1) if content.size else 0
+    return TextStats(
+        length=len(text),
+        stripped_length=stripped_length,
+        khmer_chars=int(counts[KHMER]),
+        latin_chars=int(counts[LATIN]),
+        digit_chars=int(counts[DIGIT]),
+        whitespace_chars=int(counts[WHITESPACE]),
+        other_chars=int(counts[OTHER]),
+        tokens=_runs(~whitespace),
+        khmer_runs=_runs(classes == KHMER),
+        sentences=_sentence_count(text),
+    )
+
+
+def _compute_python(text: str) -> TextStats:
+    counts = [0, 0, 0, 0, 0]
+    tokens = khmer_runs = 0
+    first = last = -1
+    previous = WHITESPACE
+    lookup = _CLASS_LOOKUP.get
+    for index, char in enumerate(text):
+        cls = lookup(char, OTHER)
+        counts[cls] += 1
+        if cls != WHITESPACE:
+            if first < 0:
+                first = index
+            last = index
+            if previous == WHITESPACE:
+                tokens += 1
+        if cls == KHMER and previous != KHMER:
+            khmer_runs += 1
+        previous = cls
+    return TextStats(
+        length=len(text),
+        stripped_length=last - first + 1 if first >= 0 else 0,
+        khmer_chars=counts[KHMER],
+        latin_chars=counts[LATIN],
+        digit_chars=counts[DIGIT],
+        whitespace_chars=counts[WHITESPACE],
+        other_chars=counts[OTHER],
+        tokens=tokens,
+        khmer_runs=khmer_runs,
+        sentences=_sentence_count(text),
+    )
+
+
+def compute(text: str) -> TextStats:
+    """Statistics of `text` (None / empty gives all zeros)"""
+    if not text:
+        return TextStats(0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+    if len(text) >= NUMPY_MIN_CHARS:
+        return _compute_numpy(text)
+    return _compute_python(text)
@@ -0,0 +1,224 @@
+"""
+Dictionary-based Khmer word segmentation (array-backed trie + Viterbi)
+
+A faster alternative to khmernltk's CRF model (about 8x on the sample
+sentences in benchmarks/segmenters.py) for callers that need word counts more
+than exact boundaries.
+
+Text is first split into orthographic clusters (a base consonant or
+independent vowel plus any coeng+consonant subscripts, dependent vowels and
+signs), so a word boundary can never fall inside a cluster. Whitespace and
+U+200B are hard boundaries; digits, Latin words and punctuation are tokens of
+their own. Each run of Khmer clusters is segmented by Viterbi over the
+lexicon trie: a dictionary word costs -log(frequency) (or 1 when the lexicon
+has no counts, i.e. maximal matching), a cluster not covered by any word
+costs more than the rarest word, and adjacent uncovered clusters are merged
+into one token.
+
+The lexicon is a UTF-8 file with one word per line, optionally followed by a
+tab and a count (build one with python -m app.cli.build_lexicon). The trie is
+stored in flat arrays: children of a node are a contiguous, sorted slice of
+`labels`/`targets`, found by binary search.
+
+File: backend/app/ml/trie_segmenter.py
+"""
+
+import logging
+import math
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Clusters: breaks | Khmer cluster | numbers, Latin words, any other single character
+_TOKENS = re.compile(
+    r'(?P<space>[\s\u200B]+)'
+    r'|(?P<khmer>[\u1780-\u17B3](?:\u17D2[\u1780-\u17B3]|[\u17B4-\u17D1\u17D3\u17DD\u200C\u200D])*)'
+    r'|(?P<atom>[0-9\u17E0-\u17E9]+(?:[.,][0-9\u17E0-\u17E9]+)*|[A-Za-z]+|.)',
+    re.S
+)
+
+_UNKNOWN_PENALTY = 2.0
+
+
+def khmer_clusters(text: str) -> List[str]:
+    """Orthographic clusters of a run of Khmer text (whitespace and other characters dropped)"""
+    return [m.group("khmer") for m in _TOKENS.finditer(text) if m.group("khmer")]
+
+
+class KhmerTrie:
+    """Immutable character trie in flat arrays, with a cost per terminal node"""
+
+    def __init__(self, words: Dict[str, float]):
+        # Build a dict trie, then lay it out breadth-first so each node's
+        # children are contiguous and sorted by code point
+        root: dict = {}
+        for word in words:
+            node = root
+            for char in word:
+                node = node.setdefault(char, {})
+            node[""] = words[word]
+
+        self.offsets = array("I", [0])
+        self.labels = array("I")
+        self.targets = array("I")
+        self.costs = array("f")
+        queue = deque([root])
+        next_id = 1
+        while queue:
+            node = queue.popleft()
+            self.costs.append(node.get("", math.inf))
+            for char in sorted(c for c in node if c):
+                self.labels.append(ord(char))
+                self.targets.append(next_id)
+                next_id += 1
+                queue.append(node[char])
+            self.offsets.append(len(self.labels))
+
+    @property
+    def node_count(self) -> int:
+        return len(self.costs)
+
+    def child(self, node: int, char: str) -> int:
+        """Child node id, or 0 if there is none (the root is never a child)"""
+        lo, hi = self.offsets[node], self.offsets[node + 1]
+        code = ord(char)
+        i = bisect_left(self.labels, code, lo, hi)
+        if i < hi and self.labels[i] == code:
+            return self.targets[i]
+        return 0
+
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.offsets, self.labels, self.targets, self.costs))
+
+
+class TrieSegmenter:
+    def __init__(self, words: Dict[str, float]):
+        self.trie = KhmerTrie(words)
+        self.unknown_cost = max(words.values(), default=1.0) + _UNKNOWN_PENALTY
+        self.word_count = len(words)
+
+    @classmethod
+    def from_file(cls, path: str) -> "TrieSegmenter":
+        counts: Dict[str, int] = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                word, _, count = line.rstrip("\n").partition("\t")
+                word = word.strip()
+                if word:
+                    counts[word] = counts.get(word, 0) + (int(count) if count.strip() else 0)
+        return cls(cls.word_costs(counts))
+
+    @staticmethod
+    def word_costs(counts: Dict[str, int]) -> Dict[str, float]:
+        """Negative log frequency per word; uniform cost 1 if no counts are given"""
+        total = sum(counts.values())
+        if not total:
+            return {word: 1.0 for word in counts}
+        return {word: -math.log(max(count, 1) / total) for word, count in counts.items()}
+
+    def _segment_run(self, clusters: List[str]) -> List[str]:
+        n = len(clusters)
+        best = [0.0] + [math.inf] * n
+        back: List[Tuple[int, bool]] = [(0, False)] * (n + 1)  # (start, known word)
+        trie = self.trie
+        for i in range(n):
+            if best[i] == math.inf:
+                continue
+            # Fallback: the cluster on its own, as an unknown token
+            cost = best[i] + self.unknown_cost
+            if cost < best[i + 1]:
+                best[i + 1] = cost
+                back[i + 1] = (i, False)
+            node = 0
+            for j in range(i, n):
+                for char in clusters[j]:
+                    node = trie.child(node, char)
+                    if not node:
+                        break
+                if not node:
+                    break
+                word_cost = trie.costs[node]
+                if word_cost != math.inf and best[i] + word_cost < best[j + 1]:
+                    best[j + 1] = best[i] + word_cost
+                    back[j + 1] = (i, True)
+
+        # Walk back, merging adjacent unknown clusters into one token
+        tokens: List[str] = []
+        end = n
+        unknown_end: Optional[int] = None
+        while end > 0:
+            start, known = back[end]
+            if known:
+                if unknown_end is not None:
+                    tokens.append("".join(clusters[end:unknown_end]))
+                    unknown_end = None
+                tokens.append("".join(clusters[start:end]))
+            elif unknown_end is None:
+                unknown_end = end
+            end = start
+        if unknown_end is not None:
+            tokens.append("".join(clusters[0:unknown_end]))
+        tokens.reverse()
+        return tokens
+
+    def segment(self, text: str) -> List[str]:
+        """Words of `text` in order (whitespace dropped)"""
+        tokens: List[str] = []
+        run: List[str] = []
+        for match in _TOKENS.finditer(text):
+            kind = match.lastgroup
+            if kind == "khmer":
+                run.append(match.group())
+                continue
+            if run:
+                tokens.extend(self._segment_run(run))
+                run = []
+            if kind == "atom":
+                tokens.append(match.group())
+        if run:
+            tokens.extend(self._segment_run(run))
+        return tokens
+
+
+_segmenter: Optional[TrieSegmenter] = None
+_segmenter_loaded = False
+_segmenter_lock = threading.Lock()
+
+
+def get_segmenter() -> Optional[TrieSegmenter]:
+    """The lexicon-backed segmenter, loaded on first use; None if there is no lexicon"""
+    global _segmenter, _segmenter_loaded
+    if not _segmenter_loaded:
+        with _segmenter_lock:
+            if not _segmenter_loaded:
+                path = settings.SEGMENTER_LEXICON_PATH
+                if os.path.exists(path):
+                    _segmenter = TrieSegmenter.from_file(path)
+                    logger.info(f"📖 Loaded lexicon: {_segmenter.word_count} words, "
+                                f"{_segmenter.trie.node_count} trie nodes, {_segmenter.trie.nbytes() / 1024:.0f} KiB")
+                else:
+                    logger.warning(f"⚠️ Lexicon not found at {path}; trie segmenter unavailable")
+                _segmenter_loaded = True
+    return _segmenter
+
+
+def segment(text: str) -> Optional[List[str]]:
+    segmenter = get_segmenter()
+    return segmenter.segment(text) if segmenter is not None else None
+
+
+def build_lexicon(tokens: Iterable[str]) -> Dict[str, int]:
+    """Count word tokens made only of Khmer clusters (numbers, Latin, punctuation are skipped)"""
+    counts: Dict[str, int] = {}
+    for token in tokens:
+        if token and "".join(khmer_clusters(token)) == token:
+            counts[token] = counts.get(token, 0) + 1
+    return counts
@@ -0,0 +1,144 @@
+"""
+Incremental JSONL / Parquet writers for bulk output
+
+Both writers accept rows in small batches and never hold more than one batch
+in memory. JSONL appends to a single file; Parquet writes one part file per
+flush into an output directory (an unclosed Parquet file is unreadable, so
+parts are what makes crash-safe incremental output possible).
+iter_parquet_stream produces a single Parquet file as a stream of byte
+chunks, one row group at a time, for HTTP responses.
+
+File: backend/app/utils/writers.py
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List
+
+
+class JsonlWriter:
+    """Append rows to a JSONL file; position() is a byte offset usable for resume"""
+
+    def __init__(self, path: str, resume_from: int = 0):
+        self.path = path
+        self._file = open(path, "ab" if resume_from else "wb")
+        if resume_from:
+            # Drop anything written after the last checkpoint
+            self._file.truncate(resume_from)
+            self._file.seek(resume_from)
+
+    def write(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            self._file.write(json.dumps(row, ensure_ascii=False, default=str).encode("utf-8"))
+            self._file.write(b"\n")
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def position(self) -> int:
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetPartWriter:
+    """Write each flushed batch as part-NNNNN.parquet; position() is the next part number"""
+
+    def __init__(self, directory: str, resume_from: int = 0, schema=None):
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError("Parquet output requires pyarrow: pip install pyarrow") from e
+
+        self.directory = directory
+        self.schema = schema
+        self._part = resume_from
+        self._rows: List[Dict[str, Any]] = []
+        os.makedirs(directory, exist_ok=True)
+        # Remove parts written after the last checkpoint
+        for name in os.listdir(directory):
+            if name.startswith("part-") and name.endswith(".parquet") and int(name[5:10]) >= resume_from:
+                os.remove(os.path.join(directory, name))
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self._rows.extend(rows)
+
+    def flush(self):
+        if not self._rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pylist(self._rows, schema=self.schema)
+        path = os.path.join(self.directory, f"part-{self._part:05d}.parquet")
+        pq.write_table(table, path + ".tmp", compression="zstd")
+        os.replace(path + ".tmp", path)
+        self._part += 1
+        self._rows = []
+
+    def position(self) -> int:
+        return self._part
+
+    def close(self):
+        self.flush()
+
+
+def open_writer(path: str, fmt: str, resume_from: int = 0, schema=None):
+    """Create a JSONL or Parquet writer for the given output path"""
+    if fmt == "jsonl":
+        return JsonlWriter(path, resume_from=resume_from)
+    if fmt == "parquet":
+        return ParquetPartWriter(path, resume_from=resume_from, schema=schema)
+    raise ValueError(f"Unsupported output format: {fmt}")
+
+
+class _ChunkSink:
+    """Write-only file object that hands out what was written since the last take()"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_parquet_stream(rows: Iterable[Dict[str, Any]], schema, row_group_size: int = 10000) -> Iterator[bytes]:
+    """Encode rows as one Parquet file, yielding bytes after every row group"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= row_group_size:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            batch = []
+            yield sink.take()
+    if batch:
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+    writer.close()
+    yield sink.take()
@@ -0,0 +1,79 @@
+"""
+Compare two benchmarks.pipeline result files and flag regressions
+
+For every stage and article length in both files, compares one latency
+metric (p50 by default). A row is a regression when the new value is more
+than --threshold slower (relative) and at least --min-delta-ms slower in
+absolute terms, so sub-millisecond noise on fast stages is not flagged.
+Improvements are reported the same way. Differences in the recorded
+environment (CPU count, Python, torch, model) are printed first because
+they make the numbers incomparable.
+
+Exits with status 1 if anything regressed, so it can gate CI.
+
+Usage (from backend/):
+    python -m benchmarks.compare before.json after.json
+    python -m benchmarks.compare before.json after.json --metric p95_ms --threshold 0.15
+
+File: backend/benchmarks/compare.py
+"""
+
+import argparse
+import json
+import sys
+from typing import List
+
+ENVIRONMENT_KEYS = ("python", "machine", "cpu_count", "torch", "torch_threads", "model_version", "model_parameters", "seed", "per_length")
+
+
+def compare(base: dict, new: dict, metric: str, threshold: float, min_delta_ms: float) -> List[dict]:
+    rows = []
+    for stage, lengths in base["results"].items():
+        for length, base_row in lengths.items():
+            new_row = new["results"].get(stage, {}).get(length)
+            if new_row is None:
+                continue
+            before, after = base_row[metric], new_row[metric]
+            ratio = after / before if before else float("inf")
+            if ratio > 1 + threshold and after - before >= min_delta_ms:
+                verdict = "REGRESSION"
+            elif ratio < 1 - threshold and before - after >= min_delta_ms:
+                verdict = "improved"
+            else:
+                verdict = ""
+            rows.append({"stage": stage, "length": int(length), "before": before, "after": after, "ratio": ratio, "verdict": verdict})
+    return rows
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Flag regressions between two pipeline benchmark runs")
+    parser.add_argument("base", help="Baseline results JSON")
+    parser.add_argument("new", help="New results JSON")
+    parser.add_argument("--metric", default="p50_ms", choices=["p50_ms", "p95_ms", "p99_ms", "mean_ms"])
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change that counts (0.10 = 10%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Ignore smaller absolute changes")
+    args = parser.parse_args(argv)
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    for key in ENVIRONMENT_KEYS:
+        if base["meta"].get(key) != new["meta"].get(key):
+            print(f"⚠️  {key} differs: {base['meta'].get(key)} -> {new['meta'].get(key)}")
+    print(f"{base['meta'].get('git_commit')} -> {new['meta'].get('git_commit')}, {args.metric}, threshold {args.threshold:.0%}\n")
+
+    rows = compare(base, new, args.metric, args.threshold, args.min_delta_ms)
+    print(f"{'stage':<12}{'chars':>8}{'before':>12}{'after':>12}{'change':>9}")
+    for row in rows:
+        print(f"{row['stage']:<12}{row['length']:>8}{row['before']:>12.3f}{row['after']:>12.3f}"
+              f"{row['ratio'] - 1:>+9.0%}  {row['verdict']}")
+
+    regressions = [row for row in rows if row["verdict"] == "REGRESSION"]
+    print(f"\n{len(regressions)} regression(s), {sum(row['verdict'] == 'improved' for row in rows)} improvement(s)")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Synthetic Khmer news corpus for benchmarks
+
+Articles are built from sentences of real Khmer news words mixed with
+pseudo-words (consonant clusters with coeng subscripts and vowel signs), the
+occasional Latin word, number and punctuation, plus noise that cleaning
+removes (emoji, quotes, URLs). Words inside a sentence are mostly written
+without spaces, as in real Khmer text. Every sentence is drawn afresh, so
+the segmentation cache does not turn repeated sentences into free hits.
+
+The same seed always gives the same corpus.
+
+Usage (from backend/):
+    python -m benchmarks.corpus --lengths 500 2000 --per-length 3 > corpus.jsonl
+    python -m benchmarks.corpus --format requests > requests.jsonl   # request_id/title/body lines
+
+File: backend/benchmarks/corpus.py
+"""
+
+import argparse
+import json
+import random
+from typing import Dict, List, Sequence
+
+DEFAULT_LENGTHS = (500, 2000, 8000, 20000)
+
+# Words from real news sentences
+WORDS = (
+    "បាន កម្ពុជា ឱ្យ ប្រទេស ថៃ មាន ករណី ឧបទ្ទវហេតុ អគ្គិភ័យ ធ្ងន់ធ្ងរ នៅក្នុង ផ្សារ ទំនើប មួយ កន្លែង "
+    "រដ្ឋាភិបាល ប្រកាស ពី គម្រោង អភិវឌ្ឍន៍ ហេដ្ឋារចនាសម្ព័ន្ធ ថ្មី នៅ ខេត្ត សៀមរាប ក្រុម បាល់ទាត់ "
+    "ជម្រើសជាតិ ឈ្នះ ការប្រកួត មិត្តភាព កាលពី យប់ មិញ តម្លៃ ប្រេងសាំង នៅលើ ទីផ្សារ ពិភពលោក កើនឡើង "
+    "ជាលំដាប់ ក្នុង សប្តាហ៍ នេះ ក្រសួង សុខាភិបាល ណែនាំ ប្រជាពលរដ្ឋ លាង ដៃ ញឹកញាប់ ដើម្បី ការពារ ជំងឺ "
+    "ក្រុមហ៊ុន បច្ចេកវិទ្យា ធំ កំពុង វិនិយោគ លើ បញ្ញា សិប្បនិម្មិត"
+).split()
+
+CONSONANTS = "កខគឃងចឆជឈញដឋឌឍណតថទធនបផពភមយរលវសហឡអ"
+SUBSCRIPTS = ["", "", "", "្រ", "្ត", "្យ", "្វ", "្ម", "្ន"]
+VOWELS = ["", "ា", "ិ", "ី", "ឹ", "ឺ", "ុ", "ូ", "ួ", "ើ", "ឿ", "ៀ", "េ", "ែ", "ៃ", "ោ", "ៅ", "ំ", "ាំ", "ះ"]
+
+LATIN_WORDS = ("ASEAN", "COVID-19", "Facebook", "AI", "USD", "Phnom Penh", "GDP")
+NOISE = ("😀", "👍", "“", "”", "«", "»", "https://example.com/news", "#breaking", "@", "…", " ")
+
+
+def pseudo_word(rng: random.Random) -> str:
+    return "".join(
+        rng.choice(CONSONANTS) + rng.choice(SUBSCRIPTS) + rng.choice(VOWELS)
+        for _ in range(rng.randint(1, 3))
+    )
+
+
+def sentence(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(6, 20)):
+        roll = rng.random()
+        if roll < 0.7:
+            parts.append(rng.choice(WORDS))
+        elif roll < 0.9:
+            parts.append(pseudo_word(rng))
+        elif roll < 0.95:
+            parts.append(f" {rng.choice(LATIN_WORDS)} ")
+        else:
+            parts.append(f" {rng.randint(1, 100000)} ")
+        if rng.random() < 0.15:
+            parts.append(" ")
+        if rng.random() < 0.03:
+            parts.append(rng.choice(NOISE))
+    return "".join(parts).strip() + rng.choice("។។។៕!?")
+
+
+def article(rng: random.Random, chars: int) -> str:
+    """An article of at least `chars` characters"""
+    parts, size = [], 0
+    while size < chars:
+        s = sentence(rng)
+        parts.append(s)
+        size += len(s) + 1
+    return " ".join(parts)
+
+
+def generate(seed: int = 42, lengths: Sequence[int] = DEFAULT_LENGTHS, per_length: int = 5) -> Dict[int, List[str]]:
+    """per_length distinct articles for each target length"""
+    rng = random.Random(seed)
+    return {length: [article(rng, length) for _ in range(per_length)] for length in lengths}
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Write a synthetic Khmer corpus as JSONL (one text_input per line)")
+    parser.add_argument("--lengths", type=int, nargs="+", default=list(DEFAULT_LENGTHS))
+    parser.add_argument("--per-length", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=["text_input", "requests"], default="text_input",
+                        help='"requests": {"request_id", "title", "body"} lines, as benchmarks.loadtest replays')
+    args = parser.parse_args(argv)
+
+    for length, texts in generate(args.seed, args.lengths, args.per_length).items():
+        for i, text in enumerate(texts):
+            if args.format == "requests":
+                title, _, body = text.partition(" ")
+                record = {"request_id": f"synthetic-{length}-{i:04d}", "title": title, "body": body}
+            else:
+                record = {"text_input": text, "target_chars": length}
+            print(json.dumps(record, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+"""
+End-to-end load test: saturation table for /predict, /probabilities and /predictions
+
+Boots the API the way production does (gunicorn + uvicorn workers, with
+gunicorn.conf.py) but against a throwaway SQLite database and a small
+random model (benchmarks/tiny_model.py), then replays a corpus at each
+load level:
+
+    --concurrency 1 2 4 8   closed loop: N clients, each sending its next
+                            request as soon as the previous one returns
+    --rates 2 5 10 20       open loop: Poisson arrivals at R requests/s;
+                            latency counts from the scheduled arrival, so a
+                            backed-up server isn't hidden by a slowed client
+
+Requests are drawn from --mix (endpoint=weight). For each level the report
+has throughput, p50/p95/p99 latency (overall and per endpoint), the rate of
+errors (5xx, connection failures and timeouts; 4xx validation rejects are
+counted separately) and the peak RSS of each gunicorn worker, including
+its segmentation-pool children. RSS is read from /proc, so it needs Linux.
+
+The corpus is JSONL in the requests.jsonl layout ({"request_id", "title",
+"body"}; the article is title + body) or with a "text_input" field. With no
+--corpus, synthetic Khmer articles are used (python -m benchmarks.corpus
+--format requests writes the same ones to a file).
+
+Point --database-url at a scratch PostgreSQL to include the real database,
+--model-dir at the real artifact for production model cost, or --url at a
+running server to skip booting one (RSS is then not reported).
+
+Usage (from backend/):
+    python -m benchmarks.loadtest --concurrency 1 2 4 8 --table ../docs/loadtest/1.0.0.md
+    python -m benchmarks.loadtest --rates 5 10 20 40 --workers 4 --duration 60 --output load.json
+    python -m benchmarks.loadtest --url http://staging:8000 --concurrency 4 16 --corpus articles.jsonl
+
+File: backend/benchmarks/loadtest.py
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from benchmarks import corpus, tiny_model
+from benchmarks.pipeline import _git_commit, percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = {
+    "predict": ("POST", "/api/v1/predict"),
+    "probabilities": ("POST", "/api/v1/probabilities"),
+    "predictions": ("GET", "/api/v1/predictions?limit=20"),
+}
+
+
+def load_corpus(path: str) -> List[str]:
+    texts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            text = record.get("text_input") or "\n".join(filter(None, (record.get("title"), record.get("body"))))
+            if text:
+                texts.append(text)
+    return texts
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r} (expected one of {', '.join(ENDPOINTS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+# ────────────────────────────────────────────────
+# Server under test
+# ────────────────────────────────────────────────
+
+def _children(pid: int) -> List[int]:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # "pid (comm) state ppid ..."; comm may contain spaces
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return children
+
+
+def rss_mb(pid: int) -> float:
+    """Resident memory of a process and all its descendants, in MiB"""
+    total = 0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1])
+                    break
+    except OSError:
+        return 0.0
+    return total / 1024 + sum(rss_mb(child) for child in _children(pid))
+
+
+class Server:
+    """gunicorn serving app.main:app on a scratch database; stopped on exit"""
+
+    def __init__(self, workers: int, model_dir: str, database_url: Optional[str], port: int):
+        self.workers = workers
+        self.model_dir = model_dir
+        self.database_url = database_url
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.process: Optional[subprocess.Popen] = None
+        self._tmp = tempfile.TemporaryDirectory(prefix="loadtest-")
+
+    def __enter__(self) -> "Server":
+        tmp = self._tmp.name
+        env = {
+            **os.environ,
+            "DATABASE_URL": self.database_url or f"sqlite:///{tmp}/loadtest.db?timeout=30",
+            "MODEL_CACHE_DIR": self.model_dir,
+            "PROMETHEUS_MULTIPROC_DIR": os.path.join(tmp, "prometheus"),
+            "DEDUP_INDEX_PATH": os.path.join(tmp, "near_duplicates.npz"),
+            "PROFILE_DIR": os.path.join(tmp, "profiles"),
+            "JOB_WORKER_ENABLED": "false",
+        }
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "app.main:app", "--config", "gunicorn.conf.py",
+             "--workers", str(self.workers), "--bind", f"127.0.0.1:{self.port}", "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env, stdout=open(os.path.join(tmp, "server.log"), "w"), stderr=subprocess.STDOUT,
+        )
+        deadline = time.monotonic() + 180
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited during startup; see {tmp}/server.log")
+            try:
+                status, _ = request(self.url, "GET", "/health", None, timeout=2)
+                if status == 200 and len(self.worker_pids()) >= self.workers:
+                    return self
+            except (OSError, http.client.HTTPException):
+                pass
+            time.sleep(0.5)
+        self.__exit__(None, None, None)
+        raise RuntimeError("Server did not become healthy within 180 s")
+
+    def worker_pids(self) -> List[int]:
+        return _children(self.process.pid) if self.process else []
+
+    def __exit__(self, *exc):
+        if self.process and self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self._tmp.cleanup()
+
+
+# ────────────────────────────────────────────────
+# Load generation
+# ────────────────────────────────────────────────
+
+_local = threading.local()
+
+
+def request(base_url: str, method: str, path: str, body: Optional[dict], timeout: float = 60) -> tuple:
+    """(status, seconds) over a per-thread keep-alive connection"""
+    parts = urlsplit(base_url)
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+    payload = json.dumps(body, ensure_ascii=False).encode() if body is not None else None
+    headers = {"Content-Type": "application/json"} if payload else {}
+    started = time.perf_counter()
+    try:
+        conn.request(method, path, body=payload, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - started
+    except (OSError, http.client.HTTPException):
+        conn.close()
+        _local.conn = None
+        raise
+
+
+class Recorder:
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.samples: List[tuple] = []  # (endpoint, seconds, status); status 0 = no response
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, arrival: float, status: int, seconds: float):
+        if arrival >= self.measure_from:
+            with self._lock:
+                self.samples.append((endpoint, seconds, status))
+
+
+def _call(base_url: str, endpoint: str, text: str, arrival: float, recorder: Recorder):
+    method, path = ENDPOINTS[endpoint]
+    body = {"text_input": text} if method == "POST" else None
+    try:
+        status, _ = request(base_url, method, path, body)
+    except (OSError, http.client.HTTPException):
+        status = 0
+    # From the intended start, so client-side queueing in open-loop mode counts
+    recorder.record(endpoint, arrival, status, time.perf_counter() - arrival)
+
+
+def run_closed(base_url, texts, mix, clients, warmup, duration, seed) -> Recorder:
+    start = time.perf_counter()
+    recorder = Recorder(start + warmup)
+    end = start + warmup + duration
+
+    def client(index):
+        rng = random.Random(seed + index)
+        while time.perf_counter() < end:
+            endpoint = rng.choices(list(mix), weights=list(mix.values()))[0]
+            _call(base_url, endpoint, rng.choice(texts), time.perf_counter(), recorder)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder
+
+
+def run_open(base_url, texts, mix, rate, warmup, duration, seed, max_inflight) -> Recorder:
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    recorder = Recorder(start + warmup)
+    end = start + warmup + duration
+    with ThreadPoolExecutor(max_workers=max_inflight) as executor:
+        arrival = start
+        while True:
+            arrival += rng.expovariate(rate)
+            if arrival >= end:
+                break
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            endpoint = rng.choices(list(mix), weights=list(mix.values()))[0]
+            executor.submit(_call, base_url, endpoint, rng.choice(texts), arrival, recorder)
+    return recorder
+
+
+class RssSampler:
+    """Peak RSS per worker pid, sampled once a second in the background"""
+
+    def __init__(self, server: Optional[Server]):
+        self.server = server
+        self.peaks: Dict[int, float] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        if self.server:
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            for pid in self.server.worker_pids():
+                self.peaks[pid] = max(self.peaks.get(pid, 0.0), rss_mb(pid))
+            if self._stop.wait(1.0):
+                break
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def summarize(samples: List[tuple], duration: float) -> dict:
+    latencies = sorted(seconds * 1000 for _, seconds, status in samples if 200 <= status < 400)
+    errors = sum(1 for _, _, status in samples if status == 0 or status >= 500)
+    rejected = sum(1 for _, _, status in samples if 400 <= status < 500)
+    row = {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / duration, 2),
+        "ok_rps": round(len(latencies) / duration, 2),
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "rejected_rate": round(rejected / len(samples), 4) if samples else 0.0,
+    }
+    if latencies:
+        row.update({
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+        })
+    return row
+
+
+def markdown_table(report: dict) -> str:
+    meta = report["meta"]
+    lines = [
+        f"# Load test {meta['created_at']} ({meta['git_commit']})",
+        "",
+        f"{meta['workers']} gunicorn workers, model {meta['model']}, database {meta['database']}, "
+        f"{meta['cpu_count']} CPUs, {meta['duration_s']} s per level after {meta['warmup_s']} s warm-up, "
+        f"mix {meta['mix']}, {meta['corpus']}.",
+        "",
+        "| mode | level | throughput (req/s) | p50 ms | p95 ms | p99 ms | errors | 4xx | peak RSS/worker MiB |",
+        "|---|---:|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for level in report["levels"]:
+        row = level["overall"]
+        rss = max(level["rss_mb"].values()) if level["rss_mb"] else None
+        lines.append(
+            f"| {level['mode']} | {level['level']} | {row['throughput_rps']} | {row.get('p50_ms', '-')} | "
+            f"{row.get('p95_ms', '-')} | {row.get('p99_ms', '-')} | {row['error_rate']:.1%} | "
+            f"{row['rejected_rate']:.1%} | {f'{rss:.0f}' if rss is not None else '-'} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Load test the API and print a saturation table")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[], help="Closed-loop client counts")
+    parser.add_argument("--rates", type=float, nargs="+", default=[], help="Open-loop arrival rates (req/s)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("predict=0.7,probabilities=0.2,predictions=0.1"))
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds at the start of each level")
+    parser.add_argument("--max-inflight", type=int, default=256, help="Open-loop client threads")
+    parser.add_argument("--corpus", help="JSONL corpus (requests.jsonl layout or text_input)")
+    parser.add_argument("--articles", type=int, default=200, help="Synthetic articles when no --corpus")
+    parser.add_argument("--url", help="Test this running server instead of booting one")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--database-url", help="Default: a scratch SQLite file")
+    parser.add_argument("--model-dir", help="Default: build a random model")
+    parser.add_argument("--model-size", choices=sorted(tiny_model.SIZES), default="tiny")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the full report as JSON to this file")
+    parser.add_argument("--table", help="Write the saturation table as Markdown to this file")
+    args = parser.parse_args(argv)
+    if not args.concurrency and not args.rates:
+        args.concurrency = [1, 2, 4, 8]
+
+    if args.corpus:
+        texts, corpus_name = load_corpus(args.corpus), os.path.basename(args.corpus)
+    else:
+        lengths = (500, 2000, 8000)
+        generated = corpus.generate(args.seed, lengths, max(1, args.articles // len(lengths)))
+        texts = [text for group in generated.values() for text in group]
+        corpus_name = f"{len(texts)} synthetic articles of {'/'.join(map(str, lengths))} chars"
+
+    server = None
+    model = args.model_dir or (f"random {args.model_size}" if not args.url else "remote")
+    if not args.url:
+        model_dir = args.model_dir or tiny_model.build(tempfile.mkdtemp(prefix="loadtest-xlmr-"), args.model_size, seed=args.seed)
+        print(f"Starting {args.workers} workers...", file=sys.stderr)
+        server = Server(args.workers, model_dir, args.database_url, args.port).__enter__()
+    base_url = args.url or server.url
+
+    levels = [("concurrency", c) for c in args.concurrency] + [("rate", r) for r in args.rates]
+    results = []
+    try:
+        for mode, level in levels:
+            with RssSampler(server) as sampler:
+                if mode == "concurrency":
+                    recorder = run_closed(base_url, texts, args.mix, int(level), args.warmup, args.duration, args.seed)
+                else:
+                    recorder = run_open(base_url, texts, args.mix, level, args.warmup, args.duration, args.seed, args.max_inflight)
+            by_endpoint = {
+                name: summarize([s for s in recorder.samples if s[0] == name], args.duration) for name in args.mix
+            }
+            row = {
+                "mode": mode,
+                "level": level,
+                "overall": summarize(recorder.samples, args.duration),
+                "endpoints": by_endpoint,
+                "rss_mb": {str(pid): round(mb, 1) for pid, mb in sampler.peaks.items()},
+            }
+            results.append(row)
+            overall = row["overall"]
+            print(f"  {mode} {level:>6}: {overall['throughput_rps']:7.2f} req/s  p50 {overall.get('p50_ms', '-')}  "
+                  f"p95 {overall.get('p95_ms', '-')}  p99 {overall.get('p99_ms', '-')} ms  "
+                  f"errors {overall['error_rate']:.1%}", file=sys.stderr)
+    finally:
+        if server:
+            server.__exit__(None, None, None)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "workers": args.workers if server else None,
+            "model": model,
+            "database": "remote" if args.url else ("custom" if args.database_url else "sqlite"),
+            "cpu_count": os.cpu_count(),
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "mix": ",".join(f"{k}={v:g}" for k, v in args.mix.items()),
+            "corpus": corpus_name,
+        },
+        "levels": results,
+    }
+    table = markdown_table(report)
+    print(table)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.table:
+        os.makedirs(os.path.dirname(os.path.abspath(args.table)), exist_ok=True)
+        with open(args.table, "w") as f:
+            f.write(table)
+
+
+if __name__ == "__main__":
+    main()
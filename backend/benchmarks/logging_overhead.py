@@ -0,0 +1,167 @@
+"""
+Per-request cost of application logging
+
+Sends the same requests through the full app (TestClient, SQLite, the random
+XLM-R from benchmarks/tiny_model.py) in alternating blocks: one with logging
+as the app configures it, one with logging.disable(). Two numbers come out:
+
+    in-logger   time spent inside Logger._log (record creation, filters,
+                handlers) per request, on the thread that logged; precise
+    overhead    difference in mean latency between the two modes; includes
+                eager message formatting and the time a writer thread takes
+                the GIL away, but is only as precise as request-to-request noise
+
+Alternating blocks cancel out drift (caches warming, the database growing).
+
+Log output (stderr, file descriptor 2) goes to a file so writing costs what
+it costs on a real disk or pipe; the bytes written per request are reported
+too. The segmentation cache, near-duplicate reuse, the segmentation pool and
+the job worker are off so every request does the same work.
+
+Run it on two checkouts to compare logging setups:
+
+Usage (from backend/):
+    python -m benchmarks.logging_overhead
+    python -m benchmarks.logging_overhead --endpoints predict segment --requests 200 --blocks 6
+    LOG_SAMPLE_RATES=predict.done=0.1 python -m benchmarks.logging_overhead
+
+File: backend/benchmarks/logging_overhead.py
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks import corpus, tiny_model
+
+ENDPOINTS = {
+    "predict": "/api/v1/predict",
+    "probabilities": "/api/v1/probabilities",
+    "segment": "/api/v1/segment",
+    "validate": "/api/v1/validate-text",
+}
+
+
+class LoggerTimer:
+    """Sums the time spent in Logger._log while installed"""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.records = 0
+        self._original = logging.Logger._log
+
+    def __enter__(self):
+        original, timer = self._original, self
+
+        def timed_log(logger, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(logger, *args, **kwargs)
+            finally:
+                timer.seconds += time.perf_counter() - started
+                timer.records += 1
+
+        logging.Logger._log = timed_log
+        return self
+
+    def __exit__(self, *exc):
+        logging.Logger._log = self._original
+
+
+def run_block(client, path: str, texts: List[str], count: int) -> List[float]:
+    latencies = []
+    for i in range(count):
+        started = time.perf_counter()
+        response = client.post(path, json={"text_input": texts[i % len(texts)]})
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.text[:200]}")
+    return latencies
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Measure the per-request overhead of logging")
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=["predict"])
+    parser.add_argument("--chars", type=int, default=500, help="Article length")
+    parser.add_argument("--articles", type=int, default=10, help="Distinct articles, sent in turn")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per block")
+    parser.add_argument("--blocks", type=int, default=4, help="Blocks per mode (logging on / off), alternating")
+    parser.add_argument("--model-dir", help="Model to load (default: build a random one)")
+    parser.add_argument("--log-file", help="Where log output goes (default: a temporary file)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench-logging-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/predictions.db"
+    os.environ["MODEL_CACHE_DIR"] = args.model_dir or tiny_model.build(os.path.join(workdir, "model"), seed=args.seed)
+    for name in ("DEDUP_ENABLED", "SEGMENT_CACHE_ENABLED", "JOB_WORKER_ENABLED", "WRITE_BEHIND_ENABLED"):
+        os.environ[name] = "false"
+    os.environ["SEGMENT_POOL_WORKERS"] = "0"
+
+    # Everything the app logs goes to the log file; results go to stdout
+    log_path = args.log_file or os.path.join(workdir, "app.log")
+    log_fd = os.open(log_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    os.dup2(log_fd, 2)
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # the test client's own request lines
+
+    texts = corpus.generate(args.seed, [args.chars], args.articles)[args.chars]
+    results: Dict[str, dict] = {}
+    with TestClient(app) as client:
+        for endpoint in args.endpoints:
+            path = ENDPOINTS[endpoint]
+            run_block(client, path, texts, args.articles)  # warm up
+            on, off = [], []
+            timer = LoggerTimer()
+            for block in range(args.blocks * 2):
+                logging_on = block % 2 == 0
+                logging.disable(logging.NOTSET if logging_on else logging.CRITICAL)
+                sys.stderr.flush()
+                size_before = os.fstat(log_fd).st_size
+                if logging_on:
+                    with timer:
+                        latencies = run_block(client, path, texts, args.requests)
+                else:
+                    latencies = run_block(client, path, texts, args.requests)
+                time.sleep(0.2)  # let a background writer finish before the next block
+                if logging_on:
+                    on.extend(latencies)
+                    log_bytes = os.fstat(log_fd).st_size - size_before
+                else:
+                    off.extend(latencies)
+            logging.disable(logging.NOTSET)
+            results[endpoint] = {
+                "requests_per_mode": len(on),
+                "in_logger_ms": round(timer.seconds * 1000 / len(on), 4),
+                "records_per_request": round(timer.records / len(on), 2),
+                "mean_on_ms": round(statistics.mean(on), 3),
+                "mean_off_ms": round(statistics.mean(off), 3),
+                "overhead_mean_ms": round(statistics.mean(on) - statistics.mean(off), 3),
+                "p50_on_ms": round(statistics.median(on), 3),
+                "p50_off_ms": round(statistics.median(off), 3),
+                "overhead_p50_ms": round(statistics.median(on) - statistics.median(off), 3),
+                "log_bytes_per_request": round(log_bytes / args.requests),
+            }
+            row = results[endpoint]
+            print(f"  {endpoint:<14} in-logger {row['in_logger_ms']:7.4f} ms, {row['records_per_request']:5.2f} records  "
+                  f"mean {row['mean_on_ms']:8.3f} on / {row['mean_off_ms']:8.3f} off ms  overhead {row['overhead_mean_ms']:+7.3f} ms (p50 {row['overhead_p50_ms']:+7.3f})  "
+                  f"{row['log_bytes_per_request']:>6} log bytes/request")
+
+    report = {"chars": args.chars, "requests": args.requests, "blocks": args.blocks, "results": results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
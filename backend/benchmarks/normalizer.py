@@ -0,0 +1,186 @@
+"""
+Equivalence check and micro-benchmark for preprocessing.normalize
+
+The reference functions below are the regex chains that
+remove_non_khmer_english_and_punct / preprocess_for_model used before the
+single-pass normalizer. `check` feeds both implementations randomly generated
+strings drawn from the character classes that matter (Khmer, Khmer symbols,
+zero-width characters, ASCII letters/digits/punctuation, every kind of
+Unicode whitespace, emoji and other scripts) and fails on the first
+mismatch, printing a minimized counterexample; the character-class counts
+are checked against a per-character count. `bench` times both on large
+synthetic articles. tests/test_normalize.py runs the same comparison with
+fixed seeds under pytest.
+
+Usage (from backend/):
+    python -m benchmarks.normalizer check --cases 20000
+    python -m benchmarks.normalizer bench --chars 200000 --repeats 20
+
+File: backend/benchmarks/normalizer.py
+"""
+
+import argparse
+import json
+import random
+import re
+import statistics
+import sys
+import time
+
+from app.ml import preprocessing
+
+
+# ── reference implementation (previous regex chain) ──
+
+def reference_clean(text: str) -> str:
+    if not text:
+        return ""
+    cleaned = re.sub(r'[^\u1780-\u17FF\u19E0-\u19FF\u200B-\u200Da-zA-Z0-9\s.,!?\u17D4\u17D5]', '', text)
+    return re.sub(r'\s+', ' ', cleaned).strip()
+
+
+def reference_preprocess(text: str) -> str:
+    if not text:
+        return ""
+    cleaned = reference_clean(text)
+    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+    return re.sub(r'(?<=[\u1780-\u17FF])\s+(?=[\u1780-\u17FF])', '', cleaned)
+
+
+def reference_counts(text: str, cleaned: str) -> tuple:
+    """Character classes of the cleaned text, counted one character at a time"""
+    khmer = sum(1 for c in cleaned if "\u1780" <= c <= "\u17FF" or "\u19E0" <= c <= "\u19FF")
+    latin = sum(1 for c in cleaned if c.isascii() and c.isalpha())
+    digits = sum(1 for c in cleaned if c.isascii() and c.isdigit())
+    spaces = cleaned.count(" ")
+    other = len(cleaned) - khmer - latin - digits - spaces
+    removed = len(text) - len(reference_clean_kept(text))
+    return (khmer, latin, digits, spaces, other, removed)
+
+
+def reference_clean_kept(text: str) -> str:
+    return re.sub(r'[^\u1780-\u17FF\u19E0-\u19FF\u200B-\u200Da-zA-Z0-9\s.,!?\u17D4\u17D5]', '', text)
+
+
+# ── random inputs ──
+
+WHITESPACE = [c for c in map(chr, range(0x3000 + 1)) if c.isspace()]
+ALPHABETS = [
+    [chr(c) for c in range(0x1780, 0x1800)],                    # Khmer
+    [chr(c) for c in range(0x19E0, 0x1A00)],                    # Khmer symbols
+    ["\u200B", "\u200C", "\u200D", "\u200E", "\uFEFF"],  # zero-width (kept and not)
+    list("abcxyzABCXYZ0189.,!?;:-_'\"()[]@#%&*/\\"),            # ASCII
+    WHITESPACE,
+    ["é", "ß", "ก", "ไ", "中", "😀", "\u0300", "\U0001F1F0", "\x00", "\x1c"],  # other scripts / controls
+]
+
+
+def random_text(rng: random.Random, max_len: int) -> str:
+    weights = [rng.random() for _ in ALPHABETS]
+    chars = []
+    for _ in range(rng.randint(0, max_len)):
+        alphabet = rng.choices(ALPHABETS, weights)[0]
+        chars.append(rng.choice(alphabet))
+    return "".join(chars)
+
+
+def _mismatch(text: str) -> bool:
+    return (
+        preprocessing.normalize(text, join_khmer=False).text != reference_clean(text)
+        or preprocessing.normalize(text).text != reference_preprocess(text)
+    )
+
+
+def _minimize(text: str) -> str:
+    """Drop characters while the mismatch persists"""
+    i = 0
+    while i < len(text):
+        shorter = text[:i] + text[i + 1:]
+        if _mismatch(shorter):
+            text = shorter
+        else:
+            i += 1
+    return text
+
+
+def check(args) -> int:
+    rng = random.Random(args.seed)
+    for case in range(args.cases):
+        text = random_text(rng, args.max_len)
+        if _mismatch(text):
+            small = _minimize(text)
+            print(f"Mismatch on case {case}: {small!r}", file=sys.stderr)
+            print(f"  normalize: {preprocessing.normalize(small).text!r}", file=sys.stderr)
+            print(f"  reference: {reference_preprocess(small)!r}", file=sys.stderr)
+            return 1
+        result = preprocessing.normalize(text)
+        if result[1:] != reference_counts(text, result.text):
+            print(f"Counts differ on case {case}: {text!r}", file=sys.stderr)
+            print(f"  normalize: {result[1:]}", file=sys.stderr)
+            print(f"  reference: {reference_counts(text, result.text)}", file=sys.stderr)
+            return 1
+    print(f"✅ {args.cases} random cases identical", file=sys.stderr)
+    return 0
+
+
+# ── benchmark ──
+
+def synthetic_article(rng: random.Random, chars: int) -> str:
+    khmer = [chr(c) for c in range(0x1780, 0x17D4)]
+    pieces, size = [], 0
+    while size < chars:
+        word = "".join(rng.choice(khmer) for _ in range(rng.randint(2, 8)))
+        roll = rng.random()
+        if roll < 0.05:
+            word += rng.choice(["។ ", "៕\n", " — ", " (2026) ", " COVID-19 ", "  \t"])
+        elif roll < 0.3:
+            word += " "
+        pieces.append(word)
+        size += len(word)
+    return "".join(pieces)[:chars]
+
+
+def _time(fn, text: str, repeats: int) -> dict:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(text)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(timings), 3), "min_ms": round(min(timings), 3)}
+
+
+def bench(args) -> int:
+    rng = random.Random(args.seed)
+    text = synthetic_article(rng, args.chars)
+    assert preprocessing.normalize(text).text == reference_preprocess(text)
+    results = {
+        "chars": len(text),
+        "reference_preprocess": _time(reference_preprocess, text, args.repeats),
+        "normalize": _time(lambda t: preprocessing.normalize(t), text, args.repeats),
+        "reference_clean": _time(reference_clean, text, args.repeats),
+        "normalize_clean": _time(lambda t: preprocessing.normalize(t, join_khmer=False), text, args.repeats),
+    }
+    results["speedup_preprocess"] = round(
+        results["reference_preprocess"]["median_ms"] / results["normalize"]["median_ms"], 2
+    )
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and benchmark the single-pass text normalizer")
+    commands = parser.add_subparsers(dest="command", required=True)
+    check_parser = commands.add_parser("check", help="Compare against the regex chain on random inputs")
+    check_parser.add_argument("--cases", type=int, default=20000)
+    check_parser.add_argument("--max-len", type=int, default=80)
+    check_parser.add_argument("--seed", type=int, default=0)
+    bench_parser = commands.add_parser("bench", help="Time both implementations on a large article")
+    bench_parser.add_argument("--chars", type=int, default=200_000)
+    bench_parser.add_argument("--repeats", type=int, default=20)
+    bench_parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    sys.exit(check(args) if args.command == "check" else bench(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Per-stage latency and throughput of the classification pipeline
+
+Times each stage on its own, over a synthetic Khmer corpus (benchmarks/
+corpus.py) at several article lengths:
+
+    clean       preprocessing.remove_non_khmer_english_and_punct(raw)
+    preprocess  preprocessing.preprocess_for_model(raw)
+    segment     preprocessing.count_khmer_words(cleaned, max_words=10000)
+    validate    classifier._validate_text_for_prediction(raw)
+    tokenize    classifier.tokenizer(processed, truncation=True, max_length=512)
+    predict     classifier.predict(raw)  (validation + tokenization + model)
+
+The model is a randomly initialized XLM-R (benchmarks/tiny_model.py) unless
+--model-dir points at a real one, so the run needs no download. To make runs
+comparable, the segmentation cache, near-duplicate reuse and the
+segmentation pool are off, torch uses --threads threads, and logging is
+raised to WARNING so handlers are not part of the timings.
+
+Results (p50/p95/p99/mean/max latency, calls/s, chars/s, plus the machine
+and model they were measured on) are written as JSON. Compare two runs
+with benchmarks.compare.
+
+Usage (from backend/):
+    python -m benchmarks.pipeline --output before.json
+    python -m benchmarks.pipeline --lengths 500 2000 --stages clean segment --repeats 10 --output after.json
+    python -m benchmarks.compare before.json after.json
+
+File: backend/benchmarks/pipeline.py
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+from app.core.config import settings
+from benchmarks import corpus, tiny_model
+
+STAGES = ("clean", "preprocess", "segment", "validate", "tokenize", "predict")
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    rank = math.ceil(q / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def summarize(latencies_ms: List[float], chars: int) -> dict:
+    values = sorted(latencies_ms)
+    total_seconds = sum(values) / 1000
+    return {
+        "calls": len(values),
+        "mean_ms": round(sum(values) / len(values), 4),
+        "p50_ms": round(percentile(values, 50), 4),
+        "p95_ms": round(percentile(values, 95), 4),
+        "p99_ms": round(percentile(values, 99), 4),
+        "max_ms": round(values[-1], 4),
+        "calls_per_sec": round(len(values) / total_seconds, 2) if total_seconds else None,
+        "chars_per_sec": round(chars / total_seconds) if total_seconds else None,
+    }
+
+
+def _git_commit() -> str:
+    """Short HEAD hash, with "-dirty" if the working tree has uncommitted changes"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+    return (commit + ("-dirty" if dirty else "")) or "unknown"
+
+
+def stage_functions(classifier) -> Dict[str, Callable[[dict], object]]:
+    """Each stage as a function of one prepared article (raw, cleaned and model-ready text)"""
+    from app.ml import preprocessing
+
+    return {
+        "clean": lambda a: preprocessing.remove_non_khmer_english_and_punct(a["raw"]),
+        "preprocess": lambda a: preprocessing.preprocess_for_model(a["raw"]),
+        "segment": lambda a: preprocessing.count_khmer_words(a["cleaned"], max_words=10000),
+        "validate": lambda a: classifier._validate_text_for_prediction(a["raw"]),
+        "tokenize": lambda a: classifier.tokenizer(
+            a["processed"], return_tensors="pt", truncation=True, max_length=512, padding=True
+        ),
+        "predict": lambda a: classifier.predict(a["raw"]),
+    }
+
+
+def run_stage(func: Callable, articles: List[dict], repeats: int, warmup: int) -> dict:
+    for article in articles[:warmup]:
+        func(article)
+    latencies, chars = [], 0
+    for _ in range(repeats):
+        for article in articles:
+            started = time.perf_counter()
+            func(article)
+            latencies.append((time.perf_counter() - started) * 1000)
+            chars += len(article["raw"])
+    return summarize(latencies, chars)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the classification pipeline stage by stage")
+    parser.add_argument("--lengths", type=int, nargs="+", default=list(corpus.DEFAULT_LENGTHS), help="Article lengths (characters)")
+    parser.add_argument("--per-length", type=int, default=5, help="Distinct articles per length")
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the articles per stage")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed calls per stage and length")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--model-dir", help="Model to load (default: build a random one)")
+    parser.add_argument("--model-size", choices=sorted(tiny_model.SIZES), default="tiny")
+    parser.add_argument("--threads", type=int, default=1, help="torch intra-op threads")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+    settings.SEGMENT_CACHE_ENABLED = False
+    settings.DEDUP_ENABLED = False
+    settings.SEGMENT_POOL_WORKERS = 0
+
+    import torch
+    torch.manual_seed(args.seed)
+    torch.set_num_threads(args.threads)
+
+    model_dir = args.model_dir
+    if not model_dir:
+        model_dir = tiny_model.build(tempfile.mkdtemp(prefix="bench-xlmr-"), args.model_size, seed=args.seed)
+    settings.MODEL_CACHE_DIR = model_dir
+    from app.ml import preprocessing
+    from app.ml.model import classifier  # loads MODEL_CACHE_DIR on import
+    if classifier.tokenizer is None:
+        sys.exit(f"Could not load a model from {model_dir}; see the log above")
+
+    texts = corpus.generate(args.seed, args.lengths, args.per_length)
+    functions = stage_functions(classifier)
+    results: Dict[str, Dict[str, dict]] = {stage: {} for stage in args.stages}
+    for length, raw_texts in texts.items():
+        articles = []
+        for raw in raw_texts:
+            cleaned = preprocessing.remove_non_khmer_english_and_punct(raw)
+            articles.append({"raw": raw, "cleaned": cleaned, "processed": preprocessing.preprocess_for_model(raw)})
+        for stage in args.stages:
+            row = run_stage(functions[stage], articles, args.repeats, args.warmup)
+            results[stage][str(length)] = row
+            print(f"  {stage:<10} {length:>6} chars  p50 {row['p50_ms']:9.3f} ms  p95 {row['p95_ms']:9.3f} ms  "
+                  f"{row['chars_per_sec'] or 0:>12,} chars/s", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "torch": torch.__version__,
+            "torch_threads": args.threads,
+            "model_version": classifier.model_version,
+            "model_parameters": sum(p.numel() for p in classifier.model.parameters()),
+            "seed": args.seed,
+            "lengths": args.lengths,
+            "per_length": args.per_length,
+            "repeats": args.repeats,
+        },
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
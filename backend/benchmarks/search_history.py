@@ -0,0 +1,261 @@
+"""
+Latency benchmark for /predictions/search on a synthetic million-row table
+
+Builds an isolated schema (bench_search) in the configured PostgreSQL
+database with the production layout (predictions range-partitioned by month
+from partitions.PARENT_COLUMNS), fills it with synthetic Khmer articles and
+predictions via COPY, creates the production indexes (partitions.INDEXES and
+the trigram index from migrations.create_search_index), then times
+async_crud.search_predictions (the exact query the endpoint runs) for a set
+of scenarios: rare / medium / common terms, label and date filters, and a
+follow-up keyset page. Reports p50/p95/max per scenario and exits non-zero
+if any p95 is over the budget.
+
+Usage (from backend/, DATABASE_URL pointing at PostgreSQL with pg_trgm and a
+UTF-8 LC_CTYPE; under the C locale pg_trgm sees no trigrams in Khmer text and
+the benchmark refuses to run, as /health reports the search index degraded):
+    python -m benchmarks.search_history
+    python -m benchmarks.search_history --rows 200000 --budget-ms 150 --output search.json
+    python -m benchmarks.search_history --reuse       # skip data generation
+    python -m benchmarks.search_history --drop        # remove the schema
+
+File: backend/benchmarks/search_history.py
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.db import async_crud, migrations, models, partitions
+from app.db.session import async_database_url
+from app.ml.preprocessing import content_hash
+
+SCHEMA = "bench_search"
+LABELS = [f"LABEL_{i}" for i in range(6)]
+
+CONSONANTS = "កខគឃងចឆជឈញដឋឌឍណតថទធនបផពភមយរលវសហឡអ"
+VOWELS = ["", "ា", "ិ", "ី", "ឹ", "ឺ", "ុ", "ូ", "ួ", "ើ", "ឿ", "ៀ", "េ", "ែ", "ៃ", "ោ", "ៅ", "ំ", "ាំ", "ះ"]
+
+# Planted phrases with known frequencies (share of articles containing them)
+NEEDLES = {"rare": ("ព្រះវិហារបុរាណ", 0.0001), "medium": ("ការប្រកួតបាល់ទាត់", 0.01)}
+
+
+def build_vocabulary(rng: random.Random, size: int) -> List[str]:
+    """Pseudo-Khmer words of one to three consonant+vowel syllables"""
+    words = set()
+    while len(words) < size:
+        syllables = rng.randint(1, 3)
+        words.add("".join(rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(syllables)))
+    return sorted(words)
+
+
+def _engines(schema: str):
+    url = settings.DATABASE_URL
+    if not url.startswith(("postgresql", "postgres")):
+        raise SystemExit("This benchmark needs PostgreSQL (set DATABASE_URL)")
+    search_path = f"{schema},public"
+    sync_engine = create_engine(url, connect_args={"options": f"-csearch_path={search_path}"})
+    async_engine = create_async_engine(
+        async_database_url(url), connect_args={"server_settings": {"search_path": search_path}}
+    )
+    return sync_engine, async_engine
+
+
+def _copy(conn, table: str, columns: List[str], rows: List[tuple]):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join("\\N" if value is None else str(value) for value in row) + "\n")
+    buffer.seek(0)
+    cursor = conn.connection.cursor()
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+    cursor.close()
+
+
+def create_schema(sync_engine, first_month: date, months: int):
+    """Production tables without their secondary indexes: articles as in postgres/init.sql, predictions partitioned by month"""
+    with sync_engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(
+            "CREATE TABLE articles (content_hash CHAR(64) PRIMARY KEY, text_input TEXT NOT NULL, "
+            "char_count INTEGER NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        try:
+            with conn.begin_nested():
+                conn.execute(text("ALTER TABLE articles ALTER COLUMN text_input SET COMPRESSION lz4"))
+        except DBAPIError:
+            print("  server has no lz4 TOAST compression, articles use the default (pglz)", file=sys.stderr)
+        conn.execute(text(
+            f"CREATE TABLE {partitions.PARENT} ({partitions.PARENT_COLUMNS}) PARTITION BY RANGE (created_at)"
+        ))
+        conn.execute(text(f"CREATE TABLE {partitions.DEFAULT_PARTITION} PARTITION OF {partitions.PARENT} DEFAULT"))
+        partitions.ensure_partitions(conn, months_ahead=months - 1, today=first_month)
+    migrations.add_missing_columns(sync_engine, models.Prediction)
+
+
+def create_indexes(sync_engine):
+    """The indexes production has: partitions.INDEXES plus the search indexes from migrations"""
+    with sync_engine.begin() as conn:
+        for statement in partitions.INDEXES:
+            conn.execute(text(statement))
+    migrations.create_search_index(sync_engine)
+
+
+def generate(sync_engine, args, vocabulary: List[str]):
+    rng = random.Random(args.seed)
+    start_time = datetime(2025, 1, 1)
+    create_schema(sync_engine, start_time.date(), months=13)
+
+    started = time.perf_counter()
+    hashes = []
+    with sync_engine.begin() as conn:
+        batch = []
+        for i in range(args.articles):
+            words = [rng.choice(vocabulary) for _ in range(rng.randint(args.min_words, args.max_words))]
+            for needle, share in NEEDLES.values():
+                if rng.random() < share:
+                    words.insert(rng.randrange(len(words)), needle)
+            article = " ".join(words) + f" ។{i}"
+            digest = content_hash(article)
+            hashes.append(digest)
+            batch.append((digest, article, len(article), "2025-01-01 00:00:00"))
+            if len(batch) >= 20000:
+                _copy(conn, "articles", ["content_hash", "text_input", "char_count", "created_at"], batch)
+                batch = []
+        if batch:
+            _copy(conn, "articles", ["content_hash", "text_input", "char_count", "created_at"], batch)
+        print(f"  {args.articles} articles in {time.perf_counter() - started:.0f}s", file=sys.stderr)
+
+        span = timedelta(days=365).total_seconds()
+        batch = []
+        for prediction_id in range(1, args.rows + 1):
+            created_at = start_time + timedelta(seconds=span * prediction_id / args.rows)
+            batch.append((prediction_id, rng.choice(hashes), rng.choice(LABELS), round(rng.uniform(40, 99), 2), created_at))
+            if len(batch) >= 50000:
+                _copy(conn, "predictions", ["id", "article_hash", "label_classified", "accuracy", "created_at"], batch)
+                batch = []
+        if batch:
+            _copy(conn, "predictions", ["id", "article_hash", "label_classified", "accuracy", "created_at"], batch)
+        print(f"  {args.rows} predictions in {time.perf_counter() - started:.0f}s", file=sys.stderr)
+
+    create_indexes(sync_engine)
+    with sync_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE articles"))
+        conn.execute(text("VACUUM ANALYZE predictions"))
+    print(f"  indexes built, total {time.perf_counter() - started:.0f}s", file=sys.stderr)
+
+
+def scenarios(vocabulary: List[str]) -> Dict[str, dict]:
+    common = vocabulary[len(vocabulary) // 2]
+    return {
+        "rare_term": {"query": NEEDLES["rare"][0]},
+        "medium_term": {"query": NEEDLES["medium"][0]},
+        "common_term": {"query": common},
+        "medium_term_label": {"query": NEEDLES["medium"][0], "label": "LABEL_3"},
+        "medium_term_month": {
+            "query": NEEDLES["medium"][0],
+            "date_from": datetime(2025, 6, 1).date(),
+            "date_to": datetime(2025, 6, 30).date(),
+        },
+        "medium_term_page_2": {"query": NEEDLES["medium"][0], "second_page": True},
+        "no_match": {"query": "ឈឈឈឈឈ"},
+    }
+
+
+async def measure(async_engine, cases: Dict[str, dict], repeats: int, limit: int) -> Dict[str, dict]:
+    fields = ["label_classified", "accuracy", "text_preview"]
+    results = {}
+    async with AsyncSession(async_engine) as db:
+        for name, case in cases.items():
+            case = dict(case)
+            second_page = case.pop("second_page", False)
+            cursor = None
+            if second_page:
+                rows, _ = await async_crud.search_predictions(db, limit=limit, fields=fields, **case)
+                cursor = (rows[-1]["created_at"], rows[-1]["id"]) if rows else None
+
+            timings = []
+            found = 0
+            for _ in range(repeats):
+                started = time.perf_counter()
+                rows, _ = await async_crud.search_predictions(db, cursor=cursor, limit=limit, fields=fields, **case)
+                timings.append((time.perf_counter() - started) * 1000)
+                found = len(rows)
+            timings.sort()
+            results[name] = {
+                "rows": found,
+                "p50_ms": round(statistics.median(timings), 2),
+                "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+                "max_ms": round(timings[-1], 2),
+            }
+            print(f"  {name:22} rows={found:3}  p50={results[name]['p50_ms']:8.2f} ms  p95={results[name]['p95_ms']:8.2f} ms", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /predictions/search on synthetic data")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Predictions to generate")
+    parser.add_argument("--articles", type=int, default=None, help="Distinct articles (default: rows / 2)")
+    parser.add_argument("--min-words", type=int, default=20)
+    parser.add_argument("--max-words", type=int, default=60)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--limit", type=int, default=20, help="Page size")
+    parser.add_argument("--budget-ms", type=float, default=200.0, help="Maximum acceptable p95 per scenario")
+    parser.add_argument("--reuse", action="store_true", help="Reuse the existing bench_search schema")
+    parser.add_argument("--drop", action="store_true", help="Drop the bench_search schema and exit")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+    args.articles = args.articles or max(1, args.rows // 2)
+
+    sync_engine, async_engine = _engines(SCHEMA)
+    if args.drop:
+        with sync_engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        return
+
+    vocabulary = build_vocabulary(random.Random(args.seed), args.vocabulary)
+    if not args.reuse:
+        print(f"Generating {args.rows} predictions over {args.articles} articles...", file=sys.stderr)
+        generate(sync_engine, args, vocabulary)
+
+    with sync_engine.connect() as conn:
+        # Same check as /health: without Khmer trigrams the numbers say nothing about production
+        search_status = migrations.search_index_status(conn)
+    if not search_status["ok"]:
+        raise SystemExit(f"Search index unusable: {search_status['error']}")
+
+    print("Measuring...", file=sys.stderr)
+    results = asyncio.run(measure(async_engine, scenarios(vocabulary), args.repeats, args.limit))
+    over_budget = [name for name, result in results.items() if result["p95_ms"] > args.budget_ms]
+
+    report = {
+        "rows": args.rows,
+        "articles": args.articles,
+        "budget_ms": args.budget_ms,
+        "over_budget": over_budget,
+        "scenarios": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
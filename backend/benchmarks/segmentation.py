@@ -0,0 +1,103 @@
+"""
+Speedup of pooled segmentation against input size
+
+Times preprocessing.count_khmer_words on synthetic Khmer articles of
+increasing length, once in-process and once through the segmentation pool,
+with the segmentation cache cleared before every run so each run segments
+everything. Reports median latency per size, the speedup, and whether both
+paths returned the same words. Run it on the production host before
+enabling SEGMENT_POOL_WORKERS (see app/ml/segment_pool.py): on a single CPU
+the pool is only overhead.
+
+Usage (from backend/):
+    python -m benchmarks.segmentation
+    python -m benchmarks.segmentation --sizes 2000 8000 20000 50000 --workers 4 --output segmentation.json
+
+File: backend/benchmarks/segmentation.py
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import List
+
+from app.core.config import settings
+from app.ml import preprocessing, segment_pool
+from app.ml.segment_cache import segmentation_cache
+
+# Real sentences, so the CRF sees realistic character clusters
+SENTENCES = [
+    "ប្រទេសថៃ មានករណីឧបទ្ទវហេតុអគ្គិភ័យធ្ងន់ធ្ងរ នៅក្នុងផ្សារទំនើបមួយកន្លែង។",
+    "រដ្ឋាភិបាលកម្ពុជាបានប្រកាសពីគម្រោងអភិវឌ្ឍន៍ហេដ្ឋារចនាសម្ព័ន្ធថ្មីនៅខេត្តសៀមរាប។",
+    "ក្រុមបាល់ទាត់ជម្រើសជាតិកម្ពុជាបានឈ្នះការប្រកួតមិត្តភាពកាលពីយប់មិញ។",
+    "តម្លៃប្រេងសាំងនៅលើទីផ្សារពិភពលោកបានកើនឡើងជាលំដាប់ក្នុងសប្តាហ៍នេះ៕",
+    "ក្រសួងសុខាភិបាលបានណែនាំឱ្យប្រជាពលរដ្ឋលាងដៃឱ្យបានញឹកញាប់ ដើម្បីការពារជំងឺ។",
+    "ក្រុមហ៊ុនបច្ចេកវិទ្យាធំៗកំពុងវិនិយោគលើបញ្ញាសិប្បនិម្មិត។",
+]
+
+
+def article(rng: random.Random, chars: int) -> str:
+    parts, size = [], 0
+    while size < chars:
+        sentence = rng.choice(SENTENCES)
+        parts.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(parts)
+
+
+def _time(text: str, workers: int, repeats: int) -> dict:
+    settings.SEGMENT_POOL_WORKERS = workers
+    timings, result = [], None
+    for _ in range(repeats):
+        segmentation_cache.clear()
+        started = time.perf_counter()
+        result = preprocessing.count_khmer_words(text, max_words=1_000_000)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(timings), 1), "words": result["words"]}
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs in-process Khmer segmentation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 4000, 8000, 20000, 50000])
+    parser.add_argument("--workers", type=int, default=max(2, settings.SEGMENT_POOL_WORKERS))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    texts = {size: article(rng, size) for size in args.sizes}
+
+    settings.SEGMENT_PARALLEL_MIN_CHARS = 0  # measure the pool at every size
+    settings.SEGMENT_POOL_WORKERS = args.workers
+    list(segment_pool.segment_parallel(SENTENCES))  # start and warm the pool
+
+    results = []
+    for size, text in texts.items():
+        serial = _time(text, workers=0, repeats=args.repeats)
+        pooled = _time(text, workers=args.workers, repeats=args.repeats)
+        row = {
+            "chars": len(text),
+            "in_process_ms": serial["median_ms"],
+            "pool_ms": pooled["median_ms"],
+            "speedup": round(serial["median_ms"] / pooled["median_ms"], 2) if pooled["median_ms"] else None,
+            "identical": serial["words"] == pooled["words"],
+        }
+        results.append(row)
+        print(f"  {row['chars']:>7} chars  in-process {row['in_process_ms']:8.1f} ms  "
+              f"pool {row['pool_ms']:8.1f} ms  x{row['speedup']}  identical={row['identical']}", file=sys.stderr)
+
+    segment_pool.shutdown()
+    report = {"workers": args.workers, "shard_chars": settings.SEGMENT_SHARD_CHARS, "cpus": os.cpu_count(), "results": results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Agreement and speed of the trie segmenter against khmernltk
+
+Splits a corpus into sentences, builds a lexicon from the khmernltk
+segmentation of a training share of them, and segments the held-out rest
+with both engines. khmernltk is the reference: reports word-boundary
+precision/recall/F1, the share of sentences segmented identically, the mean
+relative word-count error, and characters per second for each engine.
+
+With no --corpus the built-in sample sentences are used; they are too few to
+hold any out, so the lexicon is built from all of them and the agreement
+figures are in-vocabulary only (the report says "held_out": false).
+
+Usage (from backend/):
+    python -m benchmarks.segmenters
+    python -m benchmarks.segmenters --corpus articles.jsonl --test-share 0.2 --output segmenters.json
+
+File: backend/benchmarks/segmenters.py
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import List, Optional, Sequence, Set
+
+from app.ml import preprocessing, trie_segmenter
+from app.ml.trie_segmenter import TrieSegmenter
+from benchmarks.segmentation import SENTENCES
+
+MIN_HELD_OUT_SENTENCES = 20
+
+
+def _khmernltk(sentence: str) -> List[str]:
+    from khmernltk import word_tokenize
+    return [w.strip() for w in word_tokenize(sentence) if w.strip()]
+
+
+def _boundaries(tokens: Sequence[str]) -> Set[int]:
+    offsets, position = set(), 0
+    for token in tokens[:-1]:
+        position += len(token)
+        offsets.add(position)
+    return offsets
+
+
+def load_sentences(path: Optional[str]) -> List[str]:
+    if not path:
+        return list(SENTENCES)
+    from app.cli.build_lexicon import iter_file_texts
+    sentences = []
+    for text in iter_file_texts(path):
+        cleaned = preprocessing.remove_non_khmer_english_and_punct(text)
+        sentences.extend(s for s in preprocessing.split_sentences(cleaned) if s.strip())
+    return sentences
+
+
+def _throughput(segment, sentences: Sequence[str], repeats: int) -> float:
+    chars = sum(len(s) for s in sentences) * repeats
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for sentence in sentences:
+            segment(sentence)
+    return chars / (time.perf_counter() - started)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Compare the trie segmenter with khmernltk")
+    parser.add_argument("--corpus", help="Text or JSONL corpus (default: built-in sample sentences)")
+    parser.add_argument("--test-share", type=float, default=0.2)
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the test set when timing")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    sentences = load_sentences(args.corpus)
+    random.Random(args.seed).shuffle(sentences)
+    n_test = int(len(sentences) * args.test_share)
+    held_out = n_test >= MIN_HELD_OUT_SENTENCES
+    if held_out:
+        test, train = sentences[:n_test], sentences[n_test:]
+    else:
+        test = train = sentences
+
+    reference = {s: _khmernltk(s) for s in set(train) | set(test)}
+    counts = {}
+    for sentence in train:
+        for word, count in trie_segmenter.build_lexicon(reference[sentence]).items():
+            counts[word] = counts.get(word, 0) + count
+    segmenter = TrieSegmenter(TrieSegmenter.word_costs(counts))
+
+    matched = predicted = expected = identical = misaligned = 0
+    count_error = 0.0
+    for sentence in test:
+        ref, hyp = reference[sentence], segmenter.segment(sentence)
+        identical += ref == hyp
+        count_error += abs(len(hyp) - len(ref)) / max(len(ref), 1)
+        if "".join(ref) != "".join(hyp):
+            misaligned += 1  # engines dropped different characters; boundaries aren't comparable
+            continue
+        ref_b, hyp_b = _boundaries(ref), _boundaries(hyp)
+        matched += len(ref_b & hyp_b)
+        predicted += len(hyp_b)
+        expected += len(ref_b)
+
+    precision = matched / predicted if predicted else 1.0
+    recall = matched / expected if expected else 1.0
+    khmernltk_cps = _throughput(_khmernltk, test, args.repeats)
+    trie_cps = _throughput(segmenter.segment, test, args.repeats)
+
+    report = {
+        "held_out": held_out,
+        "train_sentences": len(train),
+        "test_sentences": len(test),
+        "lexicon_words": segmenter.word_count,
+        "trie_kib": round(segmenter.trie.nbytes() / 1024, 1),
+        "boundary_precision": round(precision, 4),
+        "boundary_recall": round(recall, 4),
+        "boundary_f1": round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0,
+        "identical_sentences": round(identical / len(test), 4),
+        "misaligned_sentences": misaligned,
+        "word_count_error": round(count_error / len(test), 4),
+        "khmernltk_chars_per_sec": round(khmernltk_cps),
+        "trie_chars_per_sec": round(trie_cps),
+        "speedup": round(trie_cps / khmernltk_cps, 1),
+    }
+    print(json.dumps(report, indent=2))
+    if not held_out:
+        print("  (corpus too small to hold sentences out; agreement is in-vocabulary)", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Randomly initialized XLM-R classifier for offline benchmarks
+
+Builds a model directory that ArticleClassifier loads like the real artifact
+(config.json + model.safetensors + slow SentencePiece tokenizer), without the
+1.1 GB download. The tokenizer is a small SentencePiece BPE model trained on
+the synthetic corpus (the artifact's own sentencepiece.bpe.model is a Git LFS
+pointer in a plain checkout), wrapped with XLM-R's special tokens and id
+offset. Labels are the six Khmer category names of the real model.
+
+Predictions are meaningless; timings are not. "tiny" (2 layers, hidden 64)
+keeps the model step in the benchmark fast. "base" has the real model's
+shape (12 layers, hidden 768), so its forward pass costs what production
+pays, minus the embedding table size.
+
+Usage (from backend/):
+    python -m benchmarks.tiny_model /tmp/tiny-xlmr
+    python -m benchmarks.tiny_model /tmp/xlmr-base-shape --size base
+    MODEL_CACHE_DIR=/tmp/tiny-xlmr uvicorn app.main:app
+
+File: backend/benchmarks/tiny_model.py
+"""
+
+import argparse
+import os
+import random
+import tempfile
+from typing import Iterable, List
+
+from benchmarks import corpus
+
+SIZES = {
+    "tiny": {"hidden_size": 64, "num_hidden_layers": 2, "num_attention_heads": 2, "intermediate_size": 128},
+    "base": {"hidden_size": 768, "num_hidden_layers": 12, "num_attention_heads": 12, "intermediate_size": 3072},
+}
+
+LABELS = ["សេដ្ឋកិច្ច", "កម្សាន្ត", "ជីវិត", "នយោបាយ", "កីឡា", "បច្ចេកវិទ្យា"]
+
+
+def train_tokenizer(path: str, texts: Iterable[str], vocab_size: int):
+    """Train a SentencePiece BPE model on `texts` and save it as an XLM-R slow tokenizer in `path`"""
+    import sentencepiece as spm
+    from transformers import XLMRobertaTokenizer
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_file = os.path.join(tmp, "corpus.txt")
+        with open(corpus_file, "w", encoding="utf-8") as f:
+            for text in texts:
+                f.write(text + "\n")
+        spm.SentencePieceTrainer.train(
+            input=corpus_file,
+            model_prefix=os.path.join(tmp, "sentencepiece.bpe"),
+            model_type="bpe",
+            vocab_size=vocab_size,
+            character_coverage=1.0,
+            # XLM-R reserves ids 0-3 for <s> <pad> </s> <unk> and shifts the rest by one
+            bos_id=-1, eos_id=-1, pad_id=-1, unk_id=0,
+            minloglevel=2,
+        )
+        tokenizer = XLMRobertaTokenizer(vocab_file=os.path.join(tmp, "sentencepiece.bpe.model"))
+        tokenizer.save_pretrained(path)
+    return tokenizer
+
+
+def build(path: str, size: str = "tiny", vocab_size: int = 2000, seed: int = 42) -> str:
+    """Write a random XLMRobertaForSequenceClassification + tokenizer to `path`"""
+    import torch
+    from transformers import XLMRobertaConfig, XLMRobertaForSequenceClassification
+
+    os.makedirs(path, exist_ok=True)
+    rng = random.Random(seed)
+    sentences = [corpus.sentence(rng) for _ in range(20000)]  # SentencePiece skips lines over 4 KB
+    tokenizer = train_tokenizer(path, sentences, vocab_size)
+
+    torch.manual_seed(seed)
+    config = XLMRobertaConfig(
+        vocab_size=len(tokenizer),
+        max_position_embeddings=514,
+        type_vocab_size=1,
+        pad_token_id=tokenizer.pad_token_id,
+        bos_token_id=tokenizer.bos_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        num_labels=len(LABELS),
+        id2label=dict(enumerate(LABELS)),
+        label2id={label: i for i, label in enumerate(LABELS)},
+        **SIZES[size],
+    )
+    model = XLMRobertaForSequenceClassification(config).eval()
+    model.save_pretrained(path, safe_serialization=True)
+    with open(os.path.join(path, "version.txt"), "w") as f:
+        f.write(f"random-xlmr-{size}-seed{seed}\n")
+    return path
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Write a randomly initialized XLM-R classifier for benchmarks")
+    parser.add_argument("path", help="Directory to write (use as MODEL_CACHE_DIR)")
+    parser.add_argument("--size", choices=sorted(SIZES), default="tiny")
+    parser.add_argument("--vocab-size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    print(build(args.path, args.size, args.vocab_size, args.seed))
+
+
+if __name__ == "__main__":
+    main()
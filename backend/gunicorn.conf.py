@@ -0,0 +1,33 @@
+"""
+Gunicorn settings for the API
+
+Enables prometheus_client multiprocess mode so GET /metrics aggregates every
+worker: PROMETHEUS_MULTIPROC_DIR is set here, in the master, before any
+worker imports prometheus_client, the directory is emptied when the server
+starts, and a dead worker's live gauges are dropped when it exits.
+
+Command-line options (workers, bind, worker class) still take precedence.
+
+File: backend/gunicorn.conf.py
+"""
+
+import os
+import shutil
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+
+workers = int(os.environ.get("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = "0.0.0.0:8000"
+
+
+def on_starting(server):
+    # Values left by a previous run would be added to this one's
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
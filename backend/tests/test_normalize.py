@@ -0,0 +1,74 @@
+"""
+preprocessing.normalize against the regex chain it replaced
+
+The reference implementation and the random input generator live in
+benchmarks/normalizer.py (which also times the two). Inputs are drawn from
+the character classes that matter: Khmer, Khmer symbols, zero-width
+characters, ASCII, every kind of Unicode whitespace, other scripts and
+controls. Seeds are fixed, so a failure reproduces.
+
+Run from backend/:
+    python -m pytest
+
+File: backend/tests/test_normalize.py
+"""
+
+import random
+
+import pytest
+
+from app.ml import preprocessing
+from benchmarks.normalizer import random_text, reference_clean, reference_counts, reference_preprocess
+
+EDGE_CASES = [
+    "",
+    " ",
+    "　\t\n\x1c",
+    "ក",
+    "ក ខ",
+    "ក  \n ខ",
+    "ក a ខ",
+    "a ក",
+    "ក។ ខ",
+    "ក​ ខ",
+    "​",
+    " ក ",
+    "😀 ក 😀 ខ 😀",
+    "᧠ ᧡",
+    "ក ᧠",
+    "COVID-19 ក (2026)",
+    "ê ក ß",
+]
+
+
+def _assert_matches(text: str):
+    assert preprocessing.normalize(text, join_khmer=False).text == reference_clean(text), repr(text)
+    result = preprocessing.normalize(text)
+    assert result.text == reference_preprocess(text), repr(text)
+    assert tuple(result[1:]) == reference_counts(text, result.text), repr(text)
+
+
+@pytest.mark.parametrize("text", EDGE_CASES)
+def test_edge_cases(text):
+    _assert_matches(text)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_short_texts(seed):
+    rng = random.Random(seed)
+    for _ in range(1000):
+        _assert_matches(random_text(rng, 80))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_long_texts(seed):
+    rng = random.Random(1000 + seed)
+    for _ in range(20):
+        _assert_matches(random_text(rng, 5000))
+
+
+def test_preprocess_for_model_uses_normalize():
+    rng = random.Random(7)
+    for _ in range(200):
+        text = random_text(rng, 200)
+        assert preprocessing.preprocess_for_model(text) == reference_preprocess(text), repr(text)
@@ -37,6 +37,7 @@ const LABEL_KHMER = {
 
 let currentPage = 1;
 let totalPages = 1;
+let pageCursors = { 1: '' };  // keyset cursor that starts each visited page
 let isLoading = false;
 
 // ==================== UTILITY FUNCTIONS ====================
@@ -255,8 +256,9 @@ document.getElementById('predict-single').addEventListener('click', async () =>
     document.getElementById('feedback-status').textContent = 'No feedback given yet';
     document.getElementById('feedback-status').style.color = '';
     
-    // Update probability table
+    // Update probability table, then fill in the stored distribution
     updateProbabilityTable(label);
+    loadStoredProbabilities(result.id, label);
     
     // Track successful prediction
     trackEvent('prediction_completed', {
@@ -302,7 +304,20 @@ document.getElementById('predict-single').addEventListener('click', async () =>
 });
 
 // ==================== UPDATE PROBABILITY TABLE ====================
-function updateProbabilityTable(selectedLabel) {
+async function loadStoredProbabilities(predictionId, selectedLabel) {
+  try {
+    const response = await fetch(`${API_BASE_URL}/predictions/${predictionId}?include=probabilities`);
+    if (!response.ok) return;
+    const prediction = await response.json();
+    if (prediction.probabilities) {
+      updateProbabilityTable(selectedLabel, prediction.probabilities);
+    }
+  } catch (error) {
+    console.warn('⚠️ Could not load stored probabilities:', error);
+  }
+}
+
+function updateProbabilityTable(selectedLabel, probabilities = null) {
   const table = document.getElementById('prob-table');
   if (!table) return;
   
@@ -319,7 +334,7 @@ function updateProbabilityTable(selectedLabel) {
         <td>${key}</td>
         <td>${khmerLabel}</td>
         <td>${englishLabel}</td>
-        <td>${isSelected ? '✅ Predicted' : ''}</td>
+        <td>${isSelected ? '✅ Predicted' : ''}${probabilities && key in probabilities ? ` ${probabilities[key].toFixed(2)} %` : ''}</td>
       </tr>
     `;
   }
@@ -429,7 +444,19 @@ async function loadHistory() {
   try {
     const csrfToken = getCookie('csrftoken');
     
-    const response = await fetchWithRetry(`${API_BASE_URL}/predictions?page=${currentPage}&limit=10`, {
+    // Page 1 always reflects the newest predictions, so older cursors are stale
+    if (currentPage === 1) pageCursors = { 1: '' };
+
+    // Keyset cursor for pages reached by next/prev, offset for direct jumps;
+    // the total is a cheap server-side estimate either way
+    const cursor = pageCursors[currentPage];
+    // Only the columns the table shows, with a short server-side preview
+    const projection = 'fields=id,created_at,label_classified,accuracy,feedback,text_preview,text_length&preview_chars=30';
+    const query = cursor !== undefined
+      ? `cursor=${encodeURIComponent(cursor)}&limit=10&total=estimate&${projection}`
+      : `page=${currentPage}&limit=10&total=estimate&${projection}`;
+
+    const response = await fetchWithRetry(`${API_BASE_URL}/predictions?${query}`, {
       method: 'GET',
       headers: { 
         'Accept': 'application/json',
@@ -448,6 +475,10 @@ async function loadHistory() {
     if (data.predictions && Array.isArray(data.predictions)) {
       predictions = data.predictions;
       totalPages = data.total_pages || 1;
+      if (data.next_cursor) {
+        pageCursors[currentPage + 1] = data.next_cursor;
+        totalPages = Math.max(totalPages, currentPage + 1);  // the estimate may lag behind
+      }
     }
     
     if (predictions.length === 0) {
@@ -462,8 +493,8 @@ async function loadHistory() {
         const timeStr = formatDate(pred.created_at);
         
         // Text preview
-        const text = pred.text_input || '';
-        const preview = text.length > 30 ? text.substring(0, 30) + '…' : text;
+        const text = pred.text_preview || '';
+        const preview = pred.text_length > text.length ? text + '…' : text;
         
         // Label
         const label = pred.label_classified || 'UNKNOWN';
@@ -1,12 +1,44 @@
--- 1. PREDICTIONS TABLE
-CREATE TABLE IF NOT EXISTS predictions (
-    id SERIAL PRIMARY KEY,
+CREATE EXTENSION IF NOT EXISTS pg_trgm;  -- substring search over Khmer text (no word boundaries needed)
+
+-- 0. ARTICLES: each distinct text stored once, keyed by sha256 of its normalized form
+CREATE TABLE IF NOT EXISTS articles (
+    content_hash CHAR(64) PRIMARY KEY,
     text_input TEXT NOT NULL,
+    char_count INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+ALTER TABLE articles ALTER COLUMN text_input SET COMPRESSION lz4;  -- PostgreSQL 14+, TOAST compression
+
+-- 1. PREDICTIONS TABLE, range-partitioned by month on created_at
+--    (the API creates future partitions and applies retention, see backend/app/db/partitions.py)
+CREATE TABLE IF NOT EXISTS predictions (
+    id SERIAL,
+    article_hash CHAR(64) NOT NULL REFERENCES articles(content_hash),
     label_classified TEXT,
     accuracy NUMERIC(5,2),
     feedback BOOLEAN,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    feedback_at TIMESTAMP,     -- last feedback change; watermark for training exports
+    model_version VARCHAR(64),
+    probabilities BYTEA,       -- softmax vector, little-endian float32 per class
+    validation_summary JSONB,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS predictions_default PARTITION OF predictions DEFAULT;
+
+DO $$
+DECLARE
+    month DATE := date_trunc('month', CURRENT_DATE);
+BEGIN
+    FOR i IN 0..3 LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF predictions FOR VALUES FROM (%L) TO (%L)',
+            to_char(month, '"predictions_y"YYYY"m"MM'), month, month + INTERVAL '1 month'
+        );
+        month := month + INTERVAL '1 month';
+    END LOOP;
+END $$;
 
 -- 2. ERROR LOGS TABLE
 CREATE TABLE IF NOT EXISTS error_logs (
@@ -17,7 +49,56 @@ CREATE TABLE IF NOT EXISTS error_logs (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- 3. Add some indexes for better performance
-CREATE INDEX idx_predictions_created ON predictions(created_at DESC);
+-- 3. PER-DAY, PER-LABEL STATISTICS ROLLUP (maintained incrementally by the API)
+CREATE TABLE IF NOT EXISTS prediction_daily_stats (
+    day DATE NOT NULL,
+    label VARCHAR(255) NOT NULL,
+    total BIGINT NOT NULL DEFAULT 0,
+    with_feedback BIGINT NOT NULL DEFAULT 0,
+    positive_feedback BIGINT NOT NULL DEFAULT 0,
+    confidence_sum NUMERIC(18,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, label)
+);
+
+-- 4. BULK CLASSIFICATION JOBS
+CREATE TABLE IF NOT EXISTS classification_jobs (
+    id VARCHAR(36) PRIMARY KEY,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',  -- 'queued', 'running', 'completed', 'failed'
+    total_items INTEGER NOT NULL DEFAULT 0,
+    processed_items INTEGER NOT NULL DEFAULT 0,    -- checkpoint: items before this seq are done
+    failed_items INTEGER NOT NULL DEFAULT 0,
+    batch_size INTEGER NOT NULL,
+    worker_id VARCHAR(100),
+    error_message TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    heartbeat_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id VARCHAR(36) REFERENCES classification_jobs(id) ON DELETE CASCADE,
+    seq INTEGER,
+    external_id VARCHAR(255),
+    text_input TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id VARCHAR(36) REFERENCES classification_jobs(id) ON DELETE CASCADE,
+    seq INTEGER,
+    external_id VARCHAR(255),
+    label_classified TEXT,
+    accuracy NUMERIC(5,2),
+    error_message TEXT,
+    PRIMARY KEY (job_id, seq)
+);
+
+-- 5. Add some indexes for better performance
+CREATE INDEX idx_predictions_created ON predictions(created_at DESC, id DESC);  -- keyset pagination
 CREATE INDEX idx_predictions_feedback ON predictions(feedback);
-CREATE INDEX idx_error_logs_created ON error_logs(created_at DESC);  
+CREATE INDEX idx_predictions_article ON predictions(article_hash);
+CREATE INDEX idx_predictions_label_created ON predictions(label_classified, created_at DESC, id DESC);  -- filtered history/search
+CREATE INDEX idx_articles_text_trgm ON articles USING gin (text_input gin_trgm_ops);                  -- /predictions/search
+CREATE INDEX idx_error_logs_created ON error_logs(created_at DESC);
+CREATE INDEX idx_classification_jobs_status ON classification_jobs(status, created_at);